@@ -0,0 +1,99 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Condition, Thread
+import traceback
+import logger
+from globals import ComparConfig
+
+
+class AsyncJobExecutor:
+    """
+    The pipeline of JobExecutor, but the jobs run as coroutines of one event loop instead of a thread for each job.
+    A job waits for its backend without holding a thread, so the number of jobs in flight is bounded only by a
+    semaphore of max_in_flight_jobs jobs, and thousands of jobs may be in flight at once.
+    The compilations run in the compilation pool, and the blocking steps of the jobs (e.g. the unit tests) run in the
+    default executor of the loop, a pool of number_of_threads threads.
+    """
+
+    def __init__(self, number_of_threads: int = 1, number_of_compilation_threads: int = 1,
+                 compiled_jobs_queue_size: int = ComparConfig.COMPILED_JOBS_QUEUE_SIZE,
+                 max_in_flight_jobs: int = ComparConfig.MAX_IN_FLIGHT_JOBS):
+        self.number_of_threads = number_of_threads
+        self.number_of_compilation_threads = number_of_compilation_threads
+        self.compiled_jobs_queue_size = compiled_jobs_queue_size
+        self.max_in_flight_jobs = max_in_flight_jobs
+        self.loop = None
+        self.loop_thread = None
+        self.pool = None
+        self.compilation_pool = None
+        self.pipeline_slots = None
+        self.jobs_semaphore = None
+        self.jobs_futures = set()  # only the jobs in the pipeline, not all the combinations of the run
+        self.jobs_futures_condition = Condition()
+
+    def create_jobs_pool(self):
+        self.pool = ThreadPoolExecutor(max_workers=self.number_of_threads, thread_name_prefix='compar_job_thread')
+        self.compilation_pool = ThreadPoolExecutor(max_workers=self.number_of_compilation_threads,
+                                                   thread_name_prefix='compar_compilation_thread')
+        self.pipeline_slots = BoundedSemaphore(self.number_of_compilation_threads + self.compiled_jobs_queue_size +
+                                               self.max_in_flight_jobs)
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_default_executor(self.pool)
+        self.loop_thread = Thread(target=self.loop.run_forever, name='compar_jobs_loop', daemon=True)
+        self.loop_thread.start()
+
+    def compile_and_run_job(self, compile_func, run_func, *args):
+        """
+        compile_func(*args) runs in the compilation pool and returns the job to run (or None if there is nothing to
+        run), then the coroutine run_func(job) runs in the event loop.
+        """
+        self.pipeline_slots.acquire()
+        job_future = asyncio.run_coroutine_threadsafe(self.__compile_and_run_job(compile_func, run_func, *args),
+                                                      self.loop)
+        with self.jobs_futures_condition:
+            self.jobs_futures.add(job_future)
+        job_future.add_done_callback(self.__job_done)
+
+    def __job_done(self, job_future):
+        with self.jobs_futures_condition:
+            self.jobs_futures.discard(job_future)
+            self.jobs_futures_condition.notify_all()
+        if not job_future.cancelled() and job_future.exception() is not None:
+            ex = job_future.exception()
+            logger.info_error(f'Exception at {AsyncJobExecutor.__name__}: {type(ex).__name__}: {ex}')
+            logger.debug_error(''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+
+    async def __compile_and_run_job(self, compile_func, run_func, *args):
+        if self.jobs_semaphore is None:  # created in the loop thread
+            self.jobs_semaphore = asyncio.Semaphore(self.max_in_flight_jobs)
+        try:
+            try:
+                job = await self.loop.run_in_executor(self.compilation_pool, compile_func, *args)
+            except Exception as e:
+                logger.info_error(f'Exception at {AsyncJobExecutor.__name__}: {e}')
+                logger.debug_error(f'{traceback.format_exc()}')
+                return
+            if job is None:
+                return
+            async with self.jobs_semaphore:
+                try:
+                    await run_func(job)
+                except Exception as e:
+                    logger.info_error(f'Exception at {AsyncJobExecutor.__name__}: {e}')
+                    logger.debug_error(f'{traceback.format_exc()}')
+        finally:
+            self.pipeline_slots.release()
+
+    def wait_and_finish_pool(self):
+        with self.jobs_futures_condition:
+            while self.jobs_futures and self.loop_thread.is_alive():
+                self.jobs_futures_condition.wait(ComparConfig.WAIT_FOR_JOBS_SECOND_TIME)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.loop_thread.join()
+        self.loop.close()
+        self.loop = None
+        self.jobs_semaphore = None
+        self.compilation_pool.shutdown()
+        self.compilation_pool = None
+        self.pool.shutdown()
+        self.pool = None
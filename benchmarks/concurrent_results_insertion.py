@@ -0,0 +1,75 @@
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from databases_mapper import databases
+from globals import ComparMode, DatabaseConfig
+
+
+def generate_combination_result(combination_id: str, num_of_files: int, num_of_loops: int):
+    return {
+        '_id': combination_id,
+        'job_id': '',
+        'total_run_time': 1.0,
+        'run_time_results': [{
+            'file_id_by_rel_path': f'file_{i}.c',
+            'loops': [{'loop_label': str(j), 'run_time': 1.0, 'speedup': 1.0} for j in range(1, num_of_loops + 1)]
+        } for i in range(num_of_files)]
+    }
+
+
+def insert_results(db, thread_index: int, num_of_results: int, num_of_files: int, num_of_loops: int):
+    for i in range(num_of_results):
+        combination_result = generate_combination_result(f'thread_{thread_index}_{i}', num_of_files, num_of_loops)
+        db.insert_new_combination_results(combination_result)
+
+
+def run_benchmark(database_type: str, project_name: str, output_dir: str, pool_size: int, threads_counts: list,
+                  num_of_results: int, num_of_files: int, num_of_loops: int):
+    results = []
+    db = databases[database_type](project_name, ComparMode.OVERWRITE, output_dir=output_dir, pool_size=pool_size)
+    try:
+        for num_of_threads in threads_counts:
+            db.drop_results_collections()
+            db.create_dynamic_db()
+            start_time = time.time()
+            with ThreadPoolExecutor(max_workers=num_of_threads) as pool:
+                futures = [pool.submit(insert_results, db, i, num_of_results, num_of_files, num_of_loops)
+                           for i in range(num_of_threads)]
+                for future in futures:
+                    future.result()
+            elapsed_time = time.time() - start_time
+            num_of_inserted_results = num_of_threads * num_of_results
+            results.append({'threads': num_of_threads,
+                            'results': num_of_inserted_results,
+                            'seconds': elapsed_time,
+                            'results_per_second': num_of_inserted_results / elapsed_time})
+    finally:
+        db.delete_all_related_collections()
+        db.close_connection()
+    return results
+
+
+def main():
+    arg_parser = ArgumentParser(description='Concurrent results insertion throughput benchmark')
+    arg_parser.add_argument('-db', '--database_type', default=DatabaseConfig.DEFAULT_DATABASE_TYPE,
+                            choices=databases.keys())
+    arg_parser.add_argument('-address', '--server_address', default=DatabaseConfig.SERVER_ADDRESS)
+    arg_parser.add_argument('-output_dir', '--output_directory_path', default='',
+                            help='Directory of the local database file')
+    arg_parser.add_argument('-name', '--project_name', default='concurrent_results_insertion_benchmark')
+    arg_parser.add_argument('-pool', '--pool_size', type=int, default=DatabaseConfig.CONNECTION_POOL_SIZE)
+    arg_parser.add_argument('-threads', '--threads_counts', nargs='*', type=int, default=[1, 2, 4, 8, 16, 32, 64])
+    arg_parser.add_argument('-results', '--results_per_thread', type=int, default=50)
+    arg_parser.add_argument('-files', '--num_of_files', type=int, default=5)
+    arg_parser.add_argument('-loops', '--num_of_loops', type=int, default=20)
+    args = arg_parser.parse_args()
+    DatabaseConfig.SERVER_ADDRESS = args.server_address
+
+    for result in run_benchmark(args.database_type, args.project_name, args.output_directory_path, args.pool_size,
+                                args.threads_counts, args.results_per_thread, args.num_of_files, args.num_of_loops):
+        print(f"{result['threads']} threads: {result['results']} results in {result['seconds']:.2f} seconds "
+              f"({result['results_per_second']:.1f} results/second)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+"""
+A local stand-in for the sbatch, squeue and sacct commands of slurm, to run and measure Compar without a cluster.
+The submitted jobs wait in the queue (PD) for the queue latency and for a free node, then they run (R) on the local
+machine and end as completed (CD), failed (F) or timed out (TO), with their exit code, elapsed time and node in the
+accounting.
+The jobs states are kept as files in $FAKE_SLURM_DIR, so every command is a separate process, as in slurm.
+
+Usage: put benchmarks/fake_slurm_bin first in the PATH, or run python3 fake_slurm.py <sbatch|squeue|sacct> <args>.
+Environment variables:
+    FAKE_SLURM_DIR              the jobs states folder (default: <temp folder>/fake_slurm_<user>)
+    FAKE_SLURM_QUEUE_LATENCY    the seconds a job waits in the queue before it may run (default: 0.5)
+    FAKE_SLURM_NUM_OF_NODES     the number of jobs that run at once (default: the number of cpus)
+"""
+import os
+import re
+import sys
+import json
+import time
+import fcntl
+import shlex
+import signal
+import getpass
+import tempfile
+import subprocess
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from local_backend import LocalBackend  # noqa: E402
+
+JOBS_FOLDER_NAME = 'jobs'
+NODES_FOLDER_NAME = 'nodes'
+JOB_ID_FILE_NAME = 'last_job_id'
+NODE_NAME_PREFIX = 'fake-node-'
+WAIT_FOR_NODE_SECOND_TIME = 0.1
+QUEUE_STATES = ('PD', 'R')
+STATES_NAMES = {'PD': 'PENDING', 'R': 'RUNNING', 'CD': 'COMPLETED', 'F': 'FAILED', 'TO': 'TIMEOUT'}
+SBATCH_SHORT_OPTIONS = {'-o': 'output', '-e': 'error', '-p': 'partition', '-t': 'time', '-J': 'job-name',
+                        '-a': 'array', '-A': 'account', '-c': 'cpus-per-task', '-n': 'ntasks', '-N': 'nodes',
+                        '-q': 'qos', '-w': 'nodelist', '-D': 'chdir'}
+SQUEUE_SHORT_OPTIONS = {'-o': 'format', '-j': 'jobs', '-u': 'user', '-p': 'partition', '-t': 'states',
+                        '-h': 'noheader', '-r': 'array'}
+SACCT_SHORT_OPTIONS = {'-o': 'format', '-j': 'jobs', '-u': 'user', '-S': 'starttime', '-E': 'endtime',
+                       '-s': 'state', '-n': 'noheader', '-P': 'parsable2', '-X': 'allocations'}
+SQUEUE_FLAGS = {'noheader', 'array'}
+SACCT_FLAGS = {'noheader', 'parsable2', 'allocations'}
+VALUED_OPTIONS = set(SBATCH_SHORT_OPTIONS.values()) | set(SQUEUE_SHORT_OPTIONS.values()) | \
+    set(SACCT_SHORT_OPTIONS.values()) | {'mem', 'gres', 'constraint', 'name'}
+
+
+def get_state_dir_path():
+    default_state_dir_path = os.path.join(tempfile.gettempdir(), f'fake_slurm_{getpass.getuser()}')
+    return os.environ.get('FAKE_SLURM_DIR', default_state_dir_path)
+
+
+def get_job_file_path(job_id: str):
+    return os.path.join(get_state_dir_path(), JOBS_FOLDER_NAME, f'{job_id}.json')
+
+
+def read_job(job_id: str):
+    try:
+        with open(get_job_file_path(job_id), 'r') as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def write_job(job: dict):
+    job_file_path = get_job_file_path(job['job_id'])
+    temp_job_file_path = f'{job_file_path}.{os.getpid()}.tmp'
+    with open(temp_job_file_path, 'w') as fp:
+        json.dump(job, fp)
+    os.replace(temp_job_file_path, job_file_path)  # the readers never see a partial state
+
+
+def get_jobs(job_ids: list = None):
+    """returns the jobs by their ids (an array job id stands for all its tasks), or all the jobs"""
+    jobs_dir_path = os.path.join(get_state_dir_path(), JOBS_FOLDER_NAME)
+    if not os.path.isdir(jobs_dir_path):
+        return [], job_ids if job_ids else []
+    all_job_ids = [file[:-len('.json')] for file in os.listdir(jobs_dir_path) if file.endswith('.json')]
+    if not job_ids:
+        selected_job_ids, unknown_job_ids = all_job_ids, []
+    else:
+        selected_job_ids, unknown_job_ids = [], []
+        for job_id in job_ids:
+            matching_job_ids = [known_job_id for known_job_id in all_job_ids
+                                if known_job_id == job_id or known_job_id.startswith(f'{job_id}_')]
+            selected_job_ids.extend(matching_job_ids)
+            if not matching_job_ids:
+                unknown_job_ids.append(job_id)
+    jobs = [job for job in map(read_job, sorted(set(selected_job_ids), key=job_id_sort_key)) if job]
+    return jobs, unknown_job_ids
+
+
+def job_id_sort_key(job_id: str):
+    return tuple(int(number) for number in re.findall(r'\d+', job_id))
+
+
+def allocate_job_id():
+    os.makedirs(os.path.join(get_state_dir_path(), JOBS_FOLDER_NAME), exist_ok=True)
+    with open(os.path.join(get_state_dir_path(), JOB_ID_FILE_NAME), 'a+') as fp:
+        fcntl.flock(fp, fcntl.LOCK_EX)
+        fp.seek(0)
+        last_job_id = fp.read().strip()
+        job_id = int(last_job_id) + 1 if last_job_id else 1
+        fp.seek(0)
+        fp.truncate()
+        fp.write(str(job_id))
+    return str(job_id)
+
+
+def parse_options(args: list, short_options: dict, flags: set = frozenset()):
+    """
+    Returns the options ({<long name>: <value, or True for a flag>}) and the arguments that follow them.
+    short_options maps the short options of the command to their long names, flags are the options without a value.
+    """
+    options = {}
+    index = 0
+    while index < len(args) and args[index].startswith('-') and len(args[index]) > 1:
+        arg = args[index]
+        if arg.startswith('--'):
+            name, separator, value = arg[2:].partition('=')
+            is_valued = name in VALUED_OPTIONS and name not in flags
+            if not separator and is_valued and index + 1 < len(args):
+                index += 1
+                value = args[index]
+            options[name] = value if separator or is_valued else True
+        elif arg[:2] in short_options:
+            name = short_options[arg[:2]]
+            if name in flags:
+                options[name] = True
+            elif len(arg) > 2:
+                options[name] = arg[2:]
+            else:
+                index += 1
+                options[name] = args[index] if index < len(args) else ''
+        index += 1
+    return options, args[index:]
+
+
+def parse_array_indices(array_spec: str):
+    """'0-9', '0-9:2', '1,3,5-7' or '0-999%50' (the limit of running tasks is ignored) to a list of indices"""
+    indices = []
+    for indices_range in array_spec.split('%')[0].split(','):
+        indices_range, _, step = indices_range.partition(':')
+        first, _, last = indices_range.partition('-')
+        indices.extend(range(int(first), int(last if last else first) + 1, int(step) if step else 1))
+    return indices
+
+
+def format_file_name_pattern(pattern: str, job: dict):
+    replacements = {'j': job['job_id'], 'A': job['array_job_id'] or job['job_id'],
+                    'a': str(job['array_task_id']) if job['array_task_id'] is not None else '4294967294',
+                    'x': job['name'], 'u': getpass.getuser(), '%': '%'}
+    return re.sub(r'%([jAaxu%])', lambda match: replacements[match.group(1)], pattern)
+
+
+def sbatch(args: list):
+    options, script_args = parse_options(args, SBATCH_SHORT_OPTIONS)
+    if not script_args:
+        print('sbatch: error: a batch script is required (a script from the standard input is not supported)',
+              file=sys.stderr)
+        return 1
+    script_path = script_args[0]
+    try:
+        with open(script_path, 'r') as fp:
+            script_lines = fp.read().splitlines()
+    except OSError as e:
+        print(f'sbatch: error: Unable to open file {script_path}: {e}', file=sys.stderr)
+        return 1
+    script_options = {}
+    for line in script_lines:
+        if line.startswith('#SBATCH'):
+            script_options.update(parse_options(shlex.split(line[len('#SBATCH'):]), SBATCH_SHORT_OPTIONS)[0])
+    script_options.update(options)  # the command line options override the script options
+    options = script_options
+
+    job_id = allocate_job_id()
+    array_indices = parse_array_indices(options['array']) if options.get('array') else [None]
+    default_output = 'slurm-%A_%a.out' if options.get('array') else 'slurm-%j.out'
+    for array_task_id in array_indices:
+        job = {
+            'job_id': job_id if array_task_id is None else f'{job_id}_{array_task_id}',
+            'array_job_id': job_id if array_task_id is not None else None,
+            'array_task_id': array_task_id,
+            'name': options.get('job-name') or os.path.basename(script_path),
+            'state': 'PD',
+            'exit_code': '0:0',
+            'node': '',
+            'submit_time': time.time(),
+            'start_time': None,
+            'end_time': None,
+            'time_limit': LocalBackend.time_limit_to_seconds(options['time']) if options.get('time') else None,
+            'work_dir': os.path.abspath(options.get('chdir') or os.getcwd()),
+            'script_args': [os.path.abspath(script_path)] + script_args[1:],
+        }
+        job['output'] = format_file_name_pattern(options.get('output') or default_output, job)
+        write_job(job)
+        # the job runs detached, sbatch returns as soon as the job is queued
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'run', job['job_id']],
+                         stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                         start_new_session=True)
+    print(f'Submitted batch job {job_id}')
+    return 0
+
+
+def acquire_node():
+    """blocks until one of the nodes is free, returns its name and its lock file (the node is free when it is closed)"""
+    nodes_dir_path = os.path.join(get_state_dir_path(), NODES_FOLDER_NAME)
+    os.makedirs(nodes_dir_path, exist_ok=True)
+    num_of_nodes = int(os.environ.get('FAKE_SLURM_NUM_OF_NODES', os.cpu_count() or 1))
+    while True:
+        for node_index in range(num_of_nodes):
+            node_name = f'{NODE_NAME_PREFIX}{node_index}'
+            node_lock_file = open(os.path.join(nodes_dir_path, node_name), 'a')
+            try:
+                fcntl.flock(node_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return node_name, node_lock_file
+            except OSError:
+                node_lock_file.close()
+        time.sleep(WAIT_FOR_NODE_SECOND_TIME)
+
+
+def run(job_id: str):
+    """runs the job in the background, the same as a slurm node does"""
+    job = read_job(job_id)
+    time.sleep(float(os.environ.get('FAKE_SLURM_QUEUE_LATENCY', 0.5)))
+    node_name, node_lock_file = acquire_node()
+    try:
+        job.update({'state': 'R', 'node': node_name, 'start_time': time.time()})
+        write_job(job)
+        env = dict(os.environ, SLURM_JOB_ID=job['job_id'].split('_')[0], SLURM_JOB_NAME=job['name'],
+                   SLURMD_NODENAME=node_name, SLURM_SUBMIT_DIR=job['work_dir'])
+        if job['array_task_id'] is not None:
+            env.update(SLURM_ARRAY_JOB_ID=job['array_job_id'], SLURM_ARRAY_TASK_ID=str(job['array_task_id']))
+        output_file_path = os.path.join(job['work_dir'], job['output'])
+        with open(output_file_path, 'w') as output_file:
+            process = subprocess.Popen(['bash'] + job['script_args'], stdin=subprocess.DEVNULL, stdout=output_file,
+                                       stderr=subprocess.STDOUT, cwd=job['work_dir'], env=env,
+                                       start_new_session=True)
+            try:
+                process.wait(timeout=job['time_limit'])
+                if process.returncode >= 0:
+                    job['state'] = 'CD' if process.returncode == 0 else 'F'
+                    job['exit_code'] = f'{process.returncode}:0'
+                else:
+                    job['state'], job['exit_code'] = 'F', f'0:{-process.returncode}'
+            except subprocess.TimeoutExpired:
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+                job['state'], job['exit_code'] = 'TO', f'0:{signal.SIGTERM.value}'
+    except Exception:
+        job['state'], job['exit_code'] = 'F', '1:0'
+        raise
+    finally:
+        job['end_time'] = time.time()
+        write_job(job)
+        node_lock_file.close()
+    return 0
+
+
+def get_elapsed_time(job: dict):
+    if not job['start_time']:
+        return 0
+    return int((job['end_time'] or time.time()) - job['start_time'])
+
+
+def format_elapsed_time(seconds: int):
+    days, seconds = divmod(seconds, 24 * 60 * 60)
+    time_str = f'{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}'
+    return f'{days}-{time_str}' if days else time_str
+
+
+def squeue(args: list):
+    options, _ = parse_options(args, SQUEUE_SHORT_OPTIONS, SQUEUE_FLAGS)
+    job_ids = options['jobs'].split(',') if options.get('jobs') else None
+    jobs, unknown_job_ids = get_jobs(job_ids)
+    if unknown_job_ids:
+        print('slurm_load_jobs error: Invalid job id specified', file=sys.stderr)
+        return 1
+    squeue_format = options.get('format') or '%.18i %.9P %.8j %.8u %.2t %.10M %.6D %R'
+    fields = {'i': lambda job: job['job_id'], 't': lambda job: job['state'],
+              'T': lambda job: STATES_NAMES[job['state']], 'j': lambda job: job['name'], 'N': lambda job: job['node'],
+              'R': lambda job: job['node'] or '(None)',
+              'M': lambda job: format_elapsed_time(get_elapsed_time(job)), 'P': lambda job: 'fake',
+              'u': lambda job: getpass.getuser(), 'D': lambda job: '1'}
+    headers = {'i': 'JOBID', 't': 'ST', 'T': 'STATE', 'j': 'NAME', 'N': 'NODELIST', 'R': 'NODELIST(REASON)',
+               'M': 'TIME', 'P': 'PARTITION', 'u': 'USER', 'D': 'NODES'}
+
+    def format_line(value_func):
+        def format_field(match):
+            right_justified, width, field = match.groups()
+            value = str(value_func(field)) if field in fields else ''
+            if width:
+                value = value[:int(width)]
+                value = value.rjust(int(width)) if right_justified else value.ljust(int(width))
+            return value
+        return re.sub(r'%(\.?)(\d*)([a-zA-Z])', format_field, squeue_format)
+
+    if not options.get('noheader'):
+        print(format_line(lambda field: headers[field]))
+    for job in jobs:
+        if job['state'] in QUEUE_STATES:
+            print(format_line(lambda field: fields[field](job)))
+    return 0
+
+
+def sacct(args: list):
+    options, _ = parse_options(args, SACCT_SHORT_OPTIONS, SACCT_FLAGS)
+    job_ids = options['jobs'].split(',') if options.get('jobs') else None
+    jobs, _ = get_jobs(job_ids)  # the unknown jobs are not in the accounting
+    sacct_format = (options.get('format') or 'JobID,JobName,State,ExitCode').split(',')
+    fields = {'jobid': lambda job: job['job_id'], 'jobname': lambda job: job['name'],
+              'state': lambda job: STATES_NAMES[job['state']], 'exitcode': lambda job: job['exit_code'],
+              'elapsed': lambda job: format_elapsed_time(get_elapsed_time(job)),
+              'elapsedraw': get_elapsed_time, 'nodelist': lambda job: job['node'] or 'None assigned',
+              'partition': lambda job: 'fake', 'alloccpus': lambda job: '1'}
+    rows = []
+    for job in jobs:
+        rows.append([str(fields.get(field.lower(), lambda _: '')(job)) for field in sacct_format])
+        if job['start_time'] and not options.get('allocations'):  # the batch step of the job
+            step = dict(job, job_id=f'{job["job_id"]}.batch', name='batch')
+            rows.append([str(fields.get(field.lower(), lambda _: '')(step)) for field in sacct_format])
+    if options.get('parsable2'):
+        if not options.get('noheader'):
+            print('|'.join(sacct_format))
+        for row in rows:
+            print('|'.join(row))
+    else:
+        widths = [max([len(field), 10] + [len(row[index]) for row in rows]) for index, field in enumerate(sacct_format)]
+        if not options.get('noheader'):
+            print(' '.join(field.rjust(width) for field, width in zip(sacct_format, widths)))
+            print(' '.join('-' * width for width in widths))
+        for row in rows:
+            print(' '.join(value.rjust(width) for value, width in zip(row, widths)))
+    return 0
+
+
+COMMANDS = {'sbatch': sbatch, 'squeue': squeue, 'sacct': sacct}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in list(COMMANDS.keys()) + ['run']:
+        print(f'usage: {os.path.basename(__file__)} <{"|".join(COMMANDS.keys())}> [<args>]', file=sys.stderr)
+        return 2
+    if sys.argv[1] == 'run':
+        return run(sys.argv[2])
+    return COMMANDS[sys.argv[1]](sys.argv[2:])
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import shutil
+import resource
+import tempfile
+from argparse import ArgumentParser
+import logger
+from compar import Compar
+from compilers.dummy import Dummy
+from assets.parallelizers_mapper import parallelizers
+from databases_mapper import databases
+from execution_backends_mapper import execution_backends
+from slurm_backend import SlurmBackend
+from sqlite_database import SqliteDatabase
+from globals import CombinatorConfig, ComparMode, DatabaseConfig, ExecuteJobConfig, CombinationValidatorConfig
+
+FAKE_SLURM_BIN_DIR_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fake_slurm_bin')
+MAIN_FILE_NAME = 'main.c'
+MAIN_FILE_CODE = '''#include <stdio.h>
+
+int main() {
+    int i;
+    double sum = 0.0;
+    for (i = 0; i < 1000; i++) {
+        sum += i * 0.5;
+    }
+    printf("sum = %f\\nverification = successful\\n", sum);
+    return 0;
+}
+'''
+
+
+class BenchmarkParallelizer(Dummy):
+    """leaves the loops serial, but writes its flags to the code, so every combination has its own binary"""
+    NAME = 'benchmark'
+
+    def compile(self):
+        super().compile()
+        flags = ' '.join(self.get_compilation_flags())
+        for file_dict in self.get_file_list():
+            with open(file_dict['file_full_path'], 'a') as fp:
+                fp.write(f'\nstatic const char compar_benchmark_flags[] __attribute__((used)) = "{flags}";\n')
+
+
+def write_params_files(params_dir: str, num_of_combinations: int):
+    """the search space of the benchmark: one parallelizer parameter with num_of_combinations values"""
+    compilation_params = [{
+        'compiler': BenchmarkParallelizer.NAME,
+        'essential_params': {
+            'valued': [{'param': '-combination', 'values': list(range(num_of_combinations)), 'annotation': '='}],
+            'toggle': []
+        },
+        'optional_params': {'valued': [], 'toggle': []}
+    }]
+    omp_directives_params = {'parallel': {'valued': [], 'toggle': []}, 'for': {'valued': [], 'toggle': []}}
+    compilation_params_file_path = os.path.join(params_dir, CombinatorConfig.COMPILATION_PARAMS_FILE_NAME)
+    CombinatorConfig.COMPILATION_PARAMS_FILE_PATH = compilation_params_file_path
+    CombinatorConfig.OMP_RTL_PARAMS_FILE_PATH = os.path.join(params_dir, CombinatorConfig.OMP_RTL_PARAMS_FILE_NAME)
+    CombinatorConfig.OMP_DIRECTIVES_FILE_PATH = os.path.join(params_dir, CombinatorConfig.OMP_DIRECTIVES_FILE_NAME)
+    for file_path, params in ((CombinatorConfig.COMPILATION_PARAMS_FILE_PATH, compilation_params),
+                              (CombinatorConfig.OMP_RTL_PARAMS_FILE_PATH, []),
+                              (CombinatorConfig.OMP_DIRECTIVES_FILE_PATH, omp_directives_params)):
+        with open(file_path, 'w') as fp:
+            json.dump(params, fp)
+
+
+def count_failed_combinations(db, combinations_ids: list):
+    failed_combinations = 0
+    for combination_id in combinations_ids:
+        combination_results = db.get_combination_results(combination_id)
+        if not combination_results or combination_results.get('error'):
+            failed_combinations += 1
+    return failed_combinations
+
+
+def run_benchmark(num_of_combinations: int, execution_backend: str, database_type: str, output_dir: str,
+                  slurm_array_size: int, poll_interval: float, binary_compiler_flags: list,
+                  async_orchestration: bool = False,
+                  validation_mode: str = CombinationValidatorConfig.DEFAULT_VALIDATION_MODE):
+    benchmark_dir = tempfile.mkdtemp(prefix='scheduler_throughput_', dir=output_dir if output_dir else None)
+    input_dir = os.path.join(benchmark_dir, 'input')
+    params_dir = os.path.join(benchmark_dir, 'params')
+    os.makedirs(input_dir)
+    os.makedirs(params_dir)
+    with open(os.path.join(input_dir, MAIN_FILE_NAME), 'w') as fp:
+        fp.write(MAIN_FILE_CODE)
+    write_params_files(params_dir, num_of_combinations)
+    parallelizers[BenchmarkParallelizer.NAME] = BenchmarkParallelizer
+
+    compar_obj = Compar(input_dir=input_dir,
+                        output_dir=benchmark_dir,
+                        project_name='scheduler_throughput_benchmark',
+                        main_file_rel_path=MAIN_FILE_NAME,
+                        binary_compiler_type='gcc',
+                        binary_compiler_flags=binary_compiler_flags,
+                        mode=ComparMode.OVERWRITE,
+                        slurm_array_size=slurm_array_size,
+                        execution_backend=execution_backend,
+                        async_orchestration=async_orchestration,
+                        validation_mode=validation_mode,
+                        database_type=database_type,
+                        log_level=logger.NO_OUTPUT)
+    try:
+        if isinstance(compar_obj.execution_backend, SlurmBackend):
+            compar_obj.execution_backend.slurm_monitor.poll_interval = poll_interval
+        compar_obj.fragment_and_add_timers()
+        compar_obj.run_serial()
+        combinations_ids = [combination['_id'] for combination in compar_obj.db.combinations_iterator()]
+
+        start_self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        start_children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start_time = time.time()
+        compar_obj.run_parallel_combinations()
+        elapsed_time = time.time() - start_time
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+        result = {
+            'combinations': num_of_combinations,
+            'seconds': elapsed_time,
+            'jobs_per_second': num_of_combinations / elapsed_time,
+            'driver_cpu_seconds': self_usage.ru_utime + self_usage.ru_stime - start_self_usage.ru_utime -
+            start_self_usage.ru_stime,
+            'children_cpu_seconds': children_usage.ru_utime + children_usage.ru_stime -
+            start_children_usage.ru_utime - start_children_usage.ru_stime,
+            'failed_combinations': count_failed_combinations(compar_obj.db, combinations_ids)
+        }
+        if isinstance(compar_obj.execution_backend, SlurmBackend):
+            result['squeue_queries'] = compar_obj.execution_backend.slurm_monitor.num_of_queries
+            result['sacct_queries'] = compar_obj.execution_backend.slurm_monitor.num_of_accounting_queries
+    finally:
+        compar_obj.results_writer.stop()
+        compar_obj.db.delete_all_related_collections()
+        compar_obj.db.close_connection()
+        shutil.rmtree(benchmark_dir, ignore_errors=True)
+    return result
+
+
+def main():
+    arg_parser = ArgumentParser(description='Scheduler throughput benchmark: the driver overhead of running many '
+                                            'short combinations (submission, polling and results ingestion)')
+    arg_parser.add_argument('-combinations', '--num_of_combinations', type=int, default=1000)
+    arg_parser.add_argument('-backend', '--execution_backend', default=SlurmBackend.NAME,
+                            choices=execution_backends.keys())
+    arg_parser.add_argument('-fake_slurm', '--use_fake_slurm', action='store_true',
+                            help='Run the slurm jobs on this machine with the bundled sbatch, squeue and sacct '
+                                 'stand-in (benchmarks/fake_slurm.py)')
+    arg_parser.add_argument('-latency', '--fake_slurm_queue_latency', type=float, default=0.5,
+                            help='The seconds a job of the fake slurm waits in the queue')
+    arg_parser.add_argument('-nodes', '--fake_slurm_num_of_nodes', type=int, default=None,
+                            help='The number of jobs the fake slurm runs at once (default: the number of cpus)')
+    arg_parser.add_argument('-jobs', '--jobs_quantity_at_once', type=int, default=Compar.NUM_OF_THREADS)
+    arg_parser.add_argument('-compilation_jobs', '--compilation_jobs_quantity_at_once', type=int,
+                            default=Compar.NUM_OF_COMPILATION_THREADS)
+    arg_parser.add_argument('-async', '--async_orchestration', action='store_true')
+    arg_parser.add_argument('-max_in_flight', '--max_in_flight_jobs', type=int, default=Compar.MAX_IN_FLIGHT_JOBS,
+                            help='The number of slurm jobs in flight at once with -async')
+    arg_parser.add_argument('-validation', '--validation_mode',
+                            default=CombinationValidatorConfig.DEFAULT_VALIDATION_MODE,
+                            choices=CombinationValidatorConfig.VALIDATION_MODES.keys())
+    arg_parser.add_argument('-array_size', '--slurm_array_size', type=int, default=1)
+    arg_parser.add_argument('-poll', '--poll_interval', type=float, default=ExecuteJobConfig.CHECK_SQUEUE_SECOND_TIME,
+                            help='The seconds between the squeue queries')
+    arg_parser.add_argument('-db', '--database_type', default=SqliteDatabase.NAME, choices=databases.keys())
+    arg_parser.add_argument('-address', '--server_address', default=DatabaseConfig.SERVER_ADDRESS)
+    arg_parser.add_argument('-output_dir', '--output_directory_path', default='',
+                            help='Directory of the benchmark files (default: a temporary directory)')
+    arg_parser.add_argument('-flags', '--binary_compiler_flags', nargs='*', default=['-fopenmp'])
+    args = arg_parser.parse_args()
+    DatabaseConfig.SERVER_ADDRESS = args.server_address
+    Compar.set_num_of_threads(args.jobs_quantity_at_once)
+    Compar.set_num_of_compilation_threads(args.compilation_jobs_quantity_at_once)
+    Compar.set_max_in_flight_jobs(args.max_in_flight_jobs)
+    if args.use_fake_slurm:
+        os.environ['PATH'] = FAKE_SLURM_BIN_DIR_PATH + os.pathsep + os.environ['PATH']
+        os.environ['FAKE_SLURM_DIR'] = tempfile.mkdtemp(prefix='fake_slurm_')
+        os.environ['FAKE_SLURM_QUEUE_LATENCY'] = str(args.fake_slurm_queue_latency)
+        if args.fake_slurm_num_of_nodes:
+            os.environ['FAKE_SLURM_NUM_OF_NODES'] = str(args.fake_slurm_num_of_nodes)
+
+    try:
+        result = run_benchmark(args.num_of_combinations, args.execution_backend, args.database_type,
+                               args.output_directory_path, args.slurm_array_size, args.poll_interval,
+                               args.binary_compiler_flags, args.async_orchestration, args.validation_mode)
+    finally:
+        if args.use_fake_slurm:
+            shutil.rmtree(os.environ['FAKE_SLURM_DIR'], ignore_errors=True)
+    print(f"{result['combinations']} combinations in {result['seconds']:.2f} seconds "
+          f"({result['jobs_per_second']:.2f} jobs/second)")
+    print(f"driver cpu time: {result['driver_cpu_seconds']:.2f} seconds "
+          f"({result['driver_cpu_seconds'] / result['combinations'] * 1000:.2f} ms/job), "
+          f"children cpu time: {result['children_cpu_seconds']:.2f} seconds")
+    if 'squeue_queries' in result:
+        print(f"{result['squeue_queries']} squeue queries, {result['sacct_queries']} sacct queries")
+    if result['failed_combinations']:
+        print(f"{result['failed_combinations']} combinations failed, see the log of a combination for the reason")
+
+
+if __name__ == '__main__':
+    main()
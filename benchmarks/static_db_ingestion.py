@@ -0,0 +1,49 @@
+import time
+from argparse import ArgumentParser
+from database import Database
+from databases_mapper import databases
+from globals import ComparMode, DatabaseConfig
+
+
+def run_benchmark(database_type: str, project_name: str, output_dir: str, chunk_sizes: list):
+    results = []
+    db = databases[database_type](project_name, ComparMode.OVERWRITE, output_dir=output_dir)
+    try:
+        for chunk_size in chunk_sizes:
+            Database.set_bulk_write_chunk_size(chunk_size)
+            db.delete_all_related_collections()  # force regeneration of the static DB
+            start_time = time.time()
+            db.create_static_db()
+            elapsed_time = time.time() - start_time
+            num_of_combinations = db.num_of_combinations - 2  # without serial and final
+            results.append({'chunk_size': chunk_size,
+                            'combinations': num_of_combinations,
+                            'seconds': elapsed_time,
+                            'combinations_per_second': num_of_combinations / elapsed_time})
+    finally:
+        db.delete_all_related_collections()
+        db.close_connection()
+    return results
+
+
+def main():
+    arg_parser = ArgumentParser(description='Static DB ingestion throughput benchmark')
+    arg_parser.add_argument('-db', '--database_type', default=DatabaseConfig.DEFAULT_DATABASE_TYPE,
+                            choices=databases.keys())
+    arg_parser.add_argument('-address', '--server_address', default=DatabaseConfig.SERVER_ADDRESS)
+    arg_parser.add_argument('-output_dir', '--output_directory_path', default='',
+                            help='Directory of the local database file')
+    arg_parser.add_argument('-name', '--project_name', default='static_db_ingestion_benchmark')
+    arg_parser.add_argument('-chunks', '--chunk_sizes', nargs='*', type=int,
+                            default=[1, 100, DatabaseConfig.BULK_WRITE_CHUNK_SIZE])
+    args = arg_parser.parse_args()
+    DatabaseConfig.SERVER_ADDRESS = args.server_address
+
+    for result in run_benchmark(args.database_type, args.project_name, args.output_directory_path,
+                                args.chunk_sizes):
+        print(f"chunk size {result['chunk_size']}: {result['combinations']} combinations in "
+              f"{result['seconds']:.2f} seconds ({result['combinations_per_second']:.1f} combinations/second)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+import os
+import shutil
+import hashlib
+import traceback
+from threading import Lock, get_ident
+import logger
+from globals import GlobalsConfig, MakefileConfig
+
+
+class BinaryCache:
+    """
+    Cache of the compiled executables, keyed by the content of the combination folder (the final sources, after the
+    injections) and by the build arguments (compiler, version, flags or makefile commands).
+    An entry is the executable and the time it took to build it, so the compilation time saved by the hits is known.
+    """
+    TIME_ENTRY_EXTENSION = '.time'
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        self.lock = Lock()
+        self.entries_locks = {}
+        self.files_digests = {}  # {(<device>, <inode>, <size>, <mtime>): <digest>}, linked files are hashed once
+        self.hits = 0
+        self.misses = 0
+        self.saved_compilation_time = 0.0
+
+    def get_file_digest(self, file_path: str):
+        stat = os.stat(file_path)
+        file_stat_key = (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            digest = self.files_digests.get(file_stat_key)
+        if digest is None:
+            file_hash = hashlib.sha3_384()
+            with open(file_path, 'rb') as fp:
+                for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+                    file_hash.update(chunk)
+            digest = file_hash.hexdigest()
+            with self.lock:
+                self.files_digests[file_stat_key] = digest
+        return digest
+
+    def get_key(self, folder_path: str, excluded_files: list = None, **build_args):
+        excluded_files = excluded_files if excluded_files else []
+        key = hashlib.sha3_384(str(sorted(build_args.items())).encode())
+        for root, dirs, files in os.walk(folder_path, followlinks=True):
+            dirs.sort()
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                rel_path = os.path.relpath(file_path, folder_path)
+                if rel_path in excluded_files or file.endswith(GlobalsConfig.LOG_EXTENSION):
+                    continue
+                key.update(f'{rel_path}:{self.get_file_digest(file_path)}'.encode())
+        return key.hexdigest()
+
+    def get_entry_lock(self, key: str):
+        """holding the entry lock, the combinations that share the entry are not compiled concurrently"""
+        with self.lock:
+            return self.entries_locks.setdefault(key, Lock())
+
+    def restore(self, key: str, exe_path: str):
+        """links (or copies) the cached executable to exe_path, returns False on a miss"""
+        entry_path = os.path.join(self.cache_dir, f'{key}{MakefileConfig.EXE_FILE_EXTENSION}')
+        if not os.path.isfile(entry_path):
+            with self.lock:
+                self.misses += 1
+            return False
+        if os.path.lexists(exe_path):
+            os.remove(exe_path)
+        try:
+            os.link(entry_path, exe_path)
+        except OSError:
+            shutil.copy2(entry_path, exe_path)
+        compilation_time = 0.0
+        try:
+            with open(os.path.join(self.cache_dir, f'{key}{BinaryCache.TIME_ENTRY_EXTENSION}'), 'r') as fp:
+                compilation_time = float(fp.read())
+        except (OSError, ValueError):
+            pass
+        with self.lock:
+            self.hits += 1
+            self.saved_compilation_time += compilation_time
+        return True
+
+    def store(self, key: str, exe_path: str, compilation_time: float):
+        entry_path = os.path.join(self.cache_dir, f'{key}{MakefileConfig.EXE_FILE_EXTENSION}')
+        if os.path.isfile(entry_path):
+            return
+        temp_entry_path = os.path.join(self.cache_dir, f'{key}_{os.getpid()}_{get_ident()}.tmp')
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(os.path.join(self.cache_dir, f'{key}{BinaryCache.TIME_ENTRY_EXTENSION}'), 'w') as fp:
+                fp.write(str(compilation_time))
+            shutil.copy2(exe_path, temp_entry_path)
+            os.rename(temp_entry_path, entry_path)
+        except OSError as e:
+            if not os.path.isfile(entry_path):  # otherwise another thread has stored the same entry first
+                logger.info_error(f'Exception at {BinaryCache.__name__}: cannot store {key} entry: {e}')
+                logger.debug_error(f'{traceback.format_exc()}')
+        finally:
+            if os.path.exists(temp_entry_path):
+                os.remove(temp_entry_path)
+
+    def get_hit_rate(self):
+        num_of_lookups = self.hits + self.misses
+        return self.hits / num_of_lookups if num_of_lookups else 0.0
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def log_statistics(self):
+        logger.info(f'Binary cache: {self.hits} hits, {self.misses} misses (hit rate {self.get_hit_rate():.2%}), '
+                    f'{self.saved_compilation_time:.2f} seconds of compilation saved')
@@ -1,15 +1,79 @@
 import enum
 import os
+import sys
+import inspect
+import importlib.util
+import traceback
+from threading import Lock
 from subprocess import CalledProcessError
+import pytest
 from subprocess_handler import run_subprocess
 import logger
-from globals import CombinationValidatorConfig
+from globals import CombinationValidatorConfig, ValidationMode
 
 
 class CombinationValidator:
     UNIT_TEST_FILE_NAME = CombinationValidatorConfig.UNIT_TEST_FILE_NAME
     UNIT_TEST_DEFAULT_PATH = os.path.join(CombinationValidatorConfig.UNIT_TEST_DEFAULT_DIR_PATH, UNIT_TEST_FILE_NAME)
     UNIT_TEST_NAME = CombinationValidatorConfig.UNIT_TEST_NAME
+    VALIDATION_MODE = CombinationValidatorConfig.VALIDATION_MODES[CombinationValidatorConfig.DEFAULT_VALIDATION_MODE]
+    test_functions = {}  # {<test file path>: <test function, or None if the test runs by pytest>}
+    test_functions_lock = Lock()
+
+    @staticmethod
+    def set_validation_mode(validation_mode: ValidationMode):
+        CombinationValidator.VALIDATION_MODE = validation_mode
+
+    @staticmethod
+    def get_test_function(test_file_path: str):
+        """
+        Imports the test file once and returns its test function, to call it in the process instead of running pytest.
+        Returns None if the test must run by pytest: the file cannot be imported, or the test needs fixtures other
+        than working_dir and output_file_name.
+        """
+        test_file_path = os.path.abspath(test_file_path)
+        with CombinationValidator.test_functions_lock:
+            if test_file_path in CombinationValidator.test_functions:
+                return CombinationValidator.test_functions[test_file_path]
+            test_function = None
+            try:
+                module_name = f'compar_{CombinationValidator.UNIT_TEST_NAME}_{len(CombinationValidator.test_functions)}'
+                spec = importlib.util.spec_from_file_location(module_name, test_file_path)
+                module = importlib.util.module_from_spec(spec)
+                test_dir_path = os.path.dirname(test_file_path)
+                if test_dir_path not in sys.path:  # as pytest does, the test may import the modules next to it
+                    sys.path.insert(0, test_dir_path)
+                spec.loader.exec_module(module)
+                function = getattr(module, CombinationValidator.UNIT_TEST_NAME, None)
+                unit_test_arguments = set(CombinationValidatorConfig.UNIT_TEST_ARGUMENTS)
+                if callable(function) and set(inspect.signature(function).parameters) <= unit_test_arguments:
+                    test_function = function
+                else:
+                    logger.verbose(f"{CombinationValidator.__name__}: test '{CombinationValidator.UNIT_TEST_NAME}' "
+                                   f"cannot be called directly, it runs by pytest.")
+            except Exception as ex:
+                logger.info_error(f"{CombinationValidator.__name__}: cannot import {test_file_path}, "
+                                  f"test '{CombinationValidator.UNIT_TEST_NAME}' runs by pytest.\n{ex}")
+                logger.debug_error(f'{traceback.format_exc()}')
+            CombinationValidator.test_functions[test_file_path] = test_function
+            return test_function
+
+    @staticmethod
+    def call_test_function(test_function, working_dir: str = "", output_file_name: str = ""):
+        arguments = {'working_dir': working_dir, 'output_file_name': output_file_name}
+        try:
+            test_function(**{name: arguments[name] for name in inspect.signature(test_function).parameters})
+        except pytest.skip.Exception:
+            pass  # pytest exits with OK when the test is skipped
+        except KeyboardInterrupt:
+            raise
+        except BaseException as ex:  # e.g. pytest.fail(), pytest.exit() or sys.exit() fail only the test, as in pytest
+            logger.info_error(f"{CombinationValidator.__name__}: "
+                              f"test '{CombinationValidator.UNIT_TEST_NAME}' failed.")
+            logger.debug(f"{CombinationValidator.__name__}: {type(ex).__name__}: {ex}\n{traceback.format_exc()}")
+            return ExitCode.TESTS_FAILED
+        logger.verbose(f"{CombinationValidator.__name__}: test '{CombinationValidator.UNIT_TEST_NAME}' passed.")
+        return ExitCode.OK
 
     @staticmethod
     def trigger_test_output_test(test_file_path: str, working_dir: str = "", output_file_name: str = "",
@@ -46,6 +110,11 @@ class CombinationValidator:
 
     @staticmethod
     def run_unit_test(test_file_path: str, working_dir: str = "", output_file_name: str = ""):
+        if CombinationValidator.VALIDATION_MODE == ValidationMode.IN_PROCESS:
+            test_function = CombinationValidator.get_test_function(test_file_path)
+            if test_function:
+                return CombinationValidator.call_test_function(test_function, working_dir,
+                                                               output_file_name) == ExitCode.OK
         return CombinationValidator.trigger_test_output_test(
             test_file_path, working_dir, output_file_name) == ExitCode.OK
 
@@ -53,6 +122,9 @@ class CombinationValidator:
     def check_if_test_exists(test_file_path: str):
         logger.verbose(f"{CombinationValidator.__name__}: Checking the existence of test: '"
                        f"{CombinationValidator.UNIT_TEST_NAME}'.")
+        if CombinationValidator.VALIDATION_MODE == ValidationMode.IN_PROCESS and \
+                CombinationValidator.get_test_function(test_file_path):
+            return True
         return CombinationValidator.trigger_test_output_test(
             test_file_path, check_for_existence=True) not in [ExitCode.NO_TESTS_COLLECTED, ExitCode.USAGE_ERROR]
 
@@ -1,75 +1,169 @@
+import bisect
+import hashlib
 import itertools
 import json
+from collections import namedtuple
 from globals import CombinatorConfig
 
+RawCombination = namedtuple('RawCombination', ['compiler_name', 'compilation_params', 'omp_rtl_params',
+                                               'omp_directives_params'])
+
+
+class CombinationsSpace:
+    """
+    Mixed-radix addressing of the combinations search space.
+    Every combination is identified by an integer index in range(len(space)), the compilers blocks are laid one
+    after the other and inside each block every parameter axis is a digit (the last omp directive axis is the least
+    significant one). The indexes order is the same as the iteration order of the space.
+    """
+
+    def __init__(self):
+        omp_rtl_axes = generate_omp_rtl_axes()
+        omp_directives_axes = generate_omp_directive_axes()
+        self.blocks = []
+        self.blocks_offsets = []
+        self.size = 0
+        for compiler, compilation_axes in generate_compilation_axes():
+            axes = compilation_axes + omp_rtl_axes + omp_directives_axes
+            self.blocks.append((compiler, axes, len(compilation_axes), len(omp_rtl_axes)))
+            self.blocks_offsets.append(self.size)
+            self.size += size_of_product(axes)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for compiler, axes, num_of_compilation_axes, num_of_omp_rtl_axes in self.blocks:
+            for digits_values in itertools.product(*axes):
+                yield CombinationsSpace.__to_raw_combination(compiler, digits_values, num_of_compilation_axes,
+                                                             num_of_omp_rtl_axes)
+
+    def decode(self, index: int):
+        if index < 0 or index >= self.size:
+            raise IndexError(f'Combination index {index} is out of range (search space size is {self.size})')
+        block_index = bisect.bisect_right(self.blocks_offsets, index) - 1
+        compiler, axes, num_of_compilation_axes, num_of_omp_rtl_axes = self.blocks[block_index]
+        local_index = index - self.blocks_offsets[block_index]
+        digits_values = []
+        for axis in reversed(axes):
+            local_index, digit = divmod(local_index, len(axis))
+            digits_values.append(axis[digit])
+        digits_values.reverse()
+        return CombinationsSpace.__to_raw_combination(compiler, digits_values, num_of_compilation_axes,
+                                                      num_of_omp_rtl_axes)
+
+    def iterate_range(self, start: int = 0, stop: int = None):
+        if stop is None or stop > self.size:
+            stop = self.size
+        for index in range(max(start, 0), stop):
+            yield index, self.decode(index)
+
+    def get_combination(self, index: int):
+        combination = raw_combination_to_dict(self.decode(index))
+        combination['_id'] = generate_combination_id(combination)
+        return combination
+
+    @staticmethod
+    def __to_raw_combination(compiler: str, digits_values: list or tuple, num_of_compilation_axes: int,
+                             num_of_omp_rtl_axes: int):
+        omp_rtl_start = num_of_compilation_axes
+        omp_directives_start = num_of_compilation_axes + num_of_omp_rtl_axes
+        return RawCombination(compiler,
+                              tuple(filter(None, digits_values[:omp_rtl_start])),  # filter empty elements
+                              tuple(filter(None, digits_values[omp_rtl_start:omp_directives_start])),
+                              tuple(filter(None, digits_values[omp_directives_start:])))
 
-def generate_combinations():
-    omp_rtl_params = []
-    combinations = []
-    with open(CombinatorConfig.OMP_RTL_PARAMS_FILE_PATH, 'r') as fp:
-        omp_rtl_array = json.load(fp)
-    for param in omp_rtl_array:
-        omp_rtl_params.append(generate_omp_rtl_params(param))
-    omp_rtl_params = mult_lists(omp_rtl_params)
-
-    omp_directives_params = generate_omp_directive_params()
 
+def generate_combinations():
+    for raw_combination in iterate_combinations():
+        yield raw_combination_to_dict(raw_combination)
+
+
+def iterate_combinations():
+    """
+    Lazily yields every combination of the search space as a RawCombination.
+    The order is the same as the order of the full cartesian product: compiler, compilation params,
+    omp rtl params and omp directives params (the last one changes the fastest).
+    """
+    return iter(CombinationsSpace())
+
+
+def count_combinations():
+    return len(CombinationsSpace())
+
+
+def generate_combination_id(combination: dict):
+    fields = [f'compiler_name:{combination["compiler_name"]}']
+    omp_rtl_params = combination['parameters']['omp_rtl_params']
+    for omp_rtl_param in omp_rtl_params:
+        fields.append(f'omp_rtl_params:{omp_rtl_param}')
+    omp_directives_params = combination['parameters']['omp_directives_params']
+    for omp_directives_param in omp_directives_params:
+        fields.append(f'omp_directives_params:{omp_directives_param}')
+    compilation_params = combination['parameters']['compilation_params']
+    for compilation_param in compilation_params:
+        fields.append(f'compilation_params:{compilation_param}')
+    fields.sort()
+    return hashlib.sha3_384(str(fields).encode()).hexdigest()
+
+
+def generate_search_space_hash():
+    search_space_hash = hashlib.sha3_384(f'combinator_version:{CombinatorConfig.COMBINATOR_VERSION}'.encode())
+    for params_file_path in (CombinatorConfig.COMPILATION_PARAMS_FILE_PATH, CombinatorConfig.OMP_RTL_PARAMS_FILE_PATH,
+                             CombinatorConfig.OMP_DIRECTIVES_FILE_PATH):
+        with open(params_file_path, 'rb') as fp:
+            search_space_hash.update(fp.read())
+    return search_space_hash.hexdigest()
+
+
+def raw_combination_to_dict(raw_combination: RawCombination):
+    return {
+        "compiler_name": raw_combination.compiler_name,
+        "parameters": {
+            "omp_rtl_params": list(raw_combination.omp_rtl_params),
+            "omp_directives_params": list(raw_combination.omp_directives_params),
+            "compilation_params": list(raw_combination.compilation_params)
+        }
+    }
+
+
+def generate_compilation_axes():
     with open(CombinatorConfig.COMPILATION_PARAMS_FILE_PATH, 'r') as fp:
         compilation_flags_array = json.load(fp)
+    compilers_axes = []
     for comb in compilation_flags_array:
         compiler = comb["compiler"]
-        essential_valued_params_list = generate_valued_params_list(comb["essential_params"]["valued"], True)
-        essential_valued_params_list = mult_lists(essential_valued_params_list)
-        essential_toggle_params_list = generate_toggle_params_list(comb["essential_params"]["toggle"], True)
-        essential_toggle_params_list = mult_lists(essential_toggle_params_list)
-
-        optional_valued_params_list = generate_valued_params_list(comb["optional_params"]["valued"])
-        optional_valued_params_list = mult_lists(optional_valued_params_list)
-        optional_toggle_params_list = generate_toggle_params_list(comb["optional_params"]["toggle"])
-        optional_toggle_params_list = mult_lists(optional_toggle_params_list)
-
-        all_compilation_params = [essential_valued_params_list, essential_toggle_params_list,
-                                  optional_valued_params_list, optional_toggle_params_list]
-        all_compilation_params = mult_lists(list(filter(None, all_compilation_params)))  # filter empty lists
-
-        for compile_comb in all_compilation_params:
-            for omp_rtl_comb in omp_rtl_params:
-                for omp_directives_comb in omp_directives_params:
-                    if not omp_rtl_comb:
-                        curr_omp_rtl_comb = []
-                    else:
-                        curr_omp_rtl_comb = omp_rtl_comb.split(f"{CombinatorConfig.PARAMS_SEPARATOR}")
-                    if not compile_comb:
-                        curr_compile_comb = []
-                    else:
-                        curr_compile_comb = compile_comb.split(f"{CombinatorConfig.PARAMS_SEPARATOR}")
-                    if not omp_directives_comb:
-                        curr_omp_directives_comb = []
-                    else:
-                        curr_omp_directives_comb = omp_directives_comb.split(f"{CombinatorConfig.PARAMS_SEPARATOR}")
-                    new_comb = {
-                        "compiler_name": compiler,
-                        "parameters": {
-                            "omp_rtl_params": curr_omp_rtl_comb,
-                            "omp_directives_params": curr_omp_directives_comb,
-                            "compilation_params": curr_compile_comb
-                        }
-                    }
-                    combinations.append(new_comb)
-    return combinations
-
-
-def generate_omp_directive_params():
+        params_groups = [
+            generate_valued_params_list(comb["essential_params"]["valued"], True),
+            generate_toggle_params_list(comb["essential_params"]["toggle"], True),
+            generate_valued_params_list(comb["optional_params"]["valued"]),
+            generate_toggle_params_list(comb["optional_params"]["toggle"])
+        ]
+        compilation_axes = []
+        for params_group in params_groups:
+            if size_of_product(params_group):  # filter empty groups
+                compilation_axes.extend(params_group)
+        compilers_axes.append((compiler, compilation_axes))
+    return compilers_axes
+
+
+def generate_omp_rtl_axes():
+    with open(CombinatorConfig.OMP_RTL_PARAMS_FILE_PATH, 'r') as fp:
+        omp_rtl_array = json.load(fp)
+    return [generate_omp_rtl_params(param) for param in omp_rtl_array]
+
+
+def generate_omp_directive_axes():
     with open(CombinatorConfig.OMP_DIRECTIVES_FILE_PATH, 'r') as fp:
         json_omp_directives = json.load(fp)
     parallel_directive_params = json_omp_directives['parallel']
     for_directive_params = json_omp_directives['for']
-    omp_directives_params = []
-    omp_directives_params.extend(generate_directive_list_from_json(parallel_directive_params,
-                                                                   CombinatorConfig.PARALLEL_DIRECTIVE_PREFIX))
-    omp_directives_params.extend(generate_directive_list_from_json(for_directive_params,
-                                                                   CombinatorConfig.FOR_DIRECTIVE_PREFIX))
-    return mult_lists(omp_directives_params)
+    omp_directives_axes = []
+    omp_directives_axes.extend(generate_directive_list_from_json(parallel_directive_params,
+                                                                 CombinatorConfig.PARALLEL_DIRECTIVE_PREFIX))
+    omp_directives_axes.extend(generate_directive_list_from_json(for_directive_params,
+                                                                 CombinatorConfig.FOR_DIRECTIVE_PREFIX))
+    return omp_directives_axes
 
 
 def generate_directive_list_from_json(params: dict, pragma_type: str):
@@ -148,9 +242,8 @@ def generate_omp_rtl_params(param: dict):
     return lst
 
 
-def mult_lists(lst: list):
-    mult_list = []
-    for i in itertools.product(*lst):
-        i = list(filter(None, i))  # filter empty elements
-        mult_list.append(f"{CombinatorConfig.PARAMS_SEPARATOR}".join(i))
-    return mult_list
+def size_of_product(lst: list):
+    size = 1
+    for axis in lst:
+        size *= len(axis)
+    return size
@@ -1,12 +1,16 @@
 import os
 import re
+import time
+import asyncio
 from time import sleep
+from threading import Lock
 from execute_job import ExecuteJob
 from combination import Combination
 from compilers.gcc import Gcc
 from compilers.icc import Icc
 from exceptions import UserInputError
 from job_executor import JobExecutor
+from async_job_executor import AsyncJobExecutor
 from file_formator import format_c_code
 from job import Job
 from fragmentator import Fragmentator
@@ -16,12 +20,20 @@ from exceptions import FileError
 from timer import Timer
 import exceptions as e
 from database import Database
+from databases_mapper import databases
+from results_writer import ResultsWriter
+from workspace import create_workspace
+from parallelizer_cache import ParallelizerCache
+from binary_cache import BinaryCache
+from output_validator import OutputValidator
+from execution_backends_mapper import execution_backends
 from compilers.makefile import Makefile
 import traceback
 import logger
 from combination_validator import CombinationValidator
 from assets.parallelizers_mapper import parallelizers
-from globals import ComparMode, ComparConfig, CombinatorConfig, LogPhrases
+from globals import ComparMode, ComparConfig, CombinatorConfig, DatabaseConfig, LogPhrases, WorkspaceConfig, \
+    MakefileConfig, ExecuteJobConfig, CombinationValidatorConfig, OutputValidatorConfig, GlobalsConfig
 import copy
 
 
@@ -29,11 +41,21 @@ class Compar:
     COMPAR_COMBINATION_FOLDER_NAME = Database.COMPAR_COMBINATION_ID
     FINAL_RESULTS_FOLDER_NAME = Database.FINAL_RESULTS_COMBINATION_ID
     NUM_OF_THREADS = ComparConfig.NUM_OF_THREADS
+    NUM_OF_COMPILATION_THREADS = ComparConfig.NUM_OF_COMPILATION_THREADS
+    MAX_IN_FLIGHT_JOBS = ComparConfig.MAX_IN_FLIGHT_JOBS
 
     @staticmethod
     def set_num_of_threads(num_of_threads: int):
         Compar.NUM_OF_THREADS = num_of_threads
 
+    @staticmethod
+    def set_num_of_compilation_threads(num_of_compilation_threads: int):
+        Compar.NUM_OF_COMPILATION_THREADS = num_of_compilation_threads
+
+    @staticmethod
+    def set_max_in_flight_jobs(max_in_flight_jobs: int):
+        Compar.MAX_IN_FLIGHT_JOBS = max_in_flight_jobs
+
     @staticmethod
     def inject_c_code_to_loop(c_file_path: str, loop_id: str, c_code_to_inject: str):
         e.assert_file_exist(c_file_path)
@@ -130,7 +152,7 @@ class Compar:
 
     @staticmethod
     def update_summary_file(dir_path: str, best_runtime_combination_id: str, total_rum_time: float,
-                            best_combination=None):
+                            best_combination=None, binary_cache: BinaryCache = None):
         file_path = os.path.join(dir_path, ComparConfig.SUMMARY_FILE_NAME)
         with open(file_path, 'a', newline='') as file:
             writer = csv.writer(file)
@@ -146,6 +168,12 @@ class Compar:
                                  best_combination.get_parameters().get_omp_directives_params()])
                 writer.writerow([""])
             writer.writerow(['Total run time:', str(total_rum_time)])
+            if binary_cache:
+                writer.writerow([""])
+                writer.writerow(['Binary cache hits:', str(binary_cache.hits)])
+                writer.writerow(['Binary cache misses:', str(binary_cache.misses)])
+                writer.writerow(['Binary cache hit rate:', f'{binary_cache.get_hit_rate():.2%}'])
+                writer.writerow(['Compilation time saved (seconds):', f'{binary_cache.saved_compilation_time:.2f}'])
 
     def __init__(self,
                  input_dir: str,
@@ -172,9 +200,23 @@ class Compar:
                  code_with_markers: bool = False,
                  clear_db: bool = False,
                  multiple_combinations: int = 1,
+                 repetitions_in_single_allocation: bool = False,
+                 slurm_array_size: int = 1,
+                 execution_backend: str = ExecuteJobConfig.DEFAULT_EXECUTION_BACKEND,
+                 async_orchestration: bool = False,
+                 validation_mode: str = CombinationValidatorConfig.DEFAULT_VALIDATION_MODE,
+                 validate_output: bool = False,
+                 output_files: list = None,
+                 output_relative_tolerance: float = OutputValidatorConfig.DEFAULT_RELATIVE_TOLERANCE,
+                 output_absolute_tolerance: float = OutputValidatorConfig.DEFAULT_ABSOLUTE_TOLERANCE,
+                 ignored_output_lines: list = None,
+                 database_type: str = DatabaseConfig.DEFAULT_DATABASE_TYPE,
+                 database_pool_size: int = DatabaseConfig.CONNECTION_POOL_SIZE,
+                 workspace_mode: str = WorkspaceConfig.DEFAULT_MODE,
+                 linked_files: list = None,
                  log_level: int = logger.DEFAULT_LOG_LEVEL):
 
-        self.db = Database(project_name, mode)
+        self.db = databases[database_type](project_name, mode, output_dir=output_dir, pool_size=database_pool_size)
 
         working_directory = os.path.join(output_dir, self.db.get_project_name())
         if mode == ComparMode.CONTINUE:
@@ -224,14 +266,24 @@ class Compar:
         self.include_dirs_list = include_dirs_list
         self.time_limit = time_limit
         self.slurm_partition = slurm_partition
-        self.parallel_jobs_pool_executor = JobExecutor(Compar.NUM_OF_THREADS)
+        self.async_orchestration = async_orchestration
         self.mode = mode
         self.code_with_markers = code_with_markers
         self.clear_db = clear_db
         self.multiple_combinations = multiple_combinations
+        self.repetitions_in_single_allocation = repetitions_in_single_allocation
+        self.workspace_mode = WorkspaceConfig.MODES[workspace_mode]
+        self.linked_files_patterns = linked_files if linked_files else WorkspaceConfig.DEFAULT_LINKED_FILES_PATTERNS
+        self.workspaces_bytes_copied = 0
+        self.workspaces_lock = Lock()
+        # {<binary fingerprint>: {'combination_id': <id>, 'results': <dict>, 'duplicates': [<id>, ...]}}
+        self.executed_binaries = {}
+        self.executed_binaries_lock = Lock()
+        self.num_of_skipped_duplicates = 0
 
         # Unit test
         self.test_file_path = test_file_path
+        CombinationValidator.set_validation_mode(CombinationValidatorConfig.VALIDATION_MODES[validation_mode])
         e.assert_file_exist(self.test_file_path)
         e.assert_test_file_name(os.path.basename(self.test_file_path))
         e.assert_test_file_function_name(self.test_file_path)
@@ -248,6 +300,16 @@ class Compar:
 
         self.combinations_dir = os.path.join(working_directory, ComparConfig.COMBINATIONS_FOLDER_NAME)
         self.__create_directories_structure(input_dir)
+        self.parallelizer_cache = ParallelizerCache(
+            os.path.join(working_directory, ComparConfig.PARALLELIZER_CACHE_FOLDER_NAME), self.original_files_dir,
+            self.workspace_mode, self.linked_files_patterns)
+        self.binary_cache = BinaryCache(os.path.join(working_directory, ComparConfig.BINARY_CACHE_FOLDER_NAME))
+        # the outputs of the combinations are compared to the output of the serial combination
+        self.output_validator = None
+        if validate_output:
+            self.output_validator = OutputValidator(
+                os.path.join(working_directory, ComparConfig.REFERENCE_OUTPUT_FOLDER_NAME), output_files,
+                output_relative_tolerance, output_absolute_tolerance, ignored_output_lines)
 
         # Compilers variables
         self.relative_c_file_list = self.make_relative_c_file_list(self.original_files_dir)
@@ -255,9 +317,7 @@ class Compar:
             file_paths = [file['file_full_path'] for file in self.make_absolute_file_list(self.original_files_dir)]
             self.remove_optimal_combinations_details(file_paths)
         self.binary_compiler_type = binary_compiler_type
-        self.parallelizers = dict()
-        for name, ctor in parallelizers.items():
-            self.parallelizers[name] = ctor("", include_dirs_list=self.include_dirs_list, extra_files=extra_files)
+        self.extra_files = extra_files
 
         # Compiler flags
         self.user_binary_compiler_flags = binary_compiler_flags
@@ -273,15 +333,31 @@ class Compar:
 
         # SLURM
         self.slurm_parameters = slurm_parameters
+        # the asynchronous executor runs the jobs as coroutines, a job of a backend that waits for it in the event loop
+        # does not hold a thread, so up to MAX_IN_FLIGHT_JOBS jobs are in flight instead of NUM_OF_THREADS
+        num_of_jobs = Compar.NUM_OF_THREADS
+        if async_orchestration and execution_backends[execution_backend].EVENT_LOOP_NATIVE:
+            num_of_jobs = Compar.MAX_IN_FLIGHT_JOBS
+        self.execution_backend = execution_backends[execution_backend](
+            working_directory, num_of_jobs, time_limit, slurm_partition, slurm_parameters, slurm_array_size)
+        if async_orchestration:
+            self.parallel_jobs_pool_executor = AsyncJobExecutor(Compar.NUM_OF_THREADS,
+                                                                Compar.NUM_OF_COMPILATION_THREADS,
+                                                                max_in_flight_jobs=num_of_jobs)
+        else:
+            self.parallel_jobs_pool_executor = JobExecutor(Compar.NUM_OF_THREADS, Compar.NUM_OF_COMPILATION_THREADS)
 
         # Initialization
         if not is_make_file:
             self.__initialize_binary_compiler()
 
         self.db.create_collections()
+        self.results_writer = ResultsWriter(self.db)
+        self.results_writer.start()
 
     def clear_related_collections(self):
         if self.db:
+            self.results_writer.stop()
             self.db.delete_all_related_collections()
 
     def inject_rtl_params_to_loop(self, file_dict: dict, omp_rtl_params: list):
@@ -395,8 +471,7 @@ class Compar:
 
                 # if the optimal combination is the serial => do nothing
                 if current_optimal_id != Database.SERIAL_COMBINATION_ID:
-                    current_optimal_combination = Combination.json_to_obj(
-                        self.db.get_combination_from_static_db(current_optimal_id))
+                    current_optimal_combination = self.db.get_combination_obj_from_static_db(current_optimal_id)
                     current_combination_folder_path = self.create_combination_folder(
                         ComparConfig.OPTIMAL_CURRENT_COMBINATION_FOLDER_NAME, base_dir=self.working_directory)
                     files_list = self.make_absolute_file_list(current_combination_folder_path)
@@ -425,8 +500,7 @@ class Compar:
         # remove timers code
         Timer.remove_timer_code(self.make_absolute_file_list(compar_combination_folder_path))
         # inject new code
-        Timer.inject_timer_to_compar_mixed_file(os.path.join(compar_combination_folder_path,
-                                                             self.main_file_rel_path), compar_combination_folder_path)
+        Timer.inject_timer_to_compar_mixed_file(os.path.join(compar_combination_folder_path, self.main_file_rel_path))
         self.generate_summary_file(optimal_loops_data, compar_combination_folder_path)
         try:
             logger.info('Compiling Compar combination')
@@ -438,14 +512,14 @@ class Compar:
         except Exception as ex:
             msg = f'Exception in Compar: {ex}\ngenerate_optimal_code: cannot compile compar combination'
             self.save_combination_as_failure(Database.COMPAR_COMBINATION_ID, msg, compar_combination_folder_path)
+        self.results_writer.flush()
         logger.info(LogPhrases.NEW_COMBINATION.format(Database.FINAL_RESULTS_COMBINATION_ID))
         # Check for best total runtime
         best_runtime_combination_id = self.db.get_total_runtime_best_combination()
         best_combination_obj = None
         if best_runtime_combination_id != Database.COMPAR_COMBINATION_ID:
             logger.info(f'Combination #{best_runtime_combination_id} is more optimal than Compar combination')
-            best_combination_obj = Combination.json_to_obj(
-                self.db.get_combination_from_static_db(best_runtime_combination_id))
+            best_combination_obj = self.db.get_combination_obj_from_static_db(best_runtime_combination_id)
             final_results_folder_path = self.create_combination_folder(
                 self.FINAL_RESULTS_FOLDER_NAME, self.working_directory)
             try:
@@ -475,7 +549,8 @@ class Compar:
             with open(os.path.join(final_folder_path, Timer.TOTAL_RUNTIME_FILENAME), 'w') as f:
                 f.write(str(final_combination_results['total_run_time']))
             self.update_summary_file(final_folder_path, best_runtime_combination_id,
-                                     final_combination_results['total_run_time'], best_combination_obj)
+                                     final_combination_results['total_run_time'], best_combination_obj,
+                                     self.binary_cache)
         # format all optimal files
         self.format_c_files([file_dict['file_full_path'] for file_dict in
                              self.make_absolute_file_list(final_folder_path)])
@@ -485,10 +560,19 @@ class Compar:
         logger.info(LogPhrases.FINAL_RESULTS_SUMMARY.format(final_result_speedup, final_result_runtime))
         if self.clear_db:
             self.clear_related_collections()
+        self.results_writer.stop()
+        self.db.log_combinations_cache_statistics()
+        self.parallelizer_cache.log_statistics()
+        self.binary_cache.log_statistics()
+        if not self.save_combinations_folders:
+            self.parallelizer_cache.clear()
+            self.binary_cache.clear()
         self.db.close_connection()
 
     def __get_parallel_compiler_by_name(self, compiler_name: str):
-        return self.parallelizers[compiler_name.lower()]
+        # a new instance for every task, the combinations are compiled concurrently
+        return parallelizers[compiler_name.lower()]("", include_dirs_list=self.include_dirs_list,
+                                                    extra_files=self.extra_files)
 
     def __replace_result_file_name_prefix(self, container_folder_path: str):
         for c_file_dict in self.make_absolute_file_list(container_folder_path):
@@ -501,23 +585,33 @@ class Compar:
                 f.write(file_content)
 
     def __initialize_binary_compiler(self):
+        self.binary_compiler = self.__create_binary_compiler()
+
+    def __create_binary_compiler(self):
         binary_compilers_map = {
-            Icc.NAME: Icc(version=self.binary_compiler_version),
-            Gcc.NAME: Gcc(version=self.binary_compiler_version)
+            Icc.NAME: Icc,
+            Gcc.NAME: Gcc
         }
-        self.binary_compiler = binary_compilers_map[self.binary_compiler_type.lower()]
+        return binary_compilers_map[self.binary_compiler_type.lower()](version=self.binary_compiler_version)
 
     def parallel_compilation_of_one_combination(self, combination_obj: Combination, combination_folder_path: str):
         compiler_name = combination_obj.get_compiler()
         parallel_compiler = self.__get_parallel_compiler_by_name(compiler_name)
-        parallel_compiler.initiate_for_new_task(combination_obj.get_parameters().get_compilation_params(),
-                                                combination_folder_path,
-                                                self.make_absolute_file_list(combination_folder_path))
-        pre_processing_args = dict()
-        parallel_compiler.pre_processing(**pre_processing_args)
-        parallel_compiler.compile()
-        post_processing_args = {'files_loop_dict': self.files_loop_dict}
-        parallel_compiler.post_processing(**post_processing_args)
+        compilation_params = combination_obj.get_parameters().get_compilation_params()
+        cache_key = self.parallelizer_cache.get_key(compiler_name.lower(), parallel_compiler.get_version(),
+                                                    compilation_params, include_dirs_list=self.include_dirs_list,
+                                                    extra_files=self.extra_files)
+        with self.parallelizer_cache.get_entry_lock(cache_key):
+            if not self.parallelizer_cache.restore(cache_key, combination_folder_path):
+                parallel_compiler.initiate_for_new_task(compilation_params,
+                                                        combination_folder_path,
+                                                        self.make_absolute_file_list(combination_folder_path))
+                pre_processing_args = dict()
+                parallel_compiler.pre_processing(**pre_processing_args)
+                parallel_compiler.compile()
+                post_processing_args = {'files_loop_dict': self.files_loop_dict}
+                parallel_compiler.post_processing(**post_processing_args)
+                self.parallelizer_cache.store(cache_key, combination_folder_path)
         omp_rtl_params = combination_obj.get_parameters().get_omp_rtl_params()
         omp_directive_params = combination_obj.get_parameters().get_omp_directives_params()
         for file_dict in self.make_absolute_file_list(combination_folder_path):
@@ -527,43 +621,155 @@ class Compar:
     def compile_combination_to_binary(self, combination_folder_path: str, extra_flags_list: list = None, inject=True):
         if inject:
             Timer.inject_atexit_code_to_main_file(os.path.join(combination_folder_path, self.main_file_rel_path),
-                                                  self.files_loop_dict, combination_folder_path)
+                                                  self.files_loop_dict)
+        exe_file_name = self.__get_exe_file_name(combination_folder_path)
         if self.is_make_file:
-            makefile = Makefile(combination_folder_path, self.makefile_exe_folder_rel_path,
-                                self.makefile_output_exe_file_name, self.makefile_commands)
-            makefile.make()
+            build_args = {'makefile_commands': self.makefile_commands,
+                          'exe_folder_rel_path': self.makefile_exe_folder_rel_path,
+                          'exe_file_name': self.makefile_output_exe_file_name}
         else:
             compilation_flags = self.user_binary_compiler_flags
             if extra_flags_list:
-                compilation_flags += extra_flags_list
-            self.binary_compiler.initiate_for_new_task(compilation_flags,
-                                                       combination_folder_path,
-                                                       self.main_file_rel_path)
-            self.binary_compiler.compile()
-
-    def execute_job(self, job: Job, serial_run_time: dict = None):
-        execute_job_obj = ExecuteJob(job, self.files_loop_dict, self.db, self.parallel_jobs_pool_executor.get_db_lock(),
-                                     serial_run_time, self.relative_c_file_list, self.slurm_partition,
-                                     self.test_file_path, self.time_limit)
-        execute_job_obj.run(self.slurm_parameters)
+                compilation_flags = compilation_flags + extra_flags_list
+            binary_compiler = self.__create_binary_compiler()
+            build_args = {'compiler': self.binary_compiler_type.lower(), 'version': binary_compiler.get_version(),
+                          'compilation_flags': compilation_flags, 'main_file_rel_path': self.main_file_rel_path}
+        cache_key = self.binary_cache.get_key(combination_folder_path, [exe_file_name], **build_args)
+        with self.binary_cache.get_entry_lock(cache_key):
+            exe_file_path = os.path.join(combination_folder_path, exe_file_name)
+            if self.binary_cache.restore(cache_key, exe_file_path):
+                return
+            start_time = time.time()
+            if self.is_make_file:
+                makefile = Makefile(combination_folder_path, self.makefile_exe_folder_rel_path,
+                                    self.makefile_output_exe_file_name, self.makefile_commands)
+                makefile.make()
+            else:
+                binary_compiler.initiate_for_new_task(compilation_flags, combination_folder_path,
+                                                      self.main_file_rel_path)
+                binary_compiler.compile()
+            self.binary_cache.store(cache_key, exe_file_path, time.time() - start_time)
+
+    @staticmethod
+    def __get_exe_file_name(combination_folder_path: str):
+        combination_folder_name = os.path.basename(os.path.dirname(combination_folder_path + os.path.sep))
+        return f'{combination_folder_name}{MakefileConfig.EXE_FILE_EXTENSION}'
+
+    def get_binary_fingerprint(self, combination_folder_path: str):
+        exe_file_path = os.path.join(combination_folder_path, self.__get_exe_file_name(combination_folder_path))
+        return self.binary_cache.get_file_digest(exe_file_path)
+
+    def register_executed_binary(self, combination_id: str, fingerprint: str):
+        """
+        Returns the results of the combination that runs the same binary (or an empty dict if they are not known yet),
+        or None if the combination is the first one with this binary and must run.
+        """
+        with self.executed_binaries_lock:
+            executed_binary = self.executed_binaries.get(fingerprint)
+            if executed_binary is None:
+                self.executed_binaries[fingerprint] = {'combination_id': combination_id, 'results': None,
+                                                       'duplicates': []}
+                return None
+            self.num_of_skipped_duplicates += 1
+            if executed_binary['results'] is None:
+                executed_binary['duplicates'].append(combination_id)
+                return {}
+            return executed_binary['results']
+
+    def save_executed_binary_results(self, fingerprint: str, results: dict):
+        with self.executed_binaries_lock:
+            executed_binary = self.executed_binaries[fingerprint]
+            executed_binary['results'] = results
+            duplicates, executed_binary['duplicates'] = executed_binary['duplicates'], []
+        for combination_id in duplicates:
+            self.save_duplicate_results(combination_id, results)
+
+    def save_duplicate_results(self, combination_id: str, original_results: dict):
+        duplicate_results = copy.deepcopy(original_results)
+        logger.info(f'{combination_id} combination binary is identical to the binary of '
+                    f'{duplicate_results["_id"]} combination, its results are copied')
+        duplicate_results['duplicate_of'] = duplicate_results['_id']
+        duplicate_results['_id'] = combination_id
+        self.results_writer.write(duplicate_results)
+
+    def execute_job(self, job: Job, serial_run_time: dict = None, repetitions: int = 1, bulk_submission=False):
+        self.__create_execute_job(job, serial_run_time, repetitions, bulk_submission).run()
+        return job
+
+    async def execute_job_async(self, job: Job, serial_run_time: dict = None, repetitions: int = 1,
+                                bulk_submission=False):
+        await self.__create_execute_job(job, serial_run_time, repetitions, bulk_submission).run_async()
         return job
 
+    def __create_execute_job(self, job: Job, serial_run_time: dict, repetitions: int, bulk_submission: bool):
+        is_serial_job = job.get_combination().get_combination_id() == Database.SERIAL_COMBINATION_ID
+        output_validator = self.output_validator if not is_serial_job else None
+        # the declared output files are written by every job to its own folder
+        run_in_job_folder = bool(self.output_validator and self.output_validator.output_files)
+        return ExecuteJob(job, self.files_loop_dict, self.results_writer, serial_run_time, self.relative_c_file_list,
+                          self.slurm_partition, self.test_file_path, self.time_limit, repetitions,
+                          self.repetitions_in_single_allocation, self.execution_backend, bulk_submission,
+                          output_validator, run_in_job_folder)
+
+    def compile_combination_job(self, combination_obj: Combination):
+        combination_id = str(combination_obj.get_combination_id())
+        combination_folder_path = self.create_combination_folder(combination_id)
+        try:
+            self.parallel_compilation_of_one_combination(combination_obj, combination_folder_path)
+            self.compile_combination_to_binary(combination_folder_path)
+            fingerprint = self.get_binary_fingerprint(combination_folder_path)
+        except Exception as ex:
+            logger.info_error(f'Exception at {Compar.__name__}: {ex}')
+            logger.debug_error(f'{traceback.format_exc()}')
+            self.save_combination_as_failure(combination_id, str(ex), combination_folder_path)
+            return None
+        original_results = self.register_executed_binary(combination_id, fingerprint)
+        if original_results is None:
+            job = Job(combination_folder_path, combination_obj, self.main_file_parameters)
+            job.set_binary_fingerprint(fingerprint)
+            return job
+        if original_results:
+            self.save_duplicate_results(combination_id, original_results)
+        if not self.save_combinations_folders:
+            self.__delete_combination_folder(combination_folder_path)
+        return None
+
     def run_and_save_job(self, job_obj: Job):
+        job_results = None
+        try:
+            job_obj = self.execute_job(job_obj, self.serial_run_time, self.multiple_combinations, bulk_submission=True)
+            job_results = job_obj.get_job_results()
+        except Exception as ex:
+            logger.info_error(f'Exception at {Compar.__name__}: {ex}')
+            logger.debug_error(f'{traceback.format_exc()}')
+            job_results = {'_id': str(job_obj.get_combination().get_combination_id()), 'error': str(ex)}
+        finally:
+            self.__finish_job(job_obj, job_results)
+
+    async def run_and_save_job_async(self, job_obj: Job):
+        job_results = None
         try:
-            job_obj = self.execute_job(job_obj, self.serial_run_time)
+            job_obj = await self.execute_job_async(job_obj, self.serial_run_time, self.multiple_combinations,
+                                                   bulk_submission=True)
+            job_results = job_obj.get_job_results()
         except Exception as ex:
             logger.info_error(f'Exception at {Compar.__name__}: {ex}')
             logger.debug_error(f'{traceback.format_exc()}')
+            job_results = {'_id': str(job_obj.get_combination().get_combination_id()), 'error': str(ex)}
         finally:
-            if not self.save_combinations_folders:
-                self.__delete_combination_folder(job_obj.get_directory_path())
+            await asyncio.get_running_loop().run_in_executor(None, self.__finish_job, job_obj, job_results)
+
+    def __finish_job(self, job_obj: Job, job_results: dict):
+        self.save_executed_binary_results(job_obj.get_binary_fingerprint(), job_results)
+        if not self.save_combinations_folders:
+            self.__delete_combination_folder(job_obj.get_directory_path())
 
     def save_combination_as_failure(self, combination_id: str, error_msg: str, combination_folder_path: str):
         combination_dict = {
             '_id': combination_id,
             'error': error_msg
         }
-        self.db.insert_new_combination_results(combination_dict)
+        self.results_writer.write(combination_dict)
         sleep(1)
         if not self.save_combinations_folders:
             self.__delete_combination_folder(combination_folder_path)
@@ -571,82 +777,22 @@ class Compar:
     def run_parallel_combinations(self):
         logger.info('Start to work on parallel combinations')
         self.parallel_jobs_pool_executor.create_jobs_pool()
-        # if equal to one - we don't need to concatenate the number of repetitions to combination id nor calculate avg
-        is_multiple_combinations = self.multiple_combinations > 1
         for combination_json in self.db.combinations_iterator():
-            original_combination_obj = Combination.json_to_obj(combination_json)
-            logger.info(LogPhrases.NEW_COMBINATION.format(original_combination_obj.combination_id))
-            for i in range(self.multiple_combinations):
-                if is_multiple_combinations:
-                    combination_obj = copy.deepcopy(original_combination_obj)
-                    combination_obj.combination_id = f'{combination_obj.combination_id}_{i}'
-                    logger.info(f'#{i} repetition of {original_combination_obj.combination_id} combination')
-                else:
-                    combination_obj = original_combination_obj
-                combination_folder_path = self.create_combination_folder(str(combination_obj.get_combination_id()))
-                try:
-                    self.parallel_compilation_of_one_combination(combination_obj, combination_folder_path)
-                    self.compile_combination_to_binary(combination_folder_path)
-                except Exception as ex:
-                    logger.info_error(f'Exception at {Compar.__name__}: {ex}')
-                    logger.debug_error(f'{traceback.format_exc()}')
-                    self.save_combination_as_failure(combination_obj.get_combination_id(), str(ex),
-                                                     combination_folder_path)
-                    continue
-                job = Job(combination_folder_path, combination_obj, self.main_file_parameters)
-                self.parallel_jobs_pool_executor.run_job_in_thread(self.run_and_save_job, job)
+            combination_obj = Combination.json_to_obj(combination_json)
+            logger.info(LogPhrases.NEW_COMBINATION.format(combination_obj.combination_id))
+            # the repetitions (if multiple_combinations > 1) run the same binary and are averaged by the job
+            run_func = self.run_and_save_job_async if self.async_orchestration else self.run_and_save_job
+            self.parallel_jobs_pool_executor.compile_and_run_job(self.compile_combination_job, run_func,
+                                                                 combination_obj)
         self.parallel_jobs_pool_executor.wait_and_finish_pool()
-        if is_multiple_combinations:
-            self.calculate_multiple_combinations_average()
+        self.results_writer.flush()
+        logger.info(f'{self.workspaces_bytes_copied} bytes copied to the combinations folders')
+        logger.info(f'{self.num_of_skipped_duplicates} combinations with duplicate binaries were not executed')
+        self.execution_backend.log_statistics()
+        if self.output_validator:
+            self.output_validator.log_statistics()
         logger.info('Finish to work on all the parallel combinations')
 
-    def calculate_multiple_combinations_average(self):
-        for combination_json in self.db.combinations_iterator():
-            total_results = dict()
-            combination_id = Combination.json_to_obj(combination_json).combination_id
-            logger.info(f'Calculating average of {combination_id} combination')
-            for i in range(self.multiple_combinations):
-                current_id = f'{combination_id}_{i}'
-                current_results = self.db.get_combination_results(current_id)
-                if 'error' in current_results.keys():
-                    current_results['error'] = f"from {current_id}: {current_results['error']}"
-                if not total_results:
-                    total_results = current_results
-                else:
-                    if 'error' in current_results.keys():
-                        total_results['error'] = f"{total_results.get('error', '')}\n{current_results['error']}"
-                    elif 'error' not in total_results.keys():
-                        total_results['total_run_time'] += current_results['total_run_time']
-                        for j, file in enumerate(current_results['run_time_results']):
-                            if 'dead_code_file' in file.keys():
-                                total_results['run_time_results'][j] = file
-                            elif 'dead_code_file' not in total_results['run_time_results'][j].keys():
-                                for k, loop in enumerate(file['loops']):
-                                    if 'dead_code' in loop.keys():
-                                        total_results['run_time_results'][j]['loops'][k] = loop
-                                    elif 'dead_code' not in total_results['run_time_results'][j]['loops'][k].keys():
-                                        total_results['run_time_results'][j]['loops'][k]['run_time'] += loop['run_time']
-                self.db.delete_combination(current_id)
-            if 'error' not in total_results.keys():
-                try:
-                    total_results['total_run_time'] /= self.multiple_combinations
-                except KeyError as ex:
-                    total_results['error'] = str(ex)
-                for file in total_results['run_time_results']:
-                    if 'dead_code_file' not in file.keys():
-                        for loop in file['loops']:
-                            if 'dead_code' not in loop.keys():
-                                loop['run_time'] /= self.multiple_combinations
-                                key = (file['file_id_by_rel_path'], loop['loop_label'])
-                                try:
-                                    loop['speedup'] = self.serial_run_time[key] / loop['run_time']
-                                except ZeroDivisionError:
-                                    loop['speedup'] = float('inf')
-                                except Exception as ex:  # if serial loop is dead_code and parallel is not, KeyError
-                                    total_results['error'] = str(ex)
-            total_results['_id'] = combination_id
-            self.db.insert_new_combination_results(total_results)
-
     def __create_directories_structure(self, input_dir: str):
         logger.info('Creating Compar directories structure')
         if self.mode != ComparMode.CONTINUE:
@@ -695,12 +841,15 @@ class Compar:
         serial_dir_path = os.path.join(self.combinations_dir, Database.SERIAL_COMBINATION_ID)
         if self.mode == ComparMode.CONTINUE and self.db.combination_has_results(Database.SERIAL_COMBINATION_ID):
             job_results = self.db.get_combination_results(Database.SERIAL_COMBINATION_ID)['run_time_results']
+            if self.output_validator and not self.output_validator.is_ready():
+                logger.info_error('Warning: there is no reference output of the serial combination, the outputs of '
+                                  'the combinations are not validated')
         else:
             shutil.rmtree(serial_dir_path, ignore_errors=True)
             os.mkdir(serial_dir_path)
             self.__copy_sources_to_combination_folder(serial_dir_path)
             Timer.inject_atexit_code_to_main_file(os.path.join(serial_dir_path, self.main_file_rel_path),
-                                                  self.files_loop_dict, serial_dir_path)
+                                                  self.files_loop_dict)
 
             if self.is_make_file:
                 compiler_type = Makefile.NAME
@@ -721,6 +870,14 @@ class Compar:
                       exec_file_args=self.main_file_parameters,
                       combination=combination)
             job = self.execute_job(job)
+            self.results_writer.flush()
+            if self.output_validator:
+                if not job.get_job_results().get('error'):
+                    self.output_validator.capture_reference(
+                        serial_dir_path, f'{Database.SERIAL_COMBINATION_ID}{GlobalsConfig.LOG_EXTENSION}')
+                else:
+                    logger.info_error('Warning: the serial combination failed, its output is not a reference and the '
+                                      'outputs of the combinations are not validated')
             job_results = job.get_job_results()['run_time_results']
         for file_dict in job_results:
             if 'dead_code_file' not in file_dict.keys():
@@ -759,9 +916,13 @@ class Compar:
             base_dir = self.combinations_dir
         combination_folder_path = os.path.join(base_dir, combination_folder_name)
         os.mkdir(combination_folder_path)
-        self.__copy_folder_content(self.original_files_dir, combination_folder_path)
+        bytes_copied = create_workspace(self.original_files_dir, combination_folder_path, self.workspace_mode,
+                                        self.linked_files_patterns)
         if not os.path.isdir(combination_folder_path):
             raise e.FolderError(f'Cannot create {combination_folder_path} folder')
+        logger.verbose(f'{bytes_copied} bytes copied to {combination_folder_name} folder')
+        with self.workspaces_lock:
+            self.workspaces_bytes_copied += bytes_copied
         return combination_folder_path
 
     def generate_summary_file(self, optimal_data: list, dir_path: str):
@@ -780,8 +941,7 @@ class Compar:
                         writer.writerow([curr_file['file_id_by_rel_path'], loop['loop_label'], 'dead code loop',
                                          "", "", "", "", ""])
                     else:
-                        combination_obj = Combination.json_to_obj(
-                            self.db.get_combination_from_static_db(loop['_id']))
+                        combination_obj = self.db.get_combination_obj_from_static_db(loop['_id'])
                         writer.writerow([curr_file['file_id_by_rel_path'], loop['loop_label'], loop['_id'],
                                          combination_obj.get_compiler(),
                                          combination_obj.get_parameters().get_compilation_params(),
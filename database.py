@@ -1,67 +1,197 @@
-import pymongo
-from exceptions import DatabaseError, MissingDataError, DeadCodeLoop, DeadCodeFile, NoOptimalCombinationError
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from threading import Lock
+from combination import Combination
+from exceptions import DatabaseError, MissingDataError, DeadCodeLoop, DeadCodeFile
 import logger
 import traceback
-import hashlib
-from combinator import generate_combinations
-from globals import ComparMode, DatabaseConfig, JobConfig, LogPhrases
+from combinator import CombinationsSpace, generate_combination_id, generate_search_space_hash, raw_combination_to_dict
+from globals import ComparMode, DatabaseConfig, ExecuteJobConfig, LogPhrases
 import getpass
+import time
 
 
-class Database:
-
+class Database(ABC):
+    NAME = ''
     SERIAL_COMBINATION_ID = DatabaseConfig.SERIAL_COMBINATION_ID
     COMPAR_COMBINATION_ID = DatabaseConfig.COMPAR_COMBINATION_ID
     FINAL_RESULTS_COMBINATION_ID = DatabaseConfig.FINAL_RESULTS_COMBINATION_ID
     COMBINATIONS_DB, RESULTS_DB = 0, 1
+    BULK_WRITE_CHUNK_SIZE = DatabaseConfig.BULK_WRITE_CHUNK_SIZE
+
+    @staticmethod
+    def set_bulk_write_chunk_size(bulk_write_chunk_size: int):
+        Database.BULK_WRITE_CHUNK_SIZE = bulk_write_chunk_size
 
     @staticmethod
     def generate_combination_id(combination: dict):
-        fields = [f'compiler_name:{combination["compiler_name"]}']
-        omp_rtl_params = combination['parameters']['omp_rtl_params']
-        for omp_rtl_param in omp_rtl_params:
-            fields.append(f'omp_rtl_params:{omp_rtl_param}')
-        omp_directives_params = combination['parameters']['omp_directives_params']
-        for omp_directives_param in omp_directives_params:
-            fields.append(f'omp_directives_params:{omp_directives_param}')
-        compilation_params = combination['parameters']['compilation_params']
-        for compilation_param in compilation_params:
-            fields.append(f'compilation_params:{compilation_param}')
-        fields.sort()
-        return hashlib.sha3_384(str(fields).encode()).hexdigest()
+        return generate_combination_id(combination)
 
     @staticmethod
     def __get_collection_name(project_name):
         collection_name = f"{getpass.getuser()}_{project_name}"
         static_namespace = f'{DatabaseConfig.STATIC_DB_NAME}.{collection_name}'
-        dynamic_namespace = f'{DatabaseConfig.DYNAMIC_DB_NAME}.{collection_name}'
+        dynamic_namespace = f'{DatabaseConfig.DYNAMIC_DB_NAME}.{collection_name}' \
+                            f'{DatabaseConfig.LOOPS_RESULTS_COLLECTION_SUFFIX}'
         longer_namespace = max((static_namespace, dynamic_namespace), key=len)
         if len(longer_namespace) > DatabaseConfig.NAMESPACE_LENGTH_LIMIT:
-            new_name = longer_namespace[:DatabaseConfig.NAMESPACE_LENGTH_LIMIT].split('.')[1]
+            max_name_length = DatabaseConfig.NAMESPACE_LENGTH_LIMIT - (len(longer_namespace) - len(collection_name))
+            if max_name_length <= 0:
+                raise DatabaseError(f'DB namespace is too long! The DB names and suffixes alone exceed the limit of '
+                                    f'{DatabaseConfig.NAMESPACE_LENGTH_LIMIT} characters')
+            new_name = collection_name[:max_name_length]
             logger.info_error(f'DB namespace is too long! (max is {DatabaseConfig.NAMESPACE_LENGTH_LIMIT} characters)')
             logger.info_error(f'The name was changed from {collection_name} to {new_name}')
             collection_name = new_name
         return collection_name
 
-    def __init__(self, project_name, mode):
+    @staticmethod
+    def flatten_combination_results(combination_result: dict):
+        """
+        Flattens the run time results of a combination into one document per file and one document per loop.
+        A file document has no loop label and marks if the file is dead code in this combination.
+        """
+        combination_id = combination_result['_id']
+        loops_results = []
+        for file_dict in combination_result.get('run_time_results', []):
+            file_id_by_rel_path = file_dict['file_id_by_rel_path']
+            loops_results.append({
+                'combination_id': combination_id,
+                'file_id_by_rel_path': file_id_by_rel_path,
+                'loop_label': None,
+                'dead_code_file': 'dead_code_file' in file_dict.keys()
+            })
+            for loop_dict in file_dict.get('loops', []):
+                loop_result = {
+                    'combination_id': combination_id,
+                    'file_id_by_rel_path': file_id_by_rel_path,
+                    'loop_label': loop_dict['loop_label'],
+                    'dead_code': 'dead_code' in loop_dict.keys()
+                }
+                if not loop_result['dead_code']:
+                    loop_result['run_time'] = loop_dict.get('run_time')
+                    loop_result['speedup'] = loop_dict.get('speedup')
+                loops_results.append(loop_result)
+        return loops_results
+
+    def __init__(self, project_name: str, mode: ComparMode, **kwargs):
         self.mode = mode
         self.collection_name = Database.__get_collection_name(project_name)
+        self.num_of_combinations = 0
+        self.combinations_space = None
+        self.optimal_loops = None
+        self.combinations_cache = OrderedDict()  # LRU of {<combination_id>: <Combination>}
+        self.combinations_cache_lock = Lock()
+        self.combinations_cache_hits = 0
+        self.combinations_cache_misses = 0
         try:
-            self.connection = pymongo.MongoClient(DatabaseConfig.SERVER_ADDRESS)
-            self.static_db = self.connection[DatabaseConfig.STATIC_DB_NAME]
-            self.dynamic_db = self.connection[DatabaseConfig.DYNAMIC_DB_NAME]
-            self.num_of_combinations = 0
+            self.connect(**kwargs)
         except Exception as e:
             raise DatabaseError(str(e) + "\nDatabase connection failed!")
 
         if self.mode == ComparMode.OVERWRITE:
-            if self.is_collection_exists(self.collection_name, Database.RESULTS_DB):
-                self.dynamic_db.drop_collection(self.collection_name)
+            self.drop_results_collections()
         elif self.mode == ComparMode.NEW:
             if self.is_collection_exists(self.collection_name, Database.RESULTS_DB):
                 self.collection_name = self.get_new_collection_name(self.collection_name)
                 logger.info(f'Project name changed from {project_name} to {self.get_project_name()}')
 
+    @abstractmethod
+    def connect(self, **kwargs):
+        """implement the connection to your own storage"""
+        pass
+
+    @abstractmethod
+    def close_connection(self):
+        pass
+
+    @abstractmethod
+    def is_collection_exists(self, collection_name: str, database: int = RESULTS_DB):
+        pass
+
+    @abstractmethod
+    def drop_results_collections(self):
+        pass
+
+    @abstractmethod
+    def reset_static_db(self):
+        """drop the static combinations of the project and create an empty static collection"""
+        pass
+
+    @abstractmethod
+    def write_combinations_to_static_db(self, combinations: list):
+        """insert the combinations (each one with its '_id') that are not in the static collection yet"""
+        pass
+
+    @abstractmethod
+    def get_static_db_metadata(self):
+        pass
+
+    @abstractmethod
+    def set_static_db_metadata(self, search_space_hash: str, num_of_combinations: int):
+        pass
+
+    @abstractmethod
+    def delete_static_db_metadata(self):
+        pass
+
+    @abstractmethod
+    def create_dynamic_db(self):
+        pass
+
+    @abstractmethod
+    def combinations_iterator(self):
+        """yield the static combinations that have no results yet"""
+        pass
+
+    @abstractmethod
+    def insert_new_combination_results(self, combination_result: dict):
+        pass
+
+    @abstractmethod
+    def insert_new_combinations_results(self, combinations_results: list):
+        """insert a batch of combinations results, a result that cannot be inserted does not fail the others"""
+        pass
+
+    @abstractmethod
+    def delete_combination(self, combination_id: str):
+        pass
+
+    @abstractmethod
+    def aggregate_optimal_loops(self):
+        """
+        Computes for every file whether it is alive in any combination, and for every loop whether it is alive in any
+        combination, its fastest loop result and its serial loop result (loop results are flattened as in
+        flatten_combination_results).
+        Returns the set of the alive files and a dict of
+        {(<file_id_by_rel_path>, <loop_label>): {'is_alive': ..., 'best_loop': ..., 'serial_loop': ...}, ...}
+        """
+        pass
+
+    @abstractmethod
+    def find_combination_results(self, combination_id: str):
+        pass
+
+    @abstractmethod
+    def find_combination_in_static_db(self, combination_id: str):
+        pass
+
+    @abstractmethod
+    def get_total_runtime_best_combination(self):
+        pass
+
+    @abstractmethod
+    def remove_unused_data(self, combination_id: str):
+        pass
+
+    @abstractmethod
+    def set_error_in_combination(self, combination_id: str, error: str):
+        pass
+
+    @abstractmethod
+    def delete_all_related_collections(self):
+        pass
+
     def get_project_name(self):
         if '_' in self.collection_name:
             return self.collection_name.split('_', 1)[1]
@@ -83,137 +213,76 @@ class Database:
             raise DatabaseError(str(e) + "\nFailed to initialize DB!")
 
     def create_static_db(self):
-        if self.is_collection_exists(self.collection_name, Database.COMBINATIONS_DB):
-            self.static_db.drop_collection(self.collection_name)
-        self.static_db.create_collection(self.collection_name)
-        num_of_parallel_combinations = self.initialize_static_db()
+        search_space_hash = generate_search_space_hash()
+        static_db_metadata = self.get_static_db_metadata()
+        if static_db_metadata and static_db_metadata['search_space_hash'] == search_space_hash \
+                and self.is_collection_exists(self.collection_name, Database.COMBINATIONS_DB):
+            logger.info(f'Parameters files are unchanged, reusing {self.collection_name} static DB')
+            num_of_parallel_combinations = static_db_metadata['num_of_combinations']
+        else:
+            self.delete_static_db_metadata()
+            self.reset_static_db()
+            num_of_parallel_combinations = self.initialize_static_db()
+            self.set_static_db_metadata(search_space_hash, num_of_parallel_combinations)
         self.num_of_combinations = num_of_parallel_combinations + 2  # serial + parallel + final
         logger.info(LogPhrases.TOTAL_COMBINATIONS.format(self.num_of_combinations))
 
-    def create_dynamic_db(self):
-        if self.mode != ComparMode.CONTINUE:
-            self.dynamic_db.create_collection(self.collection_name)
-        else:
-            ids_in_static = [comb['_id'] for comb in self.static_db[self.collection_name].find({}, {"_id": 1})]
-            ids_in_dynamic = [comb['_id'] for comb in self.dynamic_db[self.collection_name].find({}, {"_id": 1})]
-            old_ids = [comb_id for comb_id in ids_in_dynamic if comb_id not in
-                       ids_in_static + [self.SERIAL_COMBINATION_ID]]
-            self.dynamic_db[self.collection_name].delete_many({'_id': {'$in': old_ids}})
-            del ids_in_static, ids_in_dynamic, old_ids
-            self.dynamic_db[self.collection_name].delete_one({'_id': Database.COMPAR_COMBINATION_ID})
-            self.dynamic_db[self.collection_name].delete_one({'_id': Database.FINAL_RESULTS_COMBINATION_ID})
-            self.dynamic_db[self.collection_name].delete_many({"error": {"$exists": True}})
-
-    def is_collection_exists(self, collection_name: str, database: int = RESULTS_DB):
-        if database == Database.COMBINATIONS_DB:
-            database_object = self.static_db
-        elif database == Database.RESULTS_DB:
-            database_object = self.dynamic_db
-        else:
-            raise ValueError(f'Unknown value {database}')
-        return collection_name in database_object.list_collection_names()
-
     def initialize_static_db(self):
         try:
-            combinations = generate_combinations()
-            num_of_parallel_combinations = len(combinations)
-            for combination in combinations:
-                curr_combination_id = Database.generate_combination_id(combination)
-                self.static_db[self.collection_name].update_one(
-                    filter={
-                        '_id': curr_combination_id
-                    },
-                    update={
-                        '$setOnInsert': combination
-                    },
-                    upsert=True
-                )
+            self.combinations_space = CombinationsSpace()
+            num_of_parallel_combinations = len(self.combinations_space)
+            num_of_written_combinations = 0
+            start_time = time.time()
+            combinations = []
+            for combination_index, raw_combination in enumerate(self.combinations_space):
+                combination = raw_combination_to_dict(raw_combination)
+                combination['combination_index'] = combination_index
+                combination['_id'] = Database.generate_combination_id(combination)
+                combinations.append(combination)
+                if len(combinations) == Database.BULK_WRITE_CHUNK_SIZE:
+                    self.write_combinations_to_static_db(combinations)
+                    num_of_written_combinations += len(combinations)
+                    combinations = []
+                    logger.verbose(f'{Database.__name__}: {num_of_written_combinations}/'
+                                   f'{num_of_parallel_combinations} combinations written to static DB')
+            if combinations:
+                self.write_combinations_to_static_db(combinations)
+                num_of_written_combinations += len(combinations)
+            elapsed_time = time.time() - start_time
+            logger.verbose(f'{Database.__name__}: {num_of_written_combinations} combinations written to static DB in '
+                           f'{elapsed_time:.2f} seconds')
             return num_of_parallel_combinations
         except Exception as e:
             logger.info_error(f'Exception at {Database.__name__}: cannot initialize static DB: {e}')
             logger.debug_error(f'{traceback.format_exc()}')
             raise DatabaseError()
-        finally:
-            del combinations
-
-    def close_connection(self):
-        self.connection.close()
 
     def combination_has_results(self, combination_id: str):
         return self.get_combination_results(combination_id) is not None
 
-    def combinations_iterator(self):
-        try:
-            for combination in self.static_db[self.collection_name].find():
-                if self.combination_has_results(combination['_id']):
-                    continue
-                yield combination
-        except Exception:
-            logger.info_error(f"Exception at {Database.__name__}: get_next_combination")
-            raise
-
-    def insert_new_combination_results(self, combination_result: dict):
-        try:
-            self.dynamic_db[self.collection_name].insert_one(combination_result)
-            return True
-        except Exception as e:
-            logger.info_error(f'{Database.__name__}: cannot update dynamic DB: {e}')
-            logger.debug_error(f'{traceback.format_exc()}')
-            return False
-
-    def delete_combination(self, combination_id: str):
-        try:
-            self.dynamic_db[self.collection_name].delete_one({"_id": combination_id})
-            return True
-        except Exception as e:
-            logger.info_error(f'Exception at {Database.__name__}: Could not delete combination: {e}')
-            logger.debug_error(f'{traceback.format_exc()}')
-            return False
-
     def find_optimal_loop_combination(self, file_id_by_rel_path: str, loop_label: str):
-        best_speedup = 1
-        best_combination_id = self.SERIAL_COMBINATION_ID
-        best_loop = None
-        loop_is_dead_code = True
-        file_is_dead_code = True
-        combinations = self.dynamic_db[self.collection_name].find({})
-        for combination in combinations:
-            if 'error' not in combination.keys():
-                for file in combination['run_time_results']:
-                    if file['file_id_by_rel_path'] == file_id_by_rel_path:
-                        if 'dead_code_file' in file.keys():
-                            file_is_dead_code = file_is_dead_code and True
-                            break
-                        else:
-                            file_is_dead_code = False
-                            for loop in file['loops']:
-                                if loop['loop_label'] == loop_label:
-                                    if 'dead_code' in loop.keys():
-                                        loop_is_dead_code = loop_is_dead_code and True
-                                    else:
-                                        loop_is_dead_code = False
-                                        if combination['_id'] == Database.SERIAL_COMBINATION_ID and not best_loop \
-                                                and best_combination_id == Database.SERIAL_COMBINATION_ID:
-                                            best_loop = loop
-                                        if loop['speedup'] > best_speedup:
-                                            best_speedup = loop['speedup']
-                                            best_combination_id = combination['_id']
-                                            best_loop = loop
-                                    break
-                            break
-        del combinations
-        if file_is_dead_code:
+        if self.optimal_loops is None:
+            self.optimal_loops = self.aggregate_optimal_loops()
+        alive_files, loops = self.optimal_loops
+        if file_id_by_rel_path not in alive_files:
             raise DeadCodeFile(f'file {file_id_by_rel_path} is dead code!')
-        if loop_is_dead_code:
+        loop = loops.get((file_id_by_rel_path, loop_label))
+        if not loop or not loop['is_alive']:
             raise DeadCodeLoop(f'Loop {loop_label} in file {file_id_by_rel_path} is dead code!')
-        if not best_loop:
+        if loop['best_loop']['speedup'] > ExecuteJobConfig.SERIAL_SPEEDUP:
+            best_loop = loop['best_loop']
+        elif loop['serial_loop']:
+            best_loop = loop['serial_loop']
+        else:
             raise MissingDataError(f'Cannot find any loop in db, loop: {loop_label}, file: {file_id_by_rel_path}')
-        return best_combination_id, best_loop
+        return best_loop['combination_id'], {'loop_label': best_loop['loop_label'],
+                                             'run_time': best_loop['run_time'],
+                                             'speedup': best_loop['speedup']}
 
     def get_combination_results(self, combination_id: str):
         combination = None
         try:
-            combination = self.dynamic_db[self.collection_name].find_one({"_id": combination_id})
+            combination = self.find_combination_results(combination_id)
         except Exception as e:
             logger.info_error(f'Exception at {Database.__name__}: Could not find results for combination: {e}')
             logger.debug_error(f'{traceback.format_exc()}')
@@ -233,41 +302,36 @@ class Database:
                 }
             }
         try:
-            combination = self.static_db[self.collection_name].find_one({"_id": combination_id})
+            combination = self.find_combination_in_static_db(combination_id)
         except Exception as e:
             logger.info_error(f'Exception at {Database.__name__}: Could not find combination: {e}')
             logger.debug_error(f'{traceback.format_exc()}')
         finally:
             return combination
 
-    def get_total_runtime_best_combination(self):
-        best_combination = self.dynamic_db[self.collection_name].find_one(
-            {"$and": [{"error": {"$exists": False}}, {"total_run_time": {"$ne": JobConfig.RUNTIME_ERROR}}]},
-            sort=[("total_run_time", 1)])
-        if not best_combination:
-            raise NoOptimalCombinationError("All Compar combinations finished with error.")
-        return best_combination["_id"]
-
-    def remove_unused_data(self, combination_id: str):
-        self.dynamic_db[self.collection_name].update({"_id": combination_id}, {'$unset': {'run_time_results': ""}})
+    def get_combination_obj_from_static_db(self, combination_id: str):
+        with self.combinations_cache_lock:
+            combination_obj = self.combinations_cache.get(combination_id)
+            if combination_obj is not None:
+                self.combinations_cache.move_to_end(combination_id)
+                self.combinations_cache_hits += 1
+                return combination_obj
+            self.combinations_cache_misses += 1
+        combination_obj = Combination.json_to_obj(self.get_combination_from_static_db(combination_id))
+        with self.combinations_cache_lock:
+            self.combinations_cache[combination_id] = combination_obj
+            if len(self.combinations_cache) > DatabaseConfig.COMBINATIONS_CACHE_SIZE:
+                self.combinations_cache.popitem(last=False)
+        return combination_obj
 
-    def set_error_in_combination(self, combination_id: str, error: str):
-        self.dynamic_db[self.collection_name].update_one(
-            filter={
-                '_id': combination_id,
-            },
-            update={
-                '$set': {
-                    'error': error
-                }
-            }
-        )
+    def log_combinations_cache_statistics(self):
+        logger.info(f'Static combinations cache: {self.combinations_cache_hits} hits, '
+                    f'{self.combinations_cache_misses} misses')
 
-    def delete_all_related_collections(self):
-        if self.collection_name in self.static_db.list_collection_names():
-            self.static_db.drop_collection(self.collection_name)
-        if self.collection_name in self.dynamic_db.list_collection_names():
-            self.dynamic_db.drop_collection(self.collection_name)
+    def get_combination_by_index(self, combination_index: int):
+        if self.combinations_space is None:
+            self.combinations_space = CombinationsSpace()
+        return self.combinations_space.get_combination(combination_index)
 
     def get_final_result_speedup_and_runtime(self):
         serial_results = self.get_combination_results(Database.SERIAL_COMBINATION_ID)
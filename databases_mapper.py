@@ -0,0 +1,7 @@
+from mongo_database import MongoDatabase
+from sqlite_database import SqliteDatabase
+
+
+databases = dict()
+databases[MongoDatabase.NAME] = MongoDatabase
+databases[SqliteDatabase.NAME] = SqliteDatabase
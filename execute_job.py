@@ -1,28 +1,41 @@
 import os
 import re
-import subprocess
-import time
+import shlex
+import asyncio
 from exceptions import FileError
-from subprocess_handler import run_subprocess
-import traceback
 import logger
 from combination_validator import CombinationValidator
-from globals import ExecuteJobConfig, MakefileConfig, GlobalsConfig, TimerConfig, LogPhrases
+from execution_backend import ExecutionBackend
+from output_validator import OutputValidator
+from slurm_backend import SlurmBackend
+from globals import ExecuteJobConfig, MakefileConfig, GlobalsConfig, TimerConfig, LogPhrases, JobConfig
 
 
 class ExecuteJob:
 
-    def __init__(self, job, num_of_loops_in_files: dict, db, db_lock, serial_run_time: dict, relative_c_file_list: list,
-                 slurm_partition: str, test_file_path: str, time_limit=None):
+    def __init__(self, job, num_of_loops_in_files: dict, results_writer, serial_run_time: dict,
+                 relative_c_file_list: list, slurm_partition: str, test_file_path: str, time_limit=None,
+                 repetitions: int = 1, repetitions_in_single_allocation: bool = False,
+                 execution_backend: ExecutionBackend = None, bulk_submission: bool = False,
+                 output_validator: OutputValidator = None, run_in_job_folder: bool = False):
         self.job = job
         self.num_of_loops_in_files = num_of_loops_in_files
-        self.db = db
-        self.db_lock = db_lock
+        self.results_writer = results_writer
         self.serial_run_time_dict = serial_run_time  # {(<file_id_by_rel_path>, <loop_label>) : <run_time>, ... }
         self.relative_c_file_list = relative_c_file_list
         self.time_limit = time_limit
         self.slurm_partition = slurm_partition
         self.test_file_path = test_file_path
+        self.repetitions = repetitions
+        # all the repetitions run one after the other in one sbatch job, each one writes its results to its own folder
+        self.repetitions_in_single_allocation = repetitions_in_single_allocation and repetitions > 1
+        if not execution_backend:
+            execution_backend = SlurmBackend(os.path.dirname(job.get_directory_path()), 1, time_limit, slurm_partition)
+        self.execution_backend = execution_backend
+        self.bulk_submission = bulk_submission  # the backend may gather the job with other jobs (e.g. array job)
+        self.job_accounting = None
+        self.output_validator = output_validator
+        self.run_in_job_folder = run_in_job_folder  # the output files of the job are written to its folder
 
     def get_job(self):
         return self.job
@@ -33,18 +46,15 @@ class ExecuteJob:
     def save_successful_job(self):
         self.update_speedup()
         job_result_dict = self.job.get_job_results()
-        self.db_lock.acquire()
-        self.db.insert_new_combination_results(job_result_dict)
-        self.db_lock.release()
+        self.results_writer.write(job_result_dict)
 
     def save_combination_as_failure(self, error_msg: str):
+        self.job.get_job_results()['error'] = error_msg  # shared with the combinations of the same binary
         combination_dict = {
             '_id': self.job.combination.combination_id,
             'error': error_msg
         }
-        self.db_lock.acquire()
-        self.db.insert_new_combination_results(combination_dict)
-        self.db_lock.release()
+        self.results_writer.write(combination_dict)
 
     def update_speedup(self):
         job_results = self.job.get_job_results()['run_time_results']
@@ -70,21 +80,115 @@ class ExecuteJob:
                             error_msg = file_dict['missing_data'] + f'\n{error_msg}'
                         file_dict['missing_data'] = error_msg
 
-    def run(self, user_slurm_parameters: list):
+    @staticmethod
+    def average_repetitions_results(repetitions_results: list):
+        """
+        Returns the first repetition results with the run times averaged over all the repetitions (a loop that is a
+        dead code in some repetitions is averaged over the repetitions it ran in). A runtime error in any repetition
+        fails the combination.
+        """
+        average_results = repetitions_results[0]
+        total_run_times = [results['total_run_time'] for results in repetitions_results]
+        if JobConfig.RUNTIME_ERROR in total_run_times:
+            average_results['total_run_time'] = JobConfig.RUNTIME_ERROR
+        else:
+            average_results['total_run_time'] = sum(total_run_times) / len(total_run_times)
+        loops_run_times = {}  # {(<file_id_by_rel_path>, <loop_label>): [<run_time>, ...], ... }
+        for results in repetitions_results:
+            for file_dict in results['run_time_results']:
+                if 'dead_code_file' not in file_dict.keys():
+                    for loop_dict in file_dict['loops']:
+                        if 'dead_code' not in loop_dict.keys():
+                            loop_key = (file_dict['file_id_by_rel_path'], loop_dict['loop_label'])
+                            loops_run_times.setdefault(loop_key, []).append(loop_dict['run_time'])
+        for file_dict in average_results['run_time_results']:
+            if 'dead_code_file' not in file_dict.keys():
+                for loop_dict in file_dict['loops']:
+                    if 'dead_code' not in loop_dict.keys():
+                        run_times = loops_run_times[(file_dict['file_id_by_rel_path'], loop_dict['loop_label'])]
+                        loop_dict['run_time'] = sum(run_times) / len(run_times)
+        average_results['repetitions'] = len(repetitions_results)
+        return average_results
+
+    def run(self):
+        repetition = 0
         try:
-            self.__run_with_sbatch(user_slurm_parameters)
-            self.__analyze_job_exit_code()
-            self.__analysis_output_file()
-            self.update_dead_code_files()
-            self.save_successful_job()
-            if not CombinationValidator.run_unit_test(self.test_file_path, self.get_job().get_directory_path(),
-                                                      f"{self.get_job().get_directory_name()}.log"):
-                self.db.set_error_in_combination(self.job.combination.combination_id, "Unit test failed.")
+            repetitions_results = []
+            for repetition in range(self.repetitions):
+                self.__start_repetition(repetition)
+                if repetition == 0 or not self.repetitions_in_single_allocation:
+                    self.__run_with_backend()
+                    self.__analyze_job_exit_code()
+                repetitions_results.append(self.__collect_repetition_results(repetition))
+            self.__save_repetitions_results(repetitions_results)
+        except Exception as ex:
+            self.__save_failure(repetition, ex)
+
+    async def run_async(self):
+        """the same as run, but the job is submitted and waited for in the event loop, without holding a thread"""
+        repetition = 0
+        try:
+            repetitions_results = []
+            for repetition in range(self.repetitions):
+                self.__start_repetition(repetition)
+                if repetition == 0 or not self.repetitions_in_single_allocation:
+                    await self.__run_with_backend_async()
+                    self.__analyze_job_exit_code()
+                repetitions_results.append(self.__collect_repetition_results(repetition))
+            # the unit test is a blocking subprocess
+            await asyncio.get_running_loop().run_in_executor(None, self.__save_repetitions_results,
+                                                             repetitions_results)
         except Exception as ex:
-            if self.job.get_job_results()['run_time_results']:
-                self.save_successful_job()
-            else:
-                self.save_combination_as_failure(str(ex))
+            self.__save_failure(repetition, ex)
+
+    def __start_repetition(self, repetition: int):
+        if repetition > 0:
+            logger.info(f'#{repetition} repetition of {self.get_job().get_combination().get_combination_id()}'
+                        f' combination')
+            self.job.clear_job_results()
+
+    def __collect_repetition_results(self, repetition: int):
+        self.__analysis_output_file(self.get_results_dir_path(repetition))
+        self.update_dead_code_files()
+        return self.job.get_job_results()
+
+    def __save_repetitions_results(self, repetitions_results: list):
+        if self.repetitions > 1:
+            self.job.get_job_results().update(self.average_repetitions_results(repetitions_results))
+        log_file_name = f"{self.get_job().get_directory_name()}.log"
+        # the results are written behind, so the validation results must be a part of them
+        output_error = None
+        if self.output_validator:  # a rejected output is not tested
+            num_of_outputs_in_log = self.repetitions if self.repetitions_in_single_allocation else 1
+            output_error = self.output_validator.validate(self.get_job().get_directory_path(), log_file_name,
+                                                          num_of_outputs_in_log)
+        if output_error:
+            self.job.get_job_results()['error'] = f"Output validation failed: {output_error}"
+        elif not CombinationValidator.run_unit_test(self.test_file_path, self.get_job().get_directory_path(),
+                                                    log_file_name):
+            self.job.get_job_results()['error'] = "Unit test failed."
+        self.save_successful_job()
+
+    def __save_failure(self, repetition: int, ex: Exception):
+        if self.repetitions > 1:
+            self.save_combination_as_failure(f'#{repetition} repetition: {ex}')
+        elif self.job.get_job_results()['run_time_results']:
+            self.save_successful_job()
+        else:
+            self.save_combination_as_failure(str(ex))
+
+    def get_results_dir_path(self, repetition: int = 0):
+        if not self.repetitions_in_single_allocation:
+            return self.get_job().get_directory_path()
+        return os.path.join(self.get_job().get_directory_path(), ExecuteJobConfig.REPETITIONS_FOLDER_NAME,
+                            str(repetition))
+
+    def __create_results_dirs(self):
+        for repetition in range(self.repetitions):
+            results_dir_path = self.get_results_dir_path(repetition)
+            # the timer writes the results of every file to the same relative path in the results folder
+            for file_id_by_rel_path in self.num_of_loops_in_files.keys():
+                os.makedirs(os.path.join(results_dir_path, os.path.dirname(file_id_by_rel_path)), exist_ok=True)
 
     def update_dead_code_files(self):
         job_results = self.job.get_job_results()['run_time_results']
@@ -94,75 +198,36 @@ class ExecuteJob:
             if file_id not in results_file_ids:
                 job_results.append({'file_id_by_rel_path': file_id, 'dead_code_file': True})
 
-    def __run_with_sbatch(self, user_slurm_parameters: list):
+    def __run_with_backend(self):
+        script_args, log_file_path = self.__prepare_run()
+        self.get_job().set_job_id(self.execution_backend.submit_job(script_args, log_file_path, self.bulk_submission))
+        logger.info(LogPhrases.JOB_SENT_TO_SLURM.format(self.get_job().get_job_id()))
+        self.job_accounting = self.execution_backend.wait_for_job(self.get_job().get_job_id())
+        logger.info(LogPhrases.JOB_IS_COMPLETE.format(self.get_job().get_job_id()))
+
+    async def __run_with_backend_async(self):
+        script_args, log_file_path = self.__prepare_run()
+        self.get_job().set_job_id(await self.execution_backend.submit_job_async(script_args, log_file_path,
+                                                                                self.bulk_submission))
+        logger.info(LogPhrases.JOB_SENT_TO_SLURM.format(self.get_job().get_job_id()))
+        self.job_accounting = await self.execution_backend.wait_for_job_async(self.get_job().get_job_id())
+        logger.info(LogPhrases.JOB_IS_COMPLETE.format(self.get_job().get_job_id()))
+
+    def __prepare_run(self):
+        """writes the batch script of the job, returns its arguments (the script first) and the log file path"""
         logger.info(f'Start running {self.get_job().get_combination().get_combination_id()} combination')
-        slurm_parameters = user_slurm_parameters
         dir_path = self.get_job().get_directory_path()
         dir_name = os.path.basename(dir_path)
         x_file = dir_name + MakefileConfig.EXE_FILE_EXTENSION
         sbatch_script_file = self.__make_sbatch_script_file(x_file)
 
         log_file = dir_name + GlobalsConfig.LOG_EXTENSION
-        x_file_path = os.path.join(dir_path, x_file)
+        x_file_path = os.path.abspath(os.path.join(dir_path, x_file))
         log_file_path = os.path.join(dir_path, log_file)
-        slurm_parameters = " ".join(slurm_parameters)
-        cmd = f'sbatch {slurm_parameters} -o {log_file_path} {sbatch_script_file} {x_file_path}'
+        script_args = f'{sbatch_script_file} {x_file_path}'
         if self.get_job().get_exec_file_args():
-            cmd += f' {" ".join([str(arg) for arg in self.get_job().get_exec_file_args()])} '
-        stdout = ""
-        batch_job_sent = False
-        while not batch_job_sent:
-            try:
-                stdout, stderr, ret_code = run_subprocess(cmd)
-                batch_job_sent = True
-            except subprocess.CalledProcessError as ex:
-                logger.info_error(f'Exception at {ExecuteJob.__name__}: {ex}\n{ex.output}\n{ex.stderr}')
-                logger.debug_error(f'{traceback.format_exc()}')
-                logger.info_error('sbatch command not responding (slurm is down?)')
-                time.sleep(ExecuteJobConfig.TRY_SLURM_RECOVERY_AGAIN_SECOND_TIME)
-        result = stdout
-        # set job id
-        result = re.findall('[0-9]', str(result))
-        result = ''.join(result)
-        self.get_job().set_job_id(result)
-        logger.info(LogPhrases.JOB_SENT_TO_SLURM.format(self.get_job().get_job_id()))
-        cmd = f"squeue -j {self.get_job().get_job_id()} --format %t"
-        last_status = ''
-        is_first_time = True
-        is_finish = False
-        while not is_finish:
-            try:
-                stdout, stderr = '', ''
-                try:
-                    stdout, stderr, ret_code = run_subprocess(cmd)
-                except subprocess.CalledProcessError:  # check if squeue is not working or if the job finished
-                    _, _, ret_code = run_subprocess('squeue')
-                    if ret_code != 0:
-                        raise
-                    else:
-                        is_finish = True
-                current_status = ''
-                try:
-                    current_status = stdout.split('\n')[1]
-                except IndexError:
-                    if not is_finish:
-                        logger.info_error(f'Warning: check the squeue command output: {stdout} {stderr}')
-                        time.sleep(ExecuteJobConfig.TRY_SLURM_RECOVERY_AGAIN_SECOND_TIME)
-                        continue
-                if current_status != last_status and current_status != '':
-                    logger.info(f'Job {self.get_job().get_job_id()} status is {current_status}')
-                    last_status = current_status
-                if not is_finish and not is_first_time:
-                    # not is_first_time - some times the job go to COMPLETE immediately (fast running)
-                    time.sleep(ExecuteJobConfig.CHECK_SQUEUE_SECOND_TIME)
-                if is_first_time:
-                    is_first_time = False
-            except subprocess.CalledProcessError as ex:  # squeue command not responding (slurm is down?)
-                logger.info_error(f'Exception at {ExecuteJob.__name__}: {ex}\n{ex.stdout}\n{ex.stderr}')
-                logger.debug_error(f'{traceback.format_exc()}')
-                logger.info_error('squeue command not responding (slurm is down?)')
-                time.sleep(ExecuteJobConfig.TRY_SLURM_RECOVERY_AGAIN_SECOND_TIME)
-        logger.info(LogPhrases.JOB_IS_COMPLETE.format(self.get_job().get_job_id()))
+            script_args += f' {" ".join([str(arg) for arg in self.get_job().get_exec_file_args()])} '
+        return script_args, log_file_path
 
     def __make_sbatch_script_file(self, job_name: str = ''):
         batch_file_path = os.path.join(self.get_job().get_directory_path(), 'batch_job.sh')
@@ -172,16 +237,23 @@ class ExecuteJob:
         if self.time_limit:
             command += f'#SBATCH --time={self.time_limit}\n'
         command += f'#SBATCH --partition={self.slurm_partition}\n'
-        command += '$@\n'
+        if self.run_in_job_folder:
+            command += f'cd {shlex.quote(os.path.abspath(self.get_job().get_directory_path()))}\n'
+        self.__create_results_dirs()
+        num_of_runs = self.repetitions if self.repetitions_in_single_allocation else 1
+        for repetition in range(num_of_runs):
+            results_dir_path = shlex.quote(os.path.abspath(self.get_results_dir_path(repetition)))
+            command += f'export {TimerConfig.RESULTS_DIR_ENV_VAR}={results_dir_path}\n'
+            command += '$@\n' if repetition == num_of_runs - 1 else '$@ || exit $?\n'
         command += 'exit $?\n'
         batch_file.write(command)
         batch_file.close()
         return batch_file_path
 
-    def __analysis_output_file(self):
+    def __analysis_output_file(self, results_dir_path: str):
         combination_id = self.get_job().get_combination().get_combination_id()
         logger.info(f'{ExecuteJob.__name__}: analyzing job run time results of {combination_id} combination')
-        for root, dirs, files in os.walk(self.get_job().get_directory_path()):
+        for root, dirs, files in os.walk(results_dir_path):
             for file in files:
                 # total run time analysis
                 if re.search(rf"{TimerConfig.TOTAL_RUNTIME_FILENAME}$", file):
@@ -192,7 +264,7 @@ class ExecuteJob:
                 if re.search(f"{TimerConfig.LOOPS_RUNTIME_RESULTS_SUFFIX}$", file):
                     loops_dict = {}
                     file_full_path = os.path.join(root, file)
-                    file_id_by_rel_path = os.path.relpath(file_full_path, self.job.directory)
+                    file_id_by_rel_path = os.path.relpath(file_full_path, results_dir_path)
                     file_id_by_rel_path = file_id_by_rel_path.replace(
                         f"{TimerConfig.LOOPS_RUNTIME_RESULTS_SUFFIX}", ".c")
                     self.get_job().set_file_results(file_id_by_rel_path)
@@ -215,16 +287,13 @@ class ExecuteJob:
 
     def __analyze_job_exit_code(self):
         job_id = self.get_job().get_job_id()
-        command = f"sacct -j {job_id} --format=exitcode"
-        try:
-            stdout, stderr, ret_code = run_subprocess(command)
-            result = stdout.replace("\r", "").split("\n")
-            if len(result) < 3:
-                logger.info_error(f'Warning: sacct command - no results for job id: {job_id}.')
-                return
-            left_code, right_code = result[2].replace(" ", "").split(":")
-            left_code, right_code = int(left_code), int(right_code)
-            if left_code != 0 or right_code != 0:
-                raise Exception(f"Job id: {job_id} ended with return code: {left_code}:{right_code}.")
-        except subprocess.CalledProcessError as ex:
-            logger.info_error(f'Warning: sacct command not responding (slurm is down?)\n{ex.output}\n{ex.stderr}')
+        if not self.job_accounting:
+            logger.info_error(f'Warning: sacct command - no results for job id: {job_id}.')
+            return
+        # the node and the elapsed time are saved to find the noisy nodes
+        self.job.get_job_results()['node'] = self.job_accounting['node']
+        self.job.get_job_results()['elapsed_time'] = self.job_accounting['elapsed_time']
+        left_code, right_code = self.job_accounting['exit_code'].split(":")
+        left_code, right_code = int(left_code), int(right_code)
+        if left_code != 0 or right_code != 0:
+            raise Exception(f"Job id: {job_id} ended with return code: {left_code}:{right_code}.")
@@ -0,0 +1,43 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+
+class ExecutionBackend(ABC):
+    """
+    Runs the batch scripts of the jobs. A job is submitted, then its submitter waits for it and gets its accounting:
+    {'exit_code': '<exit code>:<signal>', 'elapsed_time': <seconds>, 'node': <host name>}, or None if it is not known.
+    """
+    NAME = ''
+    # the async methods of the backend wait for the job without holding a thread, so the number of jobs in flight of
+    # the event loop is not bounded by the threads (otherwise it is bounded by num_of_jobs)
+    EVENT_LOOP_NATIVE = False
+
+    def __init__(self, working_directory: str, num_of_jobs: int, time_limit: str = None, slurm_partition: str = '',
+                 slurm_parameters: list = None, slurm_array_size: int = 1):
+        self.working_directory = working_directory
+        self.num_of_jobs = num_of_jobs
+        self.time_limit = time_limit
+
+    @abstractmethod
+    def submit_job(self, script_args: str, log_file_path: str, bulk: bool = False):
+        """
+        Submits the batch script (script_args is the script path followed by its arguments) and returns the job id.
+        Bulk jobs may be gathered with other jobs before they are submitted.
+        """
+        pass
+
+    @abstractmethod
+    def wait_for_job(self, job_id: str):
+        pass
+
+    async def submit_job_async(self, script_args: str, log_file_path: str, bulk: bool = False):
+        """the same as submit_job for the event loop, by default submit_job runs in the default executor of the loop"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.submit_job, script_args, log_file_path,
+                                                                bulk)
+
+    async def wait_for_job_async(self, job_id: str):
+        """the same as wait_for_job for the event loop, by default wait_for_job runs in the default executor"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.wait_for_job, job_id)
+
+    def log_statistics(self):
+        pass
@@ -0,0 +1,7 @@
+from slurm_backend import SlurmBackend
+from local_backend import LocalBackend
+
+
+execution_backends = dict()
+execution_backends[SlurmBackend.NAME] = SlurmBackend
+execution_backends[LocalBackend.NAME] = LocalBackend
@@ -42,9 +42,9 @@ class CombinatorConfig:
     COMPILATION_PARAMS_FILE_PATH = os.path.join(GlobalsConfig.ASSETS_DIR_PATH, COMPILATION_PARAMS_FILE_NAME)
     OMP_RTL_PARAMS_FILE_PATH = os.path.join(GlobalsConfig.ASSETS_DIR_PATH, OMP_RTL_PARAMS_FILE_NAME)
     OMP_DIRECTIVES_FILE_PATH = os.path.join(GlobalsConfig.ASSETS_DIR_PATH, OMP_DIRECTIVES_FILE_NAME)
-    PARAMS_SEPARATOR = '____compar____params____separator____'
     PARALLEL_DIRECTIVE_PREFIX = 'parallel'
     FOR_DIRECTIVE_PREFIX = 'for'
+    COMBINATOR_VERSION = 2  # must be changed whenever the combinations generation is changed
 
 
 class ComparMode(enum.IntEnum):
@@ -53,12 +53,32 @@ class ComparMode(enum.IntEnum):
     OVERWRITE = 2
 
 
+class WorkspaceMode(enum.IntEnum):
+    COPY = 0
+    HARDLINK = 1
+    REFLINK = 2
+
+
+class WorkspaceConfig:
+    MODES = dict((mode.name.lower(), mode) for mode in WorkspaceMode)
+    DEFAULT_MODE = WorkspaceMode.COPY.name.lower()
+    # the read-only inputs that are hard linked in hardlink mode (e.g. '*.dat'), the other files are copied
+    DEFAULT_LINKED_FILES_PATTERNS = []
+    # files that the parallelizers, the injectors or the build may rewrite in place must never share their inode
+    MATERIALIZED_FILES_EXTENSIONS = ['.c', '.h', '.o', '.a', '.so', '.d', '.mod', MakefileConfig.EXE_FILE_EXTENSION]
+    FICLONE_IOCTL = 0x40049409
+
+
 class ComparConfig:
     BACKUP_FOLDER_NAME = "backup"
     ORIGINAL_FILES_FOLDER_NAME = "original_files"
     COMBINATIONS_FOLDER_NAME = "combinations"
     SUMMARY_FILE_NAME = 'summary.csv'
     NUM_OF_THREADS = 4
+    NUM_OF_COMPILATION_THREADS = 4
+    COMPILED_JOBS_QUEUE_SIZE = 8
+    MAX_IN_FLIGHT_JOBS = 1000
+    WAIT_FOR_JOBS_SECOND_TIME = 1
     MODES = dict((mode.name.lower(), mode) for mode in ComparMode)
     DEFAULT_MODE = ComparMode.NEW.name.lower()
     COMBINATION_ID_C_COMMENT = '// COMBINATION_ID: '
@@ -66,6 +86,10 @@ class ComparConfig:
     DEFAULT_SLURM_PARTITION = 'grid'
     DEFAULT_SLURM_PARAMETERS = ['--exclusive', ]
     OPTIMAL_CURRENT_COMBINATION_FOLDER_NAME = 'current_combination'
+    PARALLELIZER_CACHE_FOLDER_NAME = 'parallelizer_cache'
+    BINARY_CACHE_FOLDER_NAME = 'binary_cache'
+    SLURM_ARRAYS_FOLDER_NAME = 'slurm_arrays'
+    REFERENCE_OUTPUT_FOLDER_NAME = 'reference_output'
     MIXED_COMPILER_NAME = 'mixed'
 
 
@@ -77,6 +101,15 @@ class DatabaseConfig:
     COMPAR_COMBINATION_ID = 'compar_combination'
     FINAL_RESULTS_COMBINATION_ID = 'final_results'
     NAMESPACE_LENGTH_LIMIT = 120
+    BULK_WRITE_CHUNK_SIZE = 1000
+    COMBINATIONS_ITERATOR_BATCH_SIZE = 1000
+    LOOPS_RESULTS_COLLECTION_SUFFIX = '_loops'
+    SQLITE_DB_FILE_NAME = 'compar_db.sqlite'
+    DEFAULT_DATABASE_TYPE = 'mongodb'
+    CONNECTION_POOL_SIZE = 100
+    COMBINATIONS_CACHE_SIZE = 256
+    SQLITE_BUSY_TIMEOUT_SECONDS = 60
+    STATIC_DB_METADATA_COLLECTION_NAME = 'compar_static_db_metadata'
 
 
 class ExceptionConfig:
@@ -85,8 +118,13 @@ class ExceptionConfig:
 
 class ExecuteJobConfig:
     CHECK_SQUEUE_SECOND_TIME = 10
+    DEFAULT_EXECUTION_BACKEND = 'slurm'
+    SACCT_ATTEMPTS = 3  # the number of polls to wait for the accounting of a job that left the queue
     TRY_SLURM_RECOVERY_AGAIN_SECOND_TIME = 300
     SERIAL_SPEEDUP = 1.0
+    REPETITIONS_FOLDER_NAME = 'repetitions'
+    SLURM_ARRAY_MAX_SIZE = 1000  # the default MaxArraySize of slurm is 1001
+    SLURM_ARRAY_GATHER_SECOND_TIME = 10
 
 
 class FileFormatorConfig:
@@ -119,18 +157,43 @@ class TimerConfig:
     TOTAL_RUNTIME_FILENAME = 'total_runtime.txt'
     LOOPS_RUNTIME_RESULTS_SUFFIX = '_run_time_result.txt'
     LOOPS_RUNTIME_SEPARATOR = ':'
+    # the results files are written to the directory in this environment variable (or to the current directory), so
+    # the same executable can run in any combination folder
+    RESULTS_DIR_ENV_VAR = 'COMPAR_RESULTS_DIR'
+    RESULTS_PATH_MAX_LENGTH = 4096
+
+
+class ValidationMode(enum.IntEnum):
+    PYTEST = 0
+    IN_PROCESS = 1
 
 
 class CombinationValidatorConfig:
     UNIT_TEST_FILE_NAME = 'test_output.py'
     UNIT_TEST_DEFAULT_DIR_PATH = GlobalsConfig.ASSETS_DIR_PATH
     UNIT_TEST_NAME = 'test_output'
+    UNIT_TEST_ARGUMENTS = ['working_dir', 'output_file_name']
+    VALIDATION_MODES = dict((mode.name.lower(), mode) for mode in ValidationMode)
+    DEFAULT_VALIDATION_MODE = ValidationMode.IN_PROCESS.name.lower()
+
+
+class OutputValidatorConfig:
+    REFERENCE_FILE_NAME = 'reference.json'
+    REFERENCE_OUTPUTS_FOLDER_NAME = 'outputs'
+    DEFAULT_RELATIVE_TOLERANCE = 1e-6
+    DEFAULT_ABSOLUTE_TOLERANCE = 1e-9
 
 
 class JobConfig:
     RUNTIME_ERROR = -1.0
 
 
+class ResultsWriterConfig:
+    BATCH_SIZE = 100
+    FLUSH_INTERVAL_SECONDS = 5
+    QUEUE_SIZE = 1000
+
+
 class LogPhrases:
     NEW_COMBINATION = 'Working on {} combination'
     JOB_SENT_TO_SLURM = 'Job {} sent to slurm system'
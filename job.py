@@ -32,6 +32,11 @@ class Job:
         self.job_id = ""
         self.total_run_time = 0
         self.log_file = ""
+        self.binary_fingerprint = None
+        self.job_results = {}
+        self.clear_job_results()
+
+    def clear_job_results(self):
         self.job_results = {
             'job_id': self.get_job_id(),
             '_id': str(self.get_combination().get_combination_id()),
@@ -53,6 +58,12 @@ class Job:
     def get_total_run_time(self):
         return self.total_run_time
 
+    def set_binary_fingerprint(self, binary_fingerprint):
+        self.binary_fingerprint = binary_fingerprint
+
+    def get_binary_fingerprint(self):
+        return self.binary_fingerprint
+
     def set_directory_path(self, new_path: str):
         self.directory = new_path
 
@@ -1,23 +1,69 @@
-from threading import RLock
 from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+import traceback
+import logger
+from globals import ComparConfig
 
 
 class JobExecutor:
+    """
+    Two stages pipeline: the compilation pool compiles the combinations into jobs and feeds the execution pool.
+    The number of combinations in the pipeline (compiling, compiled and waiting, or running) is bounded, so the
+    producer blocks instead of compiling far ahead of the executed jobs.
+    """
 
-    def __init__(self, number_of_threads: int = 1):
+    def __init__(self, number_of_threads: int = 1, number_of_compilation_threads: int = 1,
+                 compiled_jobs_queue_size: int = ComparConfig.COMPILED_JOBS_QUEUE_SIZE):
         self.number_of_threads = number_of_threads
-        self.db_lock = RLock()
+        self.number_of_compilation_threads = number_of_compilation_threads
+        self.compiled_jobs_queue_size = compiled_jobs_queue_size
         self.pool = None
+        self.compilation_pool = None
+        self.pipeline_slots = None
 
     def create_jobs_pool(self):
         self.pool = ThreadPoolExecutor(max_workers=self.number_of_threads, thread_name_prefix='compar_job_thread')
-
-    def get_db_lock(self):
-        return self.db_lock
+        self.compilation_pool = ThreadPoolExecutor(max_workers=self.number_of_compilation_threads,
+                                                   thread_name_prefix='compar_compilation_thread')
+        self.pipeline_slots = BoundedSemaphore(self.number_of_compilation_threads + self.compiled_jobs_queue_size +
+                                               self.number_of_threads)
 
     def run_job_in_thread(self, func, job):
         self.pool.submit(func, job)
 
+    def compile_and_run_job(self, compile_func, run_func, *args):
+        """
+        compile_func(*args) runs in the compilation pool and returns the job to run (or None if there is nothing to
+        run), then run_func(job) runs in the execution pool.
+        """
+        self.pipeline_slots.acquire()
+        self.compilation_pool.submit(self.__compile_job, compile_func, run_func, *args)
+
+    def __compile_job(self, compile_func, run_func, *args):
+        job = None
+        try:
+            job = compile_func(*args)
+        except Exception as e:
+            logger.info_error(f'Exception at {JobExecutor.__name__}: {e}')
+            logger.debug_error(f'{traceback.format_exc()}')
+        finally:
+            if job is None:
+                self.pipeline_slots.release()
+        if job is not None:
+            self.pool.submit(self.__run_job, run_func, job)
+
+    def __run_job(self, run_func, job):
+        try:
+            run_func(job)
+        except Exception as e:
+            logger.info_error(f'Exception at {JobExecutor.__name__}: {e}')
+            logger.debug_error(f'{traceback.format_exc()}')
+        finally:
+            self.pipeline_slots.release()
+
     def wait_and_finish_pool(self):
+        if self.compilation_pool:
+            self.compilation_pool.shutdown()  # all the compiled jobs are submitted to the execution pool
+            self.compilation_pool = None
         self.pool.shutdown()
         self.pool = None
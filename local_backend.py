@@ -0,0 +1,100 @@
+import os
+import sys
+import queue
+import shlex
+import signal
+import socket
+import subprocess
+import time
+from threading import Lock
+import logger
+from execution_backend import ExecutionBackend
+
+
+class LocalBackend(ExecutionBackend):
+    """
+    Runs the jobs on the local machine, without slurm, up to num_of_jobs at once.
+    Every running job is pinned to its own set of cpus (the available cpus are split between the num_of_jobs slots),
+    so the jobs that run concurrently do not share cores.
+    """
+    NAME = 'local'
+    # sets the cpu affinity of the process and replaces it with the job (the affinity is inherited by all its threads)
+    PIN_TO_CPUS_CODE = 'import os, sys; os.sched_setaffinity(0, [int(cpu) for cpu in sys.argv[1].split(",")]); ' \
+                       'os.execvp(sys.argv[2], sys.argv[2:])'
+
+    def __init__(self, working_directory: str, num_of_jobs: int, time_limit: str = None, slurm_partition: str = '',
+                 slurm_parameters: list = None, slurm_array_size: int = 1):
+        super().__init__(working_directory, num_of_jobs, time_limit)
+        self.time_limit_seconds = self.time_limit_to_seconds(time_limit) if time_limit else None
+        self.free_cpus_sets = queue.Queue()
+        if hasattr(os, 'sched_getaffinity'):
+            cpus = sorted(os.sched_getaffinity(0))
+            cpus_per_job = max(1, len(cpus) // num_of_jobs)
+            for slot in range(num_of_jobs):
+                first_cpu_index = (slot * cpus_per_job) % len(cpus)
+                self.free_cpus_sets.put(cpus[first_cpu_index:first_cpu_index + cpus_per_job])
+        else:  # the cpu affinity is not supported by the platform
+            for slot in range(num_of_jobs):
+                self.free_cpus_sets.put(None)
+        self.lock = Lock()
+        self.running_jobs = {}  # {<job id>: (<process>, <cpus set>, <log file>, <start time>), ... }
+        self.num_of_submitted_jobs = 0
+        self.node = socket.gethostname()
+
+    @staticmethod
+    def time_limit_to_seconds(time_limit: str):
+        """converts a slurm time limit (minutes, minutes:seconds, hours:minutes:seconds, days-hours, ...) to seconds"""
+        if time_limit.lower() in ('unlimited', 'infinite'):
+            return None
+        days, time_limit = time_limit.split('-') if '-' in time_limit else (0, time_limit)
+        fields = [int(field) for field in time_limit.split(':')]
+        if days:
+            hours, minutes, seconds = (fields + [0, 0])[:3]
+        elif len(fields) == 3:
+            hours, minutes, seconds = fields
+        else:
+            hours, minutes, seconds = 0, fields[0], (fields + [0])[1]
+        return ((int(days) * 24 + hours) * 60 + minutes) * 60 + seconds
+
+    def submit_job(self, script_args: str, log_file_path: str, bulk: bool = False):
+        cpus_set = self.free_cpus_sets.get()  # blocks while num_of_jobs jobs are running
+        command = ['bash'] + shlex.split(script_args)
+        if cpus_set:
+            command = [sys.executable, '-c', LocalBackend.PIN_TO_CPUS_CODE, ','.join(map(str, cpus_set))] + command
+        log_file = None
+        try:
+            log_file = open(log_file_path, 'w')
+            # a new session, so the job and all its child processes can be killed together
+            process = subprocess.Popen(command, stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True)
+        except Exception:
+            if log_file:
+                log_file.close()
+            self.free_cpus_sets.put(cpus_set)
+            raise
+        with self.lock:
+            self.num_of_submitted_jobs += 1
+            job_id = f'{LocalBackend.NAME}_{self.num_of_submitted_jobs}'
+            self.running_jobs[job_id] = (process, cpus_set, log_file, time.time())
+        if cpus_set:
+            logger.verbose(f'{LocalBackend.__name__}: job {job_id} is pinned to cpus {cpus_set}')
+        return job_id
+
+    def wait_for_job(self, job_id: str):
+        with self.lock:
+            process, cpus_set, log_file, start_time = self.running_jobs.pop(job_id)
+        try:
+            try:
+                process.wait(timeout=self.time_limit_seconds)
+            except subprocess.TimeoutExpired:
+                logger.info_error(f'Job {job_id} exceeded the time limit ({self.time_limit}), it is killed')
+                os.killpg(process.pid, signal.SIGKILL)
+                process.wait()
+        finally:
+            log_file.close()
+            self.free_cpus_sets.put(cpus_set)
+        # the exit code in the format of slurm, <exit code>:<signal>
+        exit_code = f'{process.returncode}:0' if process.returncode >= 0 else f'0:{-process.returncode}'
+        return {'exit_code': exit_code, 'elapsed_time': time.time() - start_time, 'node': self.node}
+
+    def log_statistics(self):
+        logger.info(f'Local backend: {self.num_of_submitted_jobs} jobs executed')
@@ -0,0 +1,252 @@
+import pymongo
+from pymongo.errors import BulkWriteError
+from database import Database
+from exceptions import NoOptimalCombinationError
+import logger
+import traceback
+from globals import ComparMode, DatabaseConfig, JobConfig
+
+
+class MongoDatabase(Database):
+    NAME = 'mongodb'
+
+    def __init__(self, project_name: str, mode: ComparMode, **kwargs):
+        self.connection = None
+        self.static_db = None
+        self.dynamic_db = None
+        super().__init__(project_name, mode, **kwargs)
+
+    def connect(self, pool_size: int = DatabaseConfig.CONNECTION_POOL_SIZE, **kwargs):
+        # the client is thread-safe, every thread borrows a connection from its pool
+        self.connection = pymongo.MongoClient(DatabaseConfig.SERVER_ADDRESS, maxPoolSize=pool_size)
+        self.static_db = self.connection[DatabaseConfig.STATIC_DB_NAME]
+        self.dynamic_db = self.connection[DatabaseConfig.DYNAMIC_DB_NAME]
+
+    def close_connection(self):
+        self.connection.close()
+
+    def get_loops_collection_name(self):
+        return f'{self.collection_name}{DatabaseConfig.LOOPS_RESULTS_COLLECTION_SUFFIX}'
+
+    def is_collection_exists(self, collection_name: str, database: int = Database.RESULTS_DB):
+        if database == Database.COMBINATIONS_DB:
+            database_object = self.static_db
+        elif database == Database.RESULTS_DB:
+            database_object = self.dynamic_db
+        else:
+            raise ValueError(f'Unknown value {database}')
+        return collection_name in database_object.list_collection_names()
+
+    def drop_results_collections(self):
+        if self.is_collection_exists(self.collection_name, Database.RESULTS_DB):
+            self.dynamic_db.drop_collection(self.collection_name)
+        if self.is_collection_exists(self.get_loops_collection_name(), Database.RESULTS_DB):
+            self.dynamic_db.drop_collection(self.get_loops_collection_name())
+
+    def reset_static_db(self):
+        if self.is_collection_exists(self.collection_name, Database.COMBINATIONS_DB):
+            self.static_db.drop_collection(self.collection_name)
+        self.static_db.create_collection(self.collection_name)
+
+    def write_combinations_to_static_db(self, combinations: list):
+        requests = []
+        for combination in combinations:
+            combination = dict(combination)
+            combination_id = combination.pop('_id')
+            requests.append(pymongo.UpdateOne(
+                filter={
+                    '_id': combination_id
+                },
+                update={
+                    '$setOnInsert': combination
+                },
+                upsert=True
+            ))
+        self.static_db[self.collection_name].bulk_write(requests, ordered=False)
+
+    def get_static_db_metadata(self):
+        return self.static_db[DatabaseConfig.STATIC_DB_METADATA_COLLECTION_NAME].find_one({'_id': self.collection_name})
+
+    def set_static_db_metadata(self, search_space_hash: str, num_of_combinations: int):
+        self.static_db[DatabaseConfig.STATIC_DB_METADATA_COLLECTION_NAME].replace_one(
+            filter={
+                '_id': self.collection_name
+            },
+            replacement={
+                'search_space_hash': search_space_hash,
+                'num_of_combinations': num_of_combinations
+            },
+            upsert=True
+        )
+
+    def delete_static_db_metadata(self):
+        self.static_db[DatabaseConfig.STATIC_DB_METADATA_COLLECTION_NAME].delete_one({'_id': self.collection_name})
+
+    def create_dynamic_db(self):
+        if self.mode != ComparMode.CONTINUE:
+            self.dynamic_db.create_collection(self.collection_name)
+            self.create_loops_results_collection()
+        else:
+            if not self.is_collection_exists(self.get_loops_collection_name(), Database.RESULTS_DB):
+                self.create_loops_results_collection()
+                self.rebuild_loops_results()
+            ids_in_static = set(comb['_id'] for comb in self.static_db[self.collection_name].find({}, {"_id": 1}))
+            ids_in_static.add(self.SERIAL_COMBINATION_ID)
+            ids_in_dynamic = self.get_ids_of_combinations_with_results()
+            old_ids = [comb_id for comb_id in ids_in_dynamic if comb_id not in ids_in_static]
+            old_ids += [Database.COMPAR_COMBINATION_ID, Database.FINAL_RESULTS_COMBINATION_ID]
+            self.dynamic_db[self.collection_name].delete_many({'_id': {'$in': old_ids}})
+            self.dynamic_db[self.get_loops_collection_name()].delete_many({'combination_id': {'$in': old_ids}})
+            del ids_in_static, ids_in_dynamic, old_ids
+            self.dynamic_db[self.collection_name].delete_many({"error": {"$exists": True}})
+
+    def create_loops_results_collection(self):
+        loops_collection = self.dynamic_db[self.get_loops_collection_name()]
+        loops_collection.create_index([('file_id_by_rel_path', pymongo.ASCENDING), ('loop_label', pymongo.ASCENDING),
+                                       ('dead_code', pymongo.ASCENDING), ('speedup', pymongo.DESCENDING)])
+        loops_collection.create_index([('combination_id', pymongo.ASCENDING)])
+
+    def rebuild_loops_results(self):
+        logger.info(f'Building {self.get_loops_collection_name()} loops results collection')
+        for combination_result in self.dynamic_db[self.collection_name].find({"error": {"$exists": False}}):
+            self.insert_loops_results(combination_result)
+
+    def insert_loops_results(self, combination_result: dict):
+        if 'error' in combination_result.keys():
+            return
+        loops_results = Database.flatten_combination_results(combination_result)
+        if loops_results:
+            self.dynamic_db[self.get_loops_collection_name()].insert_many(loops_results)
+
+    def delete_loops_results(self, combination_id: str):
+        self.dynamic_db[self.get_loops_collection_name()].delete_many({'combination_id': combination_id})
+
+    def get_ids_of_combinations_with_results(self):
+        return set(comb['_id'] for comb in self.dynamic_db[self.collection_name].find({}, {"_id": 1}))
+
+    def combinations_iterator(self):
+        try:
+            ids_with_results = self.get_ids_of_combinations_with_results()
+            combinations = self.static_db[self.collection_name].find(
+                batch_size=DatabaseConfig.COMBINATIONS_ITERATOR_BATCH_SIZE)
+            for combination in combinations:
+                if combination['_id'] in ids_with_results:
+                    continue
+                yield combination
+        except Exception:
+            logger.info_error(f"Exception at {MongoDatabase.__name__}: get_next_combination")
+            raise
+
+    def insert_new_combination_results(self, combination_result: dict):
+        return self.insert_new_combinations_results([combination_result])
+
+    def insert_new_combinations_results(self, combinations_results: list):
+        inserted_results = combinations_results
+        try:
+            try:
+                self.dynamic_db[self.collection_name].insert_many(combinations_results, ordered=False)
+            except BulkWriteError as e:
+                failed_indexes = set(error['index'] for error in e.details['writeErrors'])
+                inserted_results = [combination_result for i, combination_result in enumerate(combinations_results)
+                                    if i not in failed_indexes]
+                for error in e.details['writeErrors']:
+                    logger.info_error(f'{MongoDatabase.__name__}: cannot update dynamic DB: {error["errmsg"]}')
+            loops_results = []
+            for combination_result in inserted_results:
+                if 'error' not in combination_result.keys():
+                    loops_results += Database.flatten_combination_results(combination_result)
+            if loops_results:
+                self.dynamic_db[self.get_loops_collection_name()].insert_many(loops_results)
+            self.optimal_loops = None
+            return len(inserted_results) == len(combinations_results)
+        except Exception as e:
+            logger.info_error(f'{MongoDatabase.__name__}: cannot update dynamic DB: {e}')
+            logger.debug_error(f'{traceback.format_exc()}')
+            return False
+
+    def delete_combination(self, combination_id: str):
+        try:
+            self.dynamic_db[self.collection_name].delete_one({"_id": combination_id})
+            self.delete_loops_results(combination_id)
+            self.optimal_loops = None
+            return True
+        except Exception as e:
+            logger.info_error(f'Exception at {MongoDatabase.__name__}: Could not delete combination: {e}')
+            logger.debug_error(f'{traceback.format_exc()}')
+            return False
+
+    def aggregate_optimal_loops(self):
+        live_doc = {'$cond': [{'$eq': ['$dead_code', True]}, 0, 1]}
+        pipeline = [
+            {'$facet': {
+                'files': [
+                    {'$match': {'loop_label': None}},
+                    {'$group': {
+                        '_id': '$file_id_by_rel_path',
+                        'is_alive': {'$max': {'$cond': [{'$eq': ['$dead_code_file', True]}, 0, 1]}}
+                    }}
+                ],
+                'loops': [
+                    {'$match': {'loop_label': {'$ne': None}}},
+                    {'$sort': {'dead_code': 1, 'speedup': -1}},
+                    {'$group': {
+                        '_id': {'file_id_by_rel_path': '$file_id_by_rel_path', 'loop_label': '$loop_label'},
+                        'is_alive': {'$max': live_doc},
+                        'best_loop': {'$first': '$$ROOT'},
+                        'serial_loop': {'$max': {'$cond': [
+                            {'$and': [{'$eq': ['$combination_id', Database.SERIAL_COMBINATION_ID]},
+                                      {'$eq': [live_doc, 1]}]},
+                            '$$ROOT',
+                            None
+                        ]}}
+                    }}
+                ]
+            }}
+        ]
+        result = next(self.dynamic_db[self.get_loops_collection_name()].aggregate(pipeline, allowDiskUse=True))
+        alive_files = set(file['_id'] for file in result['files'] if file['is_alive'])
+        loops = dict(((loop['_id']['file_id_by_rel_path'], loop['_id']['loop_label']), loop)
+                     for loop in result['loops'])
+        return alive_files, loops
+
+    def find_combination_results(self, combination_id: str):
+        return self.dynamic_db[self.collection_name].find_one({"_id": combination_id})
+
+    def find_combination_in_static_db(self, combination_id: str):
+        return self.static_db[self.collection_name].find_one({"_id": combination_id})
+
+    def get_total_runtime_best_combination(self):
+        best_combination = self.dynamic_db[self.collection_name].find_one(
+            {"$and": [{"error": {"$exists": False}}, {"total_run_time": {"$ne": JobConfig.RUNTIME_ERROR}}]},
+            sort=[("total_run_time", 1)])
+        if not best_combination:
+            raise NoOptimalCombinationError("All Compar combinations finished with error.")
+        return best_combination["_id"]
+
+    def remove_unused_data(self, combination_id: str):
+        self.dynamic_db[self.collection_name].update({"_id": combination_id}, {'$unset': {'run_time_results': ""}})
+        self.delete_loops_results(combination_id)
+        self.optimal_loops = None
+
+    def set_error_in_combination(self, combination_id: str, error: str):
+        self.dynamic_db[self.collection_name].update_one(
+            filter={
+                '_id': combination_id,
+            },
+            update={
+                '$set': {
+                    'error': error
+                }
+            }
+        )
+        self.delete_loops_results(combination_id)
+        self.optimal_loops = None
+
+    def delete_all_related_collections(self):
+        self.delete_static_db_metadata()
+        if self.collection_name in self.static_db.list_collection_names():
+            self.static_db.drop_collection(self.collection_name)
+        if self.collection_name in self.dynamic_db.list_collection_names():
+            self.dynamic_db.drop_collection(self.collection_name)
+        if self.get_loops_collection_name() in self.dynamic_db.list_collection_names():
+            self.dynamic_db.drop_collection(self.get_loops_collection_name())
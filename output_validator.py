@@ -0,0 +1,188 @@
+import os
+import re
+import json
+import shutil
+import hashlib
+import itertools
+import traceback
+from threading import Lock
+import logger
+from globals import OutputValidatorConfig
+
+
+class OutputValidator:
+    """
+    Validates the output of every combination against the output of the serial combination (the reference): its
+    standard output and the declared output files (relative to the folder of the combination).
+    The outputs are compared as streams of tokens, the numbers with the tolerance and the other tokens exactly, so a
+    broken parallelization is rejected without a test. The lines that match one of the ignored lines patterns (e.g.
+    the run times) are not compared.
+    The reference is saved with its fingerprint: its digest, so the outputs that are identical to the reference are
+    accepted by their digest, and its number of tokens and numbers, so an output with another structure is rejected
+    before it is compared token by token.
+    """
+    STDOUT_NAME = 'stdout'
+    NUMBER_PATTERN = re.compile(r'[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?')
+    TOKEN_PATTERN = re.compile(rf'{NUMBER_PATTERN.pattern}|[^\s\d.+-]+|\S')
+
+    def __init__(self, reference_dir: str, output_files: list = None,
+                 relative_tolerance: float = OutputValidatorConfig.DEFAULT_RELATIVE_TOLERANCE,
+                 absolute_tolerance: float = OutputValidatorConfig.DEFAULT_ABSOLUTE_TOLERANCE,
+                 ignored_lines_patterns: list = None):
+        self.reference_dir = reference_dir
+        self.output_files = output_files if output_files else []
+        self.relative_tolerance = relative_tolerance
+        self.absolute_tolerance = absolute_tolerance
+        self.ignored_lines_patterns = [re.compile(pattern) for pattern in
+                                       (ignored_lines_patterns if ignored_lines_patterns else [])]
+        self.reference = None  # {<output name>: <fingerprint>, ... }
+        self.lock = Lock()
+        self.num_of_accepted = 0
+        self.num_of_rejected = 0
+        self.__load_reference()
+
+    def __load_reference(self):
+        """the reference of the last run is kept, the serial combination is not executed again in continue mode"""
+        try:
+            with open(os.path.join(self.reference_dir, OutputValidatorConfig.REFERENCE_FILE_NAME), 'r') as fp:
+                self.reference = json.load(fp)
+        except (OSError, ValueError):
+            self.reference = None
+
+    def is_ready(self):
+        return self.reference is not None
+
+    def __get_outputs_paths(self, job_dir_path: str, log_file_name: str):
+        """returns {<output name>: <path>} of the standard output and the output files of the job"""
+        outputs_paths = {OutputValidator.STDOUT_NAME: os.path.join(job_dir_path, log_file_name)}
+        for output_file in self.output_files:
+            outputs_paths[output_file] = os.path.join(job_dir_path, output_file)
+        return outputs_paths
+
+    def __get_reference_path(self, output_name: str):
+        return os.path.join(self.reference_dir, OutputValidatorConfig.REFERENCE_OUTPUTS_FOLDER_NAME,
+                            hashlib.sha3_224(output_name.encode()).hexdigest())
+
+    def capture_reference(self, job_dir_path: str, log_file_name: str):
+        """saves the outputs of the serial combination as the reference"""
+        self.reference = None
+        shutil.rmtree(self.reference_dir, ignore_errors=True)
+        try:
+            os.makedirs(os.path.join(self.reference_dir, OutputValidatorConfig.REFERENCE_OUTPUTS_FOLDER_NAME))
+            reference = {}
+            for output_name, output_path in self.__get_outputs_paths(job_dir_path, log_file_name).items():
+                shutil.copyfile(output_path, self.__get_reference_path(output_name))
+                reference[output_name] = self.get_fingerprint(output_path)
+            with open(os.path.join(self.reference_dir, OutputValidatorConfig.REFERENCE_FILE_NAME), 'w') as fp:
+                json.dump(reference, fp, indent=4)
+            self.reference = reference
+            logger.info(f'{OutputValidator.__name__}: the output of the serial combination is the reference '
+                        f'({len(reference)} outputs)')
+        except OSError as e:
+            logger.info_error(f'Exception at {OutputValidator.__name__}: cannot capture the reference output: {e}')
+            logger.debug_error(f'{traceback.format_exc()}')
+            logger.info_error(f'{OutputValidator.__name__}: the outputs of the combinations are not validated')
+
+    @staticmethod
+    def get_file_digest(file_path: str):
+        file_hash = hashlib.sha3_384()
+        with open(file_path, 'rb') as fp:
+            for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+                file_hash.update(chunk)
+        return file_hash.hexdigest()
+
+    def get_fingerprint(self, file_path: str):
+        num_of_tokens, num_of_numbers = self.count_tokens(file_path)
+        return {'digest': self.get_file_digest(file_path), 'num_of_tokens': num_of_tokens,
+                'num_of_numbers': num_of_numbers}
+
+    def count_tokens(self, file_path: str):
+        """returns the number of tokens and the number of numbers of the file"""
+        num_of_tokens, num_of_numbers = 0, 0
+        for token in self.iterate_tokens(file_path):
+            num_of_tokens += 1
+            if isinstance(token, float):
+                num_of_numbers += 1
+        return num_of_tokens, num_of_numbers
+
+    def compare_counts(self, output_path: str, fingerprint: dict, num_of_copies: int = 1):
+        """returns None if the output has the number of tokens and numbers of the reference, or the difference"""
+        if 'num_of_tokens' not in fingerprint or 'num_of_numbers' not in fingerprint:
+            return None
+        num_of_tokens, num_of_numbers = self.count_tokens(output_path)
+        if num_of_tokens != fingerprint['num_of_tokens'] * num_of_copies:
+            return f'the output has {num_of_tokens} tokens instead of {fingerprint["num_of_tokens"] * num_of_copies}'
+        if num_of_numbers != fingerprint['num_of_numbers'] * num_of_copies:
+            return f'the output has {num_of_numbers} numbers instead of ' \
+                   f'{fingerprint["num_of_numbers"] * num_of_copies}'
+        return None
+
+    def iterate_tokens(self, file_path: str):
+        """yields the tokens of the file, line by line, the numbers as floats"""
+        with open(file_path, 'r', errors='replace') as fp:
+            for line in fp:
+                if any(pattern.search(line) for pattern in self.ignored_lines_patterns):
+                    continue
+                for token in OutputValidator.TOKEN_PATTERN.findall(line):
+                    yield float(token) if OutputValidator.NUMBER_PATTERN.fullmatch(token) else token
+
+    def is_close(self, number: float, reference_number: float):
+        if number == reference_number:
+            return True
+        tolerance = max(self.absolute_tolerance, self.relative_tolerance * max(abs(number), abs(reference_number)))
+        return abs(number - reference_number) <= tolerance
+
+    def compare_output(self, output_path: str, reference_path: str, num_of_copies: int = 1):
+        """
+        Returns None if the output matches the reference (num_of_copies times one after the other), or the first
+        difference.
+        """
+        reference_tokens = itertools.chain.from_iterable(self.iterate_tokens(reference_path)
+                                                         for _ in range(num_of_copies))
+        missing = object()
+        for index, (token, reference_token) in enumerate(itertools.zip_longest(
+                self.iterate_tokens(output_path), reference_tokens, fillvalue=missing)):
+            if token is missing:
+                return f'the output ends at token #{index}, the reference has more tokens'
+            if reference_token is missing:
+                return f'the output has more tokens than the reference ({index} tokens)'
+            if isinstance(token, float) and isinstance(reference_token, float):
+                if not self.is_close(token, reference_token):
+                    return f'token #{index} is {token} instead of {reference_token}'
+            elif token != reference_token:
+                return f'token #{index} is "{token}" instead of "{reference_token}"'
+        return None
+
+    def validate(self, job_dir_path: str, log_file_name: str, num_of_copies: int = 1):
+        """
+        Returns None if the outputs of the job match the reference, or the reason of the rejection.
+        The standard output may hold num_of_copies outputs (all the repetitions of the job), one after the other.
+        """
+        if not self.is_ready():
+            return None
+        error = None
+        for output_name, output_path in self.__get_outputs_paths(job_dir_path, log_file_name).items():
+            fingerprint = self.reference.get(output_name)
+            if fingerprint is None:  # declared after the reference was captured
+                continue
+            if not os.path.isfile(output_path):
+                error = f'{output_name}: missing output'
+                break
+            copies = num_of_copies if output_name == OutputValidator.STDOUT_NAME else 1
+            if copies == 1 and self.get_file_digest(output_path) == fingerprint['digest']:
+                continue
+            error = self.compare_counts(output_path, fingerprint, copies)
+            if not error:
+                error = self.compare_output(output_path, self.__get_reference_path(output_name), copies)
+            if error:
+                error = f'{output_name}: {error}'
+                break
+        with self.lock:
+            if error:
+                self.num_of_rejected += 1
+            else:
+                self.num_of_accepted += 1
+        return error
+
+    def log_statistics(self):
+        logger.info(f'Output validation: {self.num_of_accepted} outputs accepted, {self.num_of_rejected} rejected')
@@ -0,0 +1,100 @@
+import os
+import shutil
+import hashlib
+import traceback
+from threading import Lock, get_ident
+import logger
+from workspace import create_workspace
+from globals import GlobalsConfig, ParallelCompilerConfig, WorkspaceMode
+
+
+class ParallelizerCache:
+    """
+    Content addressed cache of the parallelizers output.
+    The output of a parallelizer depends only on the source tree and on the parallelizer, its version, its flags and
+    its arguments, so the combinations that differ only in their omp rtl or directives params share one entry.
+    The source tree must not be changed after the first use of the cache.
+    """
+
+    def __init__(self, cache_dir: str, source_dir: str, workspace_mode: WorkspaceMode = WorkspaceMode.COPY,
+                 linked_files_patterns: list = None):
+        self.cache_dir = cache_dir
+        self.source_dir = source_dir
+        self.workspace_mode = workspace_mode
+        self.linked_files_patterns = linked_files_patterns
+        self.source_tree_hash = None
+        self.lock = Lock()
+        self.entries_locks = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get_source_tree_hash(self):
+        with self.lock:
+            if self.source_tree_hash is None:
+                source_tree_hash = hashlib.sha3_384()
+                for root, dirs, files in os.walk(self.source_dir, followlinks=True):
+                    dirs.sort()
+                    for file in sorted(files):
+                        file_path = os.path.join(root, file)
+                        source_tree_hash.update(os.path.relpath(file_path, self.source_dir).encode())
+                        with open(file_path, 'rb') as fp:
+                            for chunk in iter(lambda: fp.read(1024 * 1024), b''):
+                                source_tree_hash.update(chunk)
+                self.source_tree_hash = source_tree_hash.hexdigest()
+            return self.source_tree_hash
+
+    def get_key(self, parallelizer_name: str, version: str, compilation_flags: list, **parallelizer_args):
+        key = hashlib.sha3_384(self.get_source_tree_hash().encode())
+        key.update(str([parallelizer_name, version, compilation_flags, sorted(parallelizer_args.items())]).encode())
+        for script_name in (ParallelCompilerConfig.PRE_PROCESSING_FILE_NAME,
+                            ParallelCompilerConfig.POST_PROCESSING_FILE_NAME):
+            script_file_path = os.path.join(GlobalsConfig.ASSETS_DIR_PATH, script_name)
+            if os.path.exists(script_file_path):
+                with open(script_file_path, 'rb') as fp:
+                    key.update(fp.read())
+        return key.hexdigest()
+
+    def get_entry_lock(self, key: str):
+        """holding the entry lock, the combinations that share the entry do not run the parallelizer concurrently"""
+        with self.lock:
+            return self.entries_locks.setdefault(key, Lock())
+
+    def restore(self, key: str, folder_path: str):
+        """replaces the content of folder_path with the cached parallelizer output, returns False on a miss"""
+        entry_path = os.path.join(self.cache_dir, key)
+        if not os.path.isdir(entry_path):
+            with self.lock:
+                self.misses += 1
+            return False
+        for file_name in os.listdir(folder_path):
+            file_path = os.path.join(folder_path, file_name)
+            if os.path.isdir(file_path) and not os.path.islink(file_path):
+                shutil.rmtree(file_path)
+            else:
+                os.remove(file_path)
+        create_workspace(entry_path, folder_path, self.workspace_mode, self.linked_files_patterns)
+        with self.lock:
+            self.hits += 1
+        return True
+
+    def store(self, key: str, folder_path: str):
+        entry_path = os.path.join(self.cache_dir, key)
+        if os.path.isdir(entry_path):
+            return
+        temp_entry_path = os.path.join(self.cache_dir, f'{key}_{os.getpid()}_{get_ident()}.tmp')
+        try:
+            os.makedirs(temp_entry_path)
+            create_workspace(folder_path, temp_entry_path, self.workspace_mode, self.linked_files_patterns)
+            os.rename(temp_entry_path, entry_path)
+        except OSError as e:
+            if not os.path.isdir(entry_path):  # otherwise another thread has stored the same entry first
+                logger.info_error(f'Exception at {ParallelizerCache.__name__}: cannot store {key} entry: {e}')
+                logger.debug_error(f'{traceback.format_exc()}')
+        finally:
+            shutil.rmtree(temp_entry_path, ignore_errors=True)
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def log_statistics(self):
+        logger.info(f'Parallelizer cache: {self.hits} hits, {self.misses} misses')
@@ -2,7 +2,10 @@ import argparse
 from compar import Compar
 import traceback
 import logger
-from globals import ComparConfig
+from globals import ComparConfig, DatabaseConfig, WorkspaceConfig, ExecuteJobConfig, CombinationValidatorConfig, \
+    OutputValidatorConfig
+from databases_mapper import databases
+from execution_backends_mapper import execution_backends
 
 
 def positive_int_validation(value):
@@ -54,6 +57,9 @@ def main():
     parser.add_argument('-test_file', '--test_file_path', help="Unit test file path", default="")
     parser.add_argument('-jobs_quantity', '--jobs_quantity_at_once', help='The number of jobs to be executed at once',
                         default=num_of_jobs_at_once, type=positive_int_validation)
+    parser.add_argument('-compilation_jobs_quantity', '--compilation_jobs_quantity_at_once',
+                        help='The number of combinations to be compiled at once',
+                        default=ComparConfig.NUM_OF_COMPILATION_THREADS, type=positive_int_validation)
     parser.add_argument('-mode', '--mode', help=f'Compar working mode {ComparConfig.MODES.keys()}.',
                         default=ComparConfig.DEFAULT_MODE, choices=ComparConfig.MODES.keys())
     parser.add_argument('-with_markers', '--code_with_markers', action='store_true',
@@ -61,10 +67,59 @@ def main():
     parser.add_argument('-clear_db', '--clear_db', action='store_true', help='Delete the results from database.')
     parser.add_argument('-multiple_combinations', '--multiple_combinations', type=positive_int_validation, default=1,
                         help='Number of times to repeat each combination.')
+    parser.add_argument('-single_allocation', '--repetitions_in_single_allocation', action='store_true',
+                        help='Run the repetitions of each combination one after the other in one slurm job.')
+    parser.add_argument('-array_size', '--slurm_array_size', type=positive_int_validation, default=1,
+                        help='Maximal number of jobs to submit together as one slurm array job (1 to submit every '
+                             'job by itself).')
+    parser.add_argument('-backend', '--execution_backend', default=ExecuteJobConfig.DEFAULT_EXECUTION_BACKEND,
+                        choices=execution_backends.keys(),
+                        help='Where to run the jobs: slurm, or local (on this machine, each job pinned to its own '
+                             'cpus).')
+    parser.add_argument('-async', '--async_orchestration', action='store_true',
+                        help='Run the jobs as coroutines of one event loop instead of a thread for each job, so many '
+                             'slurm jobs (see -max_in_flight_jobs) may be in flight at once.')
+    parser.add_argument('-max_in_flight_jobs', '--max_in_flight_jobs', type=positive_int_validation,
+                        default=ComparConfig.MAX_IN_FLIGHT_JOBS,
+                        help='The number of slurm jobs in flight at once with -async (-jobs_quantity is the number of '
+                             'threads of the blocking steps of the jobs).')
+    parser.add_argument('-validation', '--validation_mode', default=CombinationValidatorConfig.DEFAULT_VALIDATION_MODE,
+                        choices=CombinationValidatorConfig.VALIDATION_MODES.keys(),
+                        help='How the unit test validates the output of every job: in_process (the test function is '
+                             'called directly, or by pytest if it needs other fixtures) or pytest.')
+    parser.add_argument('-validate_output', '--validate_output', action='store_true',
+                        help='Reject the combinations whose output differs from the output of the serial combination.')
+    parser.add_argument('-output_files', '--output_files', nargs="*", default=None,
+                        help='Output files of the program to validate, relative to the folder of the combination '
+                             '(the program runs in it).')
+    parser.add_argument('-output_rtol', '--output_relative_tolerance', type=float,
+                        default=OutputValidatorConfig.DEFAULT_RELATIVE_TOLERANCE,
+                        help='Relative tolerance of the numbers in the validated outputs.')
+    parser.add_argument('-output_atol', '--output_absolute_tolerance', type=float,
+                        default=OutputValidatorConfig.DEFAULT_ABSOLUTE_TOLERANCE,
+                        help='Absolute tolerance of the numbers in the validated outputs.')
+    parser.add_argument('-ignore_output_lines', '--ignored_output_lines', nargs="*", default=None,
+                        help='Regular expressions of the output lines that are not validated (e.g. run times).')
+    parser.add_argument('-db', '--database_type', help='Database to store the combinations and their results in.',
+                        default=DatabaseConfig.DEFAULT_DATABASE_TYPE, choices=databases.keys())
+    parser.add_argument('-workspace', '--workspace_mode', default=WorkspaceConfig.DEFAULT_MODE,
+                        choices=WorkspaceConfig.MODES.keys(),
+                        help='How the combinations folders are created from the original files (copy, hardlink '
+                             'or reflink). In hardlink mode only the files that match -linked_files are linked and '
+                             'they are made read-only: a linked file shares its inode with the original files and all '
+                             'the combinations, so a write in place would corrupt them all (root ignores read-only).')
+    parser.add_argument('-linked_files', '--linked_files', nargs="*", default=None,
+                        help='Patterns of the read-only input files (relative to the input directory, e.g. *.dat) '
+                             'that are hard linked in hardlink mode.')
+    parser.add_argument('-db_pool_size', '--database_pool_size', type=positive_int_validation,
+                        default=DatabaseConfig.CONNECTION_POOL_SIZE,
+                        help='Maximal number of concurrent connections to the database.')
     args = parser.parse_args()
     args.mode = ComparConfig.MODES[args.mode]
 
     Compar.set_num_of_threads(args.jobs_quantity_at_once)
+    Compar.set_num_of_compilation_threads(args.compilation_jobs_quantity_at_once)
+    Compar.set_max_in_flight_jobs(args.max_in_flight_jobs)
     compar_obj = Compar(
         input_dir=args.input_directory_path,
         output_dir=args.output_directory_path,
@@ -90,6 +145,20 @@ def main():
         code_with_markers=args.code_with_markers,
         clear_db=args.clear_db,
         multiple_combinations=args.multiple_combinations,
+        repetitions_in_single_allocation=args.repetitions_in_single_allocation,
+        slurm_array_size=args.slurm_array_size,
+        execution_backend=args.execution_backend,
+        async_orchestration=args.async_orchestration,
+        validation_mode=args.validation_mode,
+        validate_output=args.validate_output,
+        output_files=args.output_files,
+        output_relative_tolerance=args.output_relative_tolerance,
+        output_absolute_tolerance=args.output_absolute_tolerance,
+        ignored_output_lines=args.ignored_output_lines,
+        database_type=args.database_type,
+        database_pool_size=args.database_pool_size,
+        workspace_mode=args.workspace_mode,
+        linked_files=args.linked_files,
         log_level=args.log_level
     )
     try:
@@ -0,0 +1,88 @@
+import atexit
+import queue
+import time
+import traceback
+from threading import Thread, Event
+import logger
+from globals import ResultsWriterConfig
+
+
+class ResultsWriter:
+    """
+    Write-behind of the combinations results.
+    The results are queued (the queue is bounded, so the writers are blocked when the DB falls behind) and a
+    background thread inserts them in batches, whenever the batch is full or the flush interval has passed.
+    flush() returns only after everything that was queued before it is written to the DB.
+    """
+
+    def __init__(self, db, batch_size: int = ResultsWriterConfig.BATCH_SIZE,
+                 flush_interval: float = ResultsWriterConfig.FLUSH_INTERVAL_SECONDS,
+                 queue_size: int = ResultsWriterConfig.QUEUE_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        if self.is_running():
+            return
+        self.thread = Thread(target=self.__run, name='compar_results_writer', daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def write(self, combination_result: dict):
+        if not self.is_running():
+            self.db.insert_new_combination_results(combination_result)
+            return
+        self.queue.put(combination_result)
+
+    def flush(self):
+        if not self.is_running():
+            return
+        flushed = Event()
+        self.queue.put(flushed)
+        flushed.wait()
+
+    def stop(self):
+        if not self.is_running():
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        atexit.unregister(self.stop)
+
+    def __write_batch(self, combinations_results: list):
+        if not combinations_results:
+            return
+        try:
+            self.db.insert_new_combinations_results(combinations_results)
+        except Exception as e:
+            logger.info_error(f'Exception at {ResultsWriter.__name__}: cannot write {len(combinations_results)} '
+                              f'combinations results: {e}')
+            logger.debug_error(f'{traceback.format_exc()}')
+
+    def __run(self):
+        combinations_results = []
+        flush_time = None
+        while True:
+            try:
+                timeout = max(flush_time - time.time(), 0) if combinations_results else None
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = Event()  # the flush interval has passed
+            if isinstance(item, dict):
+                if not combinations_results:
+                    flush_time = time.time() + self.flush_interval
+                combinations_results.append(item)
+                if len(combinations_results) < self.batch_size:
+                    continue
+            self.__write_batch(combinations_results)
+            combinations_results = []
+            if item is None:
+                return
+            if isinstance(item, Event):
+                item.set()
@@ -0,0 +1,139 @@
+import os
+import time
+import shlex
+import asyncio
+import traceback
+from threading import Condition
+import logger
+from globals import ExecuteJobConfig
+
+
+class SlurmArraySubmitter:
+    """
+    Gathers the jobs that are submitted concurrently and submits them together as one slurm array job, so slurm gets
+    one sbatch for up to array_size jobs instead of one sbatch for every job.
+    A job waits up to gather_time seconds for other jobs to join its array. Then the array index of every task is
+    mapped to the script of its job, and the task is monitored as a job by its <array job id>_<array index> id.
+    The jobs of the event loop (submit_async) are gathered in the loop, without holding a thread while they wait.
+    """
+
+    def __init__(self, arrays_dir: str, submit_func, slurm_partition: str, slurm_parameters: list,
+                 time_limit: str = None, array_size: int = ExecuteJobConfig.SLURM_ARRAY_MAX_SIZE,
+                 gather_time: float = ExecuteJobConfig.SLURM_ARRAY_GATHER_SECOND_TIME, submit_func_async=None):
+        self.arrays_dir = arrays_dir
+        self.submit_func = submit_func  # submit_func(<sbatch command>) returns the job id
+        self.submit_func_async = submit_func_async  # await submit_func_async(<sbatch command args>) returns the job id
+        self.slurm_partition = slurm_partition
+        self.slurm_parameters = slurm_parameters
+        self.time_limit = time_limit
+        self.array_size = array_size
+        self.gather_time = gather_time
+        self.condition = Condition()
+        self.pending_tasks = []
+        self.pending_async_tasks = []  # touched only by the event loop thread
+        self.gather_timer = None
+        self.async_submissions = set()
+        self.num_of_arrays = 0
+        self.num_of_tasks = 0
+
+    def submit(self, script_args: str, log_file_path: str):
+        """blocks until the array of the job is submitted and returns the job id of its task"""
+        task = {'script_args': script_args, 'log_file_path': log_file_path, 'job_id': None, 'error': None}
+        with self.condition:
+            self.pending_tasks.append(task)
+            if len(self.pending_tasks) >= self.array_size:
+                self.condition.notify_all()
+        while True:
+            with self.condition:
+                deadline = time.time() + self.gather_time
+                while task in self.pending_tasks and len(self.pending_tasks) < self.array_size and \
+                        time.time() < deadline:
+                    self.condition.wait(deadline - time.time())
+                if task not in self.pending_tasks:  # another job has submitted the array of this job
+                    break
+                tasks, self.pending_tasks = self.pending_tasks[:self.array_size], self.pending_tasks[self.array_size:]
+                self.num_of_arrays += 1
+                self.num_of_tasks += len(tasks)
+                array_number = self.num_of_arrays
+            try:
+                array_job_id = self.submit_func(self.__make_array_sbatch_command(tasks, array_number))
+                for array_index, array_task in enumerate(tasks):
+                    array_task['job_id'] = f'{array_job_id}_{array_index}'
+            except Exception as ex:
+                logger.info_error(f'Exception at {SlurmArraySubmitter.__name__}: {ex}')
+                logger.debug_error(f'{traceback.format_exc()}')
+                for array_task in tasks:
+                    array_task['error'] = ex
+            with self.condition:
+                self.condition.notify_all()
+        with self.condition:
+            while task['job_id'] is None and task['error'] is None:
+                self.condition.wait()
+        if task['error']:
+            raise task['error']
+        return task['job_id']
+
+    async def submit_async(self, script_args: str, log_file_path: str):
+        """the same as submit, but the job waits for its array in the event loop"""
+        task = {'script_args': script_args, 'log_file_path': log_file_path,
+                'future': asyncio.get_running_loop().create_future()}
+        self.pending_async_tasks.append(task)
+        if len(self.pending_async_tasks) >= self.array_size:
+            self.__submit_async_array()
+        elif self.gather_timer is None:
+            self.gather_timer = asyncio.get_running_loop().call_later(self.gather_time, self.__submit_async_array)
+        return await task['future']
+
+    def __submit_async_array(self):
+        if self.gather_timer is not None:
+            self.gather_timer.cancel()
+            self.gather_timer = None
+        tasks = self.pending_async_tasks[:self.array_size]
+        self.pending_async_tasks = self.pending_async_tasks[self.array_size:]
+        with self.condition:
+            self.num_of_arrays += 1
+            self.num_of_tasks += len(tasks)
+            array_number = self.num_of_arrays
+        submission = asyncio.ensure_future(self.__submit_array_async(tasks, array_number))
+        self.async_submissions.add(submission)  # the loop keeps only a weak reference to its tasks
+        submission.add_done_callback(self.async_submissions.discard)
+        if self.pending_async_tasks:
+            self.gather_timer = asyncio.get_running_loop().call_later(self.gather_time, self.__submit_async_array)
+
+    async def __submit_array_async(self, tasks: list, array_number: int):
+        try:
+            sbatch_command = shlex.split(self.__make_array_sbatch_command(tasks, array_number))
+            array_job_id = await self.submit_func_async(sbatch_command)
+            for array_index, array_task in enumerate(tasks):
+                if not array_task['future'].done():  # a cancelled job is not waiting for its job id
+                    array_task['future'].set_result(f'{array_job_id}_{array_index}')
+        except Exception as ex:
+            logger.info_error(f'Exception at {SlurmArraySubmitter.__name__}: {ex}')
+            logger.debug_error(f'{traceback.format_exc()}')
+            for array_task in tasks:
+                if not array_task['future'].done():
+                    array_task['future'].set_exception(ex)
+
+    def __make_array_sbatch_command(self, tasks: list, array_number: int):
+        os.makedirs(self.arrays_dir, exist_ok=True)
+        array_name = f'compar_array_{array_number}'
+        array_file_path = os.path.join(self.arrays_dir, f'{array_name}.sh')
+        command = '#!/bin/bash\n'
+        command += f'#SBATCH --job-name={array_name}\n'
+        if self.time_limit:
+            command += f'#SBATCH --time={self.time_limit}\n'
+        command += f'#SBATCH --partition={self.slurm_partition}\n'
+        command += f'#SBATCH --array=0-{len(tasks) - 1}\n'
+        command += 'case $SLURM_ARRAY_TASK_ID in\n'
+        for array_index, task in enumerate(tasks):
+            command += f'{array_index}) bash {task["script_args"]} > {task["log_file_path"]} 2>&1 ;;\n'
+        command += 'esac\n'
+        command += 'exit $?\n'
+        with open(array_file_path, 'w') as array_file:
+            array_file.write(command)
+        array_log_file_path = os.path.join(self.arrays_dir, f'{array_name}_%a.log')
+        logger.info(f'{SlurmArraySubmitter.__name__}: submitting {array_name} array job of {len(tasks)} jobs')
+        return f'sbatch {" ".join(self.slurm_parameters)} -o {array_log_file_path} {array_file_path}'
+
+    def log_statistics(self):
+        logger.info(f'Slurm arrays: {self.num_of_tasks} jobs submitted in {self.num_of_arrays} array jobs')
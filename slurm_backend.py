@@ -0,0 +1,86 @@
+import os
+import re
+import shlex
+import asyncio
+import subprocess
+import time
+import traceback
+import logger
+from execution_backend import ExecutionBackend
+from slurm_array import SlurmArraySubmitter
+from slurm_monitor import SlurmMonitor
+from subprocess_handler import run_subprocess, run_subprocess_async
+from globals import ComparConfig, ExecuteJobConfig
+
+
+class SlurmBackend(ExecutionBackend):
+    NAME = 'slurm'
+    EVENT_LOOP_NATIVE = True
+
+    def __init__(self, working_directory: str, num_of_jobs: int, time_limit: str = None,
+                 slurm_partition: str = ComparConfig.DEFAULT_SLURM_PARTITION, slurm_parameters: list = None,
+                 slurm_array_size: int = 1):
+        super().__init__(working_directory, num_of_jobs, time_limit)
+        self.slurm_parameters = slurm_parameters if slurm_parameters else ComparConfig.DEFAULT_SLURM_PARAMETERS
+        self.slurm_monitor = SlurmMonitor()
+        self.slurm_array_submitter = None
+        if slurm_array_size > 1:
+            # the jobs of an array are gathered from the jobs that are executed at once
+            self.slurm_array_submitter = SlurmArraySubmitter(
+                os.path.join(working_directory, ComparConfig.SLURM_ARRAYS_FOLDER_NAME), self.submit_to_slurm,
+                slurm_partition, self.slurm_parameters, time_limit, min(slurm_array_size, num_of_jobs),
+                submit_func_async=self.submit_to_slurm_async)
+
+    @staticmethod
+    def submit_to_slurm(sbatch_command: str):
+        """runs the sbatch command until slurm accepts it and returns the job id"""
+        stdout = ""
+        batch_job_sent = False
+        while not batch_job_sent:
+            try:
+                stdout, stderr, ret_code = run_subprocess(sbatch_command)
+                batch_job_sent = True
+            except subprocess.CalledProcessError as ex:
+                logger.info_error(f'Exception at {SlurmBackend.__name__}: {ex}\n{ex.output}\n{ex.stderr}')
+                logger.debug_error(f'{traceback.format_exc()}')
+                logger.info_error('sbatch command not responding (slurm is down?)')
+                time.sleep(ExecuteJobConfig.TRY_SLURM_RECOVERY_AGAIN_SECOND_TIME)
+        return ''.join(re.findall('[0-9]', str(stdout)))
+
+    @staticmethod
+    async def submit_to_slurm_async(sbatch_command: list):
+        """the same as submit_to_slurm, but sbatch runs as a subprocess of the event loop"""
+        while True:
+            try:
+                stdout, stderr, ret_code = await run_subprocess_async(sbatch_command)
+                return ''.join(re.findall('[0-9]', stdout))
+            except subprocess.CalledProcessError as ex:
+                logger.info_error(f'Exception at {SlurmBackend.__name__}: {ex}\n{ex.output}\n{ex.stderr}')
+                logger.debug_error(f'{traceback.format_exc()}')
+            except OSError as ex:
+                logger.info_error(f'Exception at {SlurmBackend.__name__}: {ex}')
+                logger.debug_error(f'{traceback.format_exc()}')
+            logger.info_error('sbatch command not responding (slurm is down?)')
+            await asyncio.sleep(ExecuteJobConfig.TRY_SLURM_RECOVERY_AGAIN_SECOND_TIME)
+
+    def submit_job(self, script_args: str, log_file_path: str, bulk: bool = False):
+        if bulk and self.slurm_array_submitter:
+            return self.slurm_array_submitter.submit(script_args, log_file_path)
+        return self.submit_to_slurm(f'sbatch {" ".join(self.slurm_parameters)} -o {log_file_path} {script_args}')
+
+    def wait_for_job(self, job_id: str):
+        return self.slurm_monitor.wait_for_job(job_id)
+
+    async def submit_job_async(self, script_args: str, log_file_path: str, bulk: bool = False):
+        if bulk and self.slurm_array_submitter:
+            return await self.slurm_array_submitter.submit_async(script_args, log_file_path)
+        sbatch_command = ['sbatch'] + shlex.split(' '.join(self.slurm_parameters)) + ['-o', log_file_path]
+        return await self.submit_to_slurm_async(sbatch_command + shlex.split(script_args))
+
+    async def wait_for_job_async(self, job_id: str):
+        return await self.slurm_monitor.wait_for_job_async(job_id)
+
+    def log_statistics(self):
+        self.slurm_monitor.log_statistics()
+        if self.slurm_array_submitter:
+            self.slurm_array_submitter.log_statistics()
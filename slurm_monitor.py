@@ -0,0 +1,239 @@
+import asyncio
+import getpass
+import shlex
+import subprocess
+import time
+import traceback
+from threading import Thread, Lock, Event
+import logger
+from subprocess_handler import run_subprocess, run_subprocess_async
+from globals import ExecuteJobConfig
+
+
+class SlurmMonitor:
+    """
+    Follows the status of all the submitted jobs with one squeue call every poll_interval seconds, whatever the number
+    of jobs is. The accounting of the jobs that left the queue (exit code, elapsed time and node) is collected with one
+    sacct call, then every waiting job is woken up with the accounting of its job.
+    The poller runs only while there are jobs to follow: a thread, or a task of the event loop (squeue and sacct run as
+    subprocesses of the loop) when the first job is followed by wait_for_job_async.
+    """
+    SQUEUE_FORMAT = '%i %t'
+    SACCT_FIELDS = ['JobID', 'ExitCode', 'ElapsedRaw', 'NodeList']
+
+    def __init__(self, poll_interval: float = ExecuteJobConfig.CHECK_SQUEUE_SECOND_TIME):
+        self.poll_interval = poll_interval
+        self.lock = Lock()
+        # {<job id>: {'status': <squeue status>, 'on_finished': <callback>, 'accounting': <dict>,
+        #             'accounting_attempts': 0}}
+        self.jobs = {}
+        self.finished_jobs = {}  # the jobs that left the queue and wait for their accounting, in the same format
+        self.poller = None  # the polling thread or task
+        self.num_of_queries = 0
+        self.num_of_accounting_queries = 0
+
+    def wait_for_job(self, job_id: str):
+        """
+        Returns the accounting of the job when it leaves the queue: {'exit_code': <str>, 'elapsed_time': <seconds>,
+        'node': <str>}, or None if it is not known.
+        """
+        finished = Event()
+        job = self.__follow_job(job_id, finished.set)
+        finished.wait()
+        return job['accounting']
+
+    async def wait_for_job_async(self, job_id: str):
+        """the same as wait_for_job, but the waiting job does not hold a thread"""
+        loop = asyncio.get_running_loop()
+        finished = loop.create_future()
+        job = self.__follow_job(job_id, lambda: loop.call_soon_threadsafe(finished.set_result, None), loop)
+        await finished
+        return job['accounting']
+
+    def __follow_job(self, job_id: str, on_finished, loop: asyncio.AbstractEventLoop = None):
+        """on_finished() is called by the poller when the accounting of the job is known"""
+        job = {'status': '', 'on_finished': on_finished, 'accounting': None, 'accounting_attempts': 0}
+        with self.lock:
+            self.jobs[job_id] = job
+            if self.poller is None:
+                if loop:
+                    self.poller = loop.create_task(self.__run_async())
+                else:
+                    self.poller = Thread(target=self.__run, name='compar_slurm_monitor', daemon=True)
+                    self.poller.start()
+        return job
+
+    def __get_job_ids_to_poll(self):
+        """returns the ids of the jobs in the queue, or None (and the poller stops) if there are no jobs to follow"""
+        with self.lock:
+            if not self.jobs and not self.finished_jobs:
+                self.poller = None
+                return None
+            return list(self.jobs.keys())
+
+    def __run(self):
+        while True:
+            job_ids = self.__get_job_ids_to_poll()
+            if job_ids is None:
+                return
+            if job_ids:
+                jobs_statuses = self.__get_jobs_statuses(job_ids)
+                if jobs_statuses is None:
+                    time.sleep(ExecuteJobConfig.TRY_SLURM_RECOVERY_AGAIN_SECOND_TIME)
+                    continue
+                self.__update_jobs_statuses(job_ids, jobs_statuses)
+            finished_jobs = self.__get_finished_jobs()
+            if finished_jobs:
+                self.__finish_jobs(finished_jobs, self.__get_jobs_accounting(list(finished_jobs.keys())))
+            if self.__get_job_ids_to_poll() is None:
+                return
+            time.sleep(self.poll_interval)
+
+    async def __run_async(self):
+        while True:
+            job_ids = self.__get_job_ids_to_poll()
+            if job_ids is None:
+                return
+            if job_ids:
+                jobs_statuses = await self.__get_jobs_statuses_async(job_ids)
+                if jobs_statuses is None:
+                    await asyncio.sleep(ExecuteJobConfig.TRY_SLURM_RECOVERY_AGAIN_SECOND_TIME)
+                    continue
+                self.__update_jobs_statuses(job_ids, jobs_statuses)
+            finished_jobs = self.__get_finished_jobs()
+            if finished_jobs:
+                self.__finish_jobs(finished_jobs, await self.__get_jobs_accounting_async(list(finished_jobs.keys())))
+            if self.__get_job_ids_to_poll() is None:  # before the loop of the last woken job may be stopped
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    def __update_jobs_statuses(self, job_ids: list, jobs_statuses: dict):
+        with self.lock:
+            for job_id in job_ids:
+                status = jobs_statuses.get(job_id)
+                if status is None:  # the job is not in the queue anymore
+                    self.finished_jobs[job_id] = self.jobs.pop(job_id)
+                elif status != self.jobs[job_id]['status']:
+                    logger.info(f'Job {job_id} status is {status}')
+                    self.jobs[job_id]['status'] = status
+
+    def __get_finished_jobs(self):
+        with self.lock:
+            return dict(self.finished_jobs)
+
+    def __finish_jobs(self, finished_jobs: dict, jobs_accounting: dict):
+        with self.lock:
+            for job_id, job in finished_jobs.items():
+                job['accounting_attempts'] += 1
+                if jobs_accounting is not None and job_id not in jobs_accounting and \
+                        job['accounting_attempts'] < ExecuteJobConfig.SACCT_ATTEMPTS:
+                    continue  # the accounting database may be behind the queue
+                if jobs_accounting is not None:
+                    job['accounting'] = jobs_accounting.get(job_id)
+                del self.finished_jobs[job_id]
+                job['on_finished']()
+
+    @staticmethod
+    def __get_squeue_command(job_ids: list = None):
+        # -r lists every task of an array job by itself, as <array job id>_<array index>
+        squeue_command = ['squeue', '-h', '-r', '--format', SlurmMonitor.SQUEUE_FORMAT]
+        if job_ids:
+            return squeue_command + ['-j', ','.join(job_ids)]
+        return squeue_command + ['-u', getpass.getuser()]  # only the jobs of the user, not the whole cluster queue
+
+    @staticmethod
+    def __get_sacct_command(job_ids: list):
+        return ['sacct', '--parsable2', '--noheader', f'--format={",".join(SlurmMonitor.SACCT_FIELDS)}', '-j',
+                ','.join(job_ids)]
+
+    @staticmethod
+    def __to_shell_command(command: list):
+        return ' '.join(shlex.quote(arg) for arg in command)
+
+    def __get_jobs_statuses(self, job_ids: list):
+        """returns {<job id>: <status>} of the given jobs that are in the queue, or None if squeue is not responding"""
+        self.num_of_queries += 1
+        try:
+            stdout, stderr, ret_code = run_subprocess(self.__to_shell_command(self.__get_squeue_command(job_ids)))
+        except subprocess.CalledProcessError:  # some of the jobs may have left the queue (invalid job id)
+            try:
+                stdout, stderr, ret_code = run_subprocess(self.__to_shell_command(self.__get_squeue_command()))
+            except subprocess.CalledProcessError as ex:
+                self.__log_squeue_error(ex)
+                return None
+        return self.__parse_jobs_statuses(stdout)
+
+    async def __get_jobs_statuses_async(self, job_ids: list):
+        """the same as __get_jobs_statuses, but squeue runs as a subprocess of the event loop"""
+        self.num_of_queries += 1
+        try:
+            stdout, stderr, ret_code = await run_subprocess_async(self.__get_squeue_command(job_ids))
+        except subprocess.CalledProcessError:
+            try:
+                stdout, stderr, ret_code = await run_subprocess_async(self.__get_squeue_command())
+            except (subprocess.CalledProcessError, OSError) as ex:
+                self.__log_squeue_error(ex)
+                return None
+        except OSError as ex:
+            self.__log_squeue_error(ex)
+            return None
+        return self.__parse_jobs_statuses(stdout)
+
+    @staticmethod
+    def __log_squeue_error(ex: Exception):
+        logger.info_error(f'Exception at {SlurmMonitor.__name__}: {ex}\n{getattr(ex, "stdout", "")}\n'
+                          f'{getattr(ex, "stderr", "")}')
+        logger.debug_error(f'{traceback.format_exc()}')
+        logger.info_error('squeue command not responding (slurm is down?)')
+
+    @staticmethod
+    def __parse_jobs_statuses(stdout: str):
+        jobs_statuses = {}
+        for line in stdout.splitlines():
+            fields = line.split()
+            if len(fields) == 2:
+                jobs_statuses[fields[0]] = fields[1]
+        return jobs_statuses
+
+    def __get_jobs_accounting(self, job_ids: list):
+        """returns {<job id>: <accounting>} of the given jobs that are in the accounting, or None if sacct fails"""
+        self.num_of_accounting_queries += 1
+        try:
+            stdout, stderr, ret_code = run_subprocess(self.__to_shell_command(self.__get_sacct_command(job_ids)))
+        except subprocess.CalledProcessError as ex:
+            logger.info_error(f'Warning: sacct command not responding (slurm is down?)\n{ex.output}\n{ex.stderr}')
+            return None
+        return self.__parse_jobs_accounting(stdout, job_ids)
+
+    async def __get_jobs_accounting_async(self, job_ids: list):
+        """the same as __get_jobs_accounting, but sacct runs as a subprocess of the event loop"""
+        self.num_of_accounting_queries += 1
+        try:
+            stdout, stderr, ret_code = await run_subprocess_async(self.__get_sacct_command(job_ids))
+        except subprocess.CalledProcessError as ex:
+            logger.info_error(f'Warning: sacct command not responding (slurm is down?)\n{ex.output}\n{ex.stderr}')
+            return None
+        except OSError as ex:
+            logger.info_error(f'Warning: sacct command not responding (slurm is down?)\n{ex}')
+            return None
+        return self.__parse_jobs_accounting(stdout, job_ids)
+
+    @staticmethod
+    def __parse_jobs_accounting(stdout: str, job_ids: list):
+        jobs_accounting = {}
+        for line in stdout.splitlines():
+            values = line.split('|')
+            if len(values) != len(SlurmMonitor.SACCT_FIELDS):
+                continue
+            job_id, exit_code, elapsed_time, node = values
+            if job_id in job_ids:  # the steps of the job (<job id>.batch, <job id>.extern, ...) are skipped
+                try:
+                    elapsed_time = float(elapsed_time)
+                except ValueError:
+                    elapsed_time = None
+                jobs_accounting[job_id] = {'exit_code': exit_code, 'elapsed_time': elapsed_time, 'node': node}
+        return jobs_accounting
+
+    def log_statistics(self):
+        logger.info(f'Slurm monitor: {self.num_of_queries} squeue queries, '
+                    f'{self.num_of_accounting_queries} sacct queries')
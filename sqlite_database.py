@@ -0,0 +1,300 @@
+import os
+import json
+import sqlite3
+from contextlib import contextmanager
+from queue import Queue
+from threading import Lock, local
+from database import Database
+from exceptions import NoOptimalCombinationError
+import logger
+import traceback
+from globals import ComparMode, DatabaseConfig, JobConfig
+
+
+class SqliteDatabase(Database):
+    NAME = 'sqlite'
+    SCHEMA = [
+        'CREATE TABLE IF NOT EXISTS collections (db INTEGER, name TEXT, PRIMARY KEY (db, name))',
+        'CREATE TABLE IF NOT EXISTS static_db_metadata (collection TEXT PRIMARY KEY, search_space_hash TEXT, '
+        'num_of_combinations INTEGER)',
+        'CREATE TABLE IF NOT EXISTS static_combinations (collection TEXT, id TEXT, combination_index INTEGER, '
+        'document TEXT, PRIMARY KEY (collection, id))',
+        'CREATE INDEX IF NOT EXISTS static_combinations_by_index ON static_combinations '
+        '(collection, combination_index)',
+        'CREATE TABLE IF NOT EXISTS results (collection TEXT, id TEXT, has_error INTEGER, total_run_time REAL, '
+        'document TEXT, PRIMARY KEY (collection, id))',
+        'CREATE TABLE IF NOT EXISTS loops_results (collection TEXT, combination_id TEXT, file_id_by_rel_path TEXT, '
+        'loop_label TEXT, dead_code_file INTEGER, dead_code INTEGER, run_time REAL, speedup REAL)',
+        'CREATE INDEX IF NOT EXISTS loops_results_by_loop ON loops_results '
+        '(collection, file_id_by_rel_path, loop_label, dead_code, speedup DESC)',
+        'CREATE INDEX IF NOT EXISTS loops_results_by_combination ON loops_results (collection, combination_id)'
+    ]
+
+    def __init__(self, project_name: str, mode: ComparMode, output_dir: str = '', **kwargs):
+        self.db_file_path = ''
+        self.pool = None
+        self.pool_size = 0
+        self.num_of_connections = 0
+        self.pool_lock = Lock()
+        self.local = local()
+        super().__init__(project_name, mode, output_dir=output_dir, **kwargs)
+
+    def connect(self, output_dir: str = '', pool_size: int = DatabaseConfig.CONNECTION_POOL_SIZE, **kwargs):
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        self.db_file_path = os.path.join(output_dir, DatabaseConfig.SQLITE_DB_FILE_NAME)
+        self.pool = Queue()
+        self.pool_size = pool_size
+        self.num_of_connections = 0
+        with self.transaction() as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            for statement in SqliteDatabase.SCHEMA:
+                connection.execute(statement)
+
+    def close_connection(self):
+        with self.pool_lock:
+            while not self.pool.empty():
+                self.pool.get_nowait().close()
+                self.num_of_connections -= 1
+
+    def __new_connection(self):
+        # writing transactions start immediately, so concurrent writers wait for each other (up to the busy timeout)
+        connection = sqlite3.connect(self.db_file_path, timeout=DatabaseConfig.SQLITE_BUSY_TIMEOUT_SECONDS,
+                                     isolation_level='IMMEDIATE', check_same_thread=False)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return connection
+
+    def __acquire_connection(self):
+        with self.pool_lock:
+            if self.pool.empty() and self.num_of_connections < self.pool_size:
+                self.num_of_connections += 1
+                return self.__new_connection()
+        return self.pool.get()
+
+    @contextmanager
+    def transaction(self):
+        """
+        Borrows a connection of the pool for the current thread and commits (or rolls back) when done.
+        Nested transactions of the same thread share its connection.
+        """
+        connection = getattr(self.local, 'connection', None)
+        if connection is not None:
+            yield connection
+            return
+        connection = self.__acquire_connection()
+        self.local.connection = connection
+        try:
+            with connection:
+                yield connection
+        finally:
+            self.local.connection = None
+            self.pool.put(connection)
+
+    def is_collection_exists(self, collection_name: str, database: int = Database.RESULTS_DB):
+        if database not in (Database.COMBINATIONS_DB, Database.RESULTS_DB):
+            raise ValueError(f'Unknown value {database}')
+        with self.transaction() as connection:
+            row = connection.execute('SELECT 1 FROM collections WHERE db = ? AND name = ?',
+                                     (database, collection_name)).fetchone()
+        return row is not None
+
+    def __register_collection(self, connection: sqlite3.Connection, database: int):
+        connection.execute('INSERT OR IGNORE INTO collections (db, name) VALUES (?, ?)',
+                           (database, self.collection_name))
+
+    def drop_results_collections(self):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM results WHERE collection = ?', (self.collection_name, ))
+            connection.execute('DELETE FROM loops_results WHERE collection = ?', (self.collection_name, ))
+            connection.execute('DELETE FROM collections WHERE db = ? AND name = ?',
+                               (Database.RESULTS_DB, self.collection_name))
+
+    def reset_static_db(self):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM static_combinations WHERE collection = ?', (self.collection_name, ))
+            self.__register_collection(connection, Database.COMBINATIONS_DB)
+
+    def write_combinations_to_static_db(self, combinations: list):
+        rows = [(self.collection_name, combination['_id'], combination['combination_index'], json.dumps(combination))
+                for combination in combinations]
+        with self.transaction() as connection:
+            connection.executemany('INSERT OR IGNORE INTO static_combinations '
+                                   '(collection, id, combination_index, document) VALUES (?, ?, ?, ?)', rows)
+
+    def get_static_db_metadata(self):
+        with self.transaction() as connection:
+            row = connection.execute('SELECT search_space_hash, num_of_combinations FROM static_db_metadata '
+                                     'WHERE collection = ?', (self.collection_name, )).fetchone()
+        if not row:
+            return None
+        return {'search_space_hash': row[0], 'num_of_combinations': row[1]}
+
+    def set_static_db_metadata(self, search_space_hash: str, num_of_combinations: int):
+        with self.transaction() as connection:
+            connection.execute('INSERT OR REPLACE INTO static_db_metadata '
+                               '(collection, search_space_hash, num_of_combinations) VALUES (?, ?, ?)',
+                               (self.collection_name, search_space_hash, num_of_combinations))
+
+    def delete_static_db_metadata(self):
+        with self.transaction() as connection:
+            connection.execute('DELETE FROM static_db_metadata WHERE collection = ?', (self.collection_name, ))
+
+    def create_dynamic_db(self):
+        with self.transaction() as connection:
+            self.__register_collection(connection, Database.RESULTS_DB)
+            if self.mode == ComparMode.CONTINUE:
+                connection.execute('DELETE FROM results WHERE collection = ? AND (has_error = 1 OR (id != ? AND '
+                                   'id NOT IN (SELECT id FROM static_combinations WHERE collection = ?)))',
+                                   (self.collection_name, Database.SERIAL_COMBINATION_ID, self.collection_name))
+                connection.execute('DELETE FROM loops_results WHERE collection = ? AND combination_id NOT IN '
+                                   '(SELECT id FROM results WHERE collection = ?)',
+                                   (self.collection_name, self.collection_name))
+
+    def combinations_iterator(self):
+        try:
+            last_combination_index = -1
+            while True:
+                with self.transaction() as connection:
+                    rows = connection.execute(
+                        'SELECT combination_index, document FROM static_combinations AS static '
+                        'WHERE collection = ? AND combination_index > ? AND NOT EXISTS (SELECT 1 FROM results '
+                        'WHERE results.collection = static.collection AND results.id = static.id) '
+                        'ORDER BY combination_index LIMIT ?',
+                        (self.collection_name, last_combination_index, DatabaseConfig.COMBINATIONS_ITERATOR_BATCH_SIZE)
+                    ).fetchall()
+                if not rows:
+                    return
+                for combination_index, document in rows:
+                    yield json.loads(document)
+                last_combination_index = rows[-1][0]
+        except Exception:
+            logger.info_error(f"Exception at {SqliteDatabase.__name__}: get_next_combination")
+            raise
+
+    def __insert_loops_results(self, connection: sqlite3.Connection, combination_result: dict):
+        if 'error' in combination_result.keys():
+            return
+        rows = [(self.collection_name, loop['combination_id'], loop['file_id_by_rel_path'], loop['loop_label'],
+                 loop.get('dead_code_file', False), loop.get('dead_code', False), loop.get('run_time'),
+                 loop.get('speedup')) for loop in Database.flatten_combination_results(combination_result)]
+        connection.executemany('INSERT INTO loops_results (collection, combination_id, file_id_by_rel_path, '
+                               'loop_label, dead_code_file, dead_code, run_time, speedup) '
+                               'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def __delete_loops_results(self, connection: sqlite3.Connection, combination_id: str):
+        connection.execute('DELETE FROM loops_results WHERE collection = ? AND combination_id = ?',
+                           (self.collection_name, combination_id))
+
+    def __write_combination_results(self, connection: sqlite3.Connection, combination_result: dict):
+        connection.execute('UPDATE results SET has_error = ?, total_run_time = ?, document = ? '
+                           'WHERE collection = ? AND id = ?',
+                           ('error' in combination_result.keys(), combination_result.get('total_run_time'),
+                            json.dumps(combination_result), self.collection_name, combination_result['_id']))
+
+    def insert_new_combination_results(self, combination_result: dict):
+        return self.insert_new_combinations_results([combination_result])
+
+    def insert_new_combinations_results(self, combinations_results: list):
+        num_of_inserted_results = 0
+        try:
+            with self.transaction() as connection:
+                for combination_result in combinations_results:
+                    try:
+                        connection.execute('INSERT INTO results (collection, id, has_error, total_run_time, '
+                                           'document) VALUES (?, ?, ?, ?, ?)',
+                                           (self.collection_name, combination_result['_id'],
+                                            'error' in combination_result.keys(),
+                                            combination_result.get('total_run_time'),
+                                            json.dumps(combination_result)))
+                    except sqlite3.IntegrityError as e:
+                        logger.info_error(f'{SqliteDatabase.__name__}: cannot update dynamic DB: {e}')
+                        continue
+                    self.__insert_loops_results(connection, combination_result)
+                    num_of_inserted_results += 1
+                self.optimal_loops = None
+            return num_of_inserted_results == len(combinations_results)
+        except Exception as e:
+            logger.info_error(f'{SqliteDatabase.__name__}: cannot update dynamic DB: {e}')
+            logger.debug_error(f'{traceback.format_exc()}')
+            return False
+
+    def delete_combination(self, combination_id: str):
+        try:
+            with self.transaction() as connection:
+                connection.execute('DELETE FROM results WHERE collection = ? AND id = ?',
+                                   (self.collection_name, combination_id))
+                self.__delete_loops_results(connection, combination_id)
+                self.optimal_loops = None
+            return True
+        except Exception as e:
+            logger.info_error(f'Exception at {SqliteDatabase.__name__}: Could not delete combination: {e}')
+            logger.debug_error(f'{traceback.format_exc()}')
+            return False
+
+    def aggregate_optimal_loops(self):
+        with self.transaction() as connection:
+            files = connection.execute('SELECT file_id_by_rel_path, MAX(1 - dead_code_file) FROM loops_results '
+                                       'WHERE collection = ? AND loop_label IS NULL '
+                                       'GROUP BY file_id_by_rel_path', (self.collection_name, )).fetchall()
+            loops_results = connection.execute('SELECT combination_id, file_id_by_rel_path, loop_label, '
+                                               'dead_code, run_time, speedup FROM loops_results '
+                                               'WHERE collection = ? AND loop_label IS NOT NULL '
+                                               'ORDER BY file_id_by_rel_path, loop_label, dead_code, '
+                                               'speedup DESC', (self.collection_name, )).fetchall()
+        alive_files = set(file_id_by_rel_path for file_id_by_rel_path, is_alive in files if is_alive)
+        loops = {}
+        for combination_id, file_id_by_rel_path, loop_label, dead_code, run_time, speedup in loops_results:
+            loop_result = {'combination_id': combination_id, 'loop_label': loop_label, 'run_time': run_time,
+                           'speedup': speedup}
+            key = (file_id_by_rel_path, loop_label)
+            if key not in loops:  # the results are sorted, so the first one is the fastest
+                loops[key] = {'is_alive': not dead_code, 'best_loop': loop_result, 'serial_loop': None}
+            if not dead_code and combination_id == Database.SERIAL_COMBINATION_ID:
+                loops[key]['serial_loop'] = loop_result
+        return alive_files, loops
+
+    def find_combination_results(self, combination_id: str):
+        with self.transaction() as connection:
+            row = connection.execute('SELECT document FROM results WHERE collection = ? AND id = ?',
+                                     (self.collection_name, combination_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_combination_in_static_db(self, combination_id: str):
+        with self.transaction() as connection:
+            row = connection.execute('SELECT document FROM static_combinations WHERE collection = ? AND id = ?',
+                                     (self.collection_name, combination_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_total_runtime_best_combination(self):
+        with self.transaction() as connection:
+            row = connection.execute('SELECT id FROM results WHERE collection = ? AND has_error = 0 AND '
+                                     'total_run_time IS NOT NULL AND total_run_time != ? '
+                                     'ORDER BY total_run_time LIMIT 1',
+                                     (self.collection_name, JobConfig.RUNTIME_ERROR)).fetchone()
+        if not row:
+            raise NoOptimalCombinationError("All Compar combinations finished with error.")
+        return row[0]
+
+    def remove_unused_data(self, combination_id: str):
+        with self.transaction() as connection:
+            combination_result = self.find_combination_results(combination_id)
+            if combination_result:
+                combination_result.pop('run_time_results', None)
+                self.__write_combination_results(connection, combination_result)
+            self.__delete_loops_results(connection, combination_id)
+            self.optimal_loops = None
+
+    def set_error_in_combination(self, combination_id: str, error: str):
+        with self.transaction() as connection:
+            combination_result = self.find_combination_results(combination_id)
+            if combination_result:
+                combination_result['error'] = error
+                self.__write_combination_results(connection, combination_result)
+            self.__delete_loops_results(connection, combination_id)
+            self.optimal_loops = None
+
+    def delete_all_related_collections(self):
+        with self.transaction() as connection:
+            for table in ('static_db_metadata', 'static_combinations', 'results', 'loops_results'):
+                connection.execute(f'DELETE FROM {table} WHERE collection = ?', (self.collection_name, ))
+            connection.execute('DELETE FROM collections WHERE name = ?', (self.collection_name, ))
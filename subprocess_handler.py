@@ -1,3 +1,4 @@
+import asyncio
 import subprocess
 import os
 import logger
@@ -16,3 +17,15 @@ def run_subprocess(command: list or str, cwd: str = os.curdir):
     if return_code != 0:
         raise subprocess.CalledProcessError(cmd=command, output=std_out, stderr=std_err, returncode=return_code)
     return std_out, std_err, return_code
+
+
+async def run_subprocess_async(command: list, cwd: str = os.curdir):
+    """the same as run_subprocess, but the command (without a shell) runs as a subprocess of the event loop"""
+    logger.verbose(f'Running {" ".join(command)} command')
+    process = await asyncio.create_subprocess_exec(*command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd,
+                                                   env=os.environ)
+    std_out, std_err = await process.communicate()
+    std_out, std_err = std_out.decode(errors='replace'), std_err.decode(errors='replace')
+    if process.returncode != 0:
+        raise subprocess.CalledProcessError(cmd=command, output=std_out, stderr=std_err, returncode=process.returncode)
+    return std_out, std_err, process.returncode
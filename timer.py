@@ -21,7 +21,14 @@ class Timer:
     INIT_RUN_TIME_VAR_CODE = COMPAR_VAR_PREFIX + 'run_time_{} = omp_get_wtime() - ' +\
         COMPAR_VAR_PREFIX + 'start_time_{};\n'
 
-    WRITE_TO_FILE_CODE_1 = 'FILE * fp{} = fopen(\"{}\", \"w\");\n'
+    RESULTS_DIR_VAR_NAME = COMPAR_VAR_PREFIX + 'results_dir'
+    RESULTS_PATH_VAR_NAME = COMPAR_VAR_PREFIX + 'results_path'
+    DECL_RESULTS_PATH_VARS_CODE = 'extern char *getenv(const char *);\n' \
+                                  f'char *{RESULTS_DIR_VAR_NAME} = getenv(\"{TimerConfig.RESULTS_DIR_ENV_VAR}\");\n' \
+                                  f'char {RESULTS_PATH_VAR_NAME}[{TimerConfig.RESULTS_PATH_MAX_LENGTH}];\n'
+    WRITE_TO_FILE_CODE_1 = f'snprintf({RESULTS_PATH_VAR_NAME}, sizeof({RESULTS_PATH_VAR_NAME}), \"%s/%s\", ' \
+                           f'{RESULTS_DIR_VAR_NAME} ? {RESULTS_DIR_VAR_NAME} : \".\", \"{{1}}\");\n' \
+                           f'FILE * fp{{0}} = fopen({RESULTS_PATH_VAR_NAME}, \"w\");\n'
     WRITE_TO_FILE_CODE_2 = 'fprintf(fp{}, '+'"'+'%d' + TimerConfig.LOOPS_RUNTIME_SEPARATOR + \
                            '%.10lf'+r'\\n' + '"' + ', {}, {});\n'  # <loop number>:<run time>
     WRITE_TO_FILE_CODE_3 = 'fclose(fp{});\n'
@@ -189,7 +196,7 @@ class Timer:
             raise e.FileError(str(err))
 
     @staticmethod
-    def inject_timer_to_compar_mixed_file(file_path: str, working_dir_path: str):
+    def inject_timer_to_compar_mixed_file(file_path: str):
         with open(file_path, 'r') as input_file:
             input_file_text = Timer.DECL_GLOBAL_TIMER_VAR_CODE + "\n"
             input_file_text += input_file.read()
@@ -204,9 +211,9 @@ class Timer:
                 raise Exception('atexit function could not be injected.')
             code_to_replace = code_to_replace[0][0]
             code = 'void ' + Timer.COMPAR_VAR_PREFIX + 'atExit() {\n'
-            total_runtime_file_path = os.path.join(working_dir_path, Timer.TOTAL_RUNTIME_FILENAME)
+            code += Timer.DECL_RESULTS_PATH_VARS_CODE
             code += f'{Timer.STOP_GLOBAL_TIMER_VAR_CODE}'
-            code += Timer.WRITE_TO_FILE_CODE_1.format(Timer.GLOBAL_TIMER_VAR_NAME, total_runtime_file_path)
+            code += Timer.WRITE_TO_FILE_CODE_1.format(Timer.GLOBAL_TIMER_VAR_NAME, Timer.TOTAL_RUNTIME_FILENAME)
             code += Timer.WRITE_TO_FILE_CODE_4.format(Timer.GLOBAL_TIMER_VAR_NAME, Timer.GLOBAL_TIMER_VAR_NAME)
             code += Timer.WRITE_TO_FILE_CODE_3.format(Timer.GLOBAL_TIMER_VAR_NAME)
             code += '}\n'
@@ -228,7 +235,7 @@ class Timer:
                 output_file.write(input_file_text)
 
     @staticmethod
-    def inject_atexit_code_to_main_file(main_file_path: str, files_loop_dict: dict, working_dir_path: str):
+    def inject_atexit_code_to_main_file(main_file_path: str, files_loop_dict: dict):
         with open(main_file_path, 'r') as input_file:
             input_file_text = input_file.read()
 
@@ -239,7 +246,7 @@ class Timer:
 
             code_to_replace = code_to_replace[0][0]
 
-            new_code = Timer.generate_at_exit_function_code(files_loop_dict, working_dir_path)
+            new_code = Timer.generate_at_exit_function_code(files_loop_dict)
             new_code += f'{code_to_replace} atexit({Timer.COMPAR_VAR_PREFIX}atExit);\n'
             new_code += f'{Timer.INIT_GLOBAL_TIMER_VAR_CODE}'
 
@@ -255,19 +262,18 @@ class Timer:
         return new_code
 
     @staticmethod
-    def generate_at_exit_function_code(files_loop_dict: dict, working_dir_path: str):
+    def generate_at_exit_function_code(files_loop_dict: dict):
         code = 'void ' + Timer.COMPAR_VAR_PREFIX + 'atExit() {\n'
-        total_runtime_file_path = os.path.join(working_dir_path, Timer.TOTAL_RUNTIME_FILENAME)
+        code += Timer.DECL_RESULTS_PATH_VARS_CODE
         code += f'{Timer.STOP_GLOBAL_TIMER_VAR_CODE}'
-        code += Timer.WRITE_TO_FILE_CODE_1.format(Timer.GLOBAL_TIMER_VAR_NAME, total_runtime_file_path)
+        code += Timer.WRITE_TO_FILE_CODE_1.format(Timer.GLOBAL_TIMER_VAR_NAME, Timer.TOTAL_RUNTIME_FILENAME)
         code += Timer.WRITE_TO_FILE_CODE_4.format(Timer.GLOBAL_TIMER_VAR_NAME, Timer.GLOBAL_TIMER_VAR_NAME)
         code += Timer.WRITE_TO_FILE_CODE_3.format(Timer.GLOBAL_TIMER_VAR_NAME)
         for file, loops in files_loop_dict.items():
             if loops[0] != 0:  # the file has loops
                 name, ext = os.path.splitext(file)
                 new_file_name = f'{name}{TimerConfig.LOOPS_RUNTIME_RESULTS_SUFFIX}'
-                path = os.path.join(working_dir_path, new_file_name)
-                code += Timer.WRITE_TO_FILE_CODE_1.format(loops[1], path)
+                code += Timer.WRITE_TO_FILE_CODE_1.format(loops[1], new_file_name)
                 curr_loop = 0
                 while curr_loop < loops[0]:
                     code += f'if ({loops[1]}[{curr_loop}].counter > 0) '
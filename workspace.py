@@ -0,0 +1,74 @@
+import os
+import stat
+import shutil
+import fcntl
+from fnmatch import fnmatch
+from globals import WorkspaceConfig, WorkspaceMode
+
+
+def create_workspace(src: str, dst: str, mode: WorkspaceMode = WorkspaceMode.COPY,
+                     linked_files_patterns: list = None):
+    """
+    Fills dst with the content of src and returns the number of bytes that were really copied.
+    In HARDLINK mode only the read-only inputs are hard linked: the files that match one of linked_files_patterns
+    (relative to src), except the files that may be rewritten in place (see
+    WorkspaceConfig.MATERIALIZED_FILES_EXTENSIONS). The linked files share their inode with src, so they are made
+    read-only and a write in place fails instead of changing the files of all the combinations. All the other files
+    are copied. In REFLINK mode all the files are cloned (copy on write), so they may all be rewritten safely. When a
+    file cannot be linked (e.g. another file system) it is copied.
+    """
+    bytes_copied = 0
+    for root, dirs, files in os.walk(src, followlinks=True):
+        dst_root = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(dst_root, exist_ok=True)
+        for file in files:
+            file_mode = mode
+            if mode == WorkspaceMode.HARDLINK and not is_linked_file(src, os.path.join(root, file),
+                                                                     linked_files_patterns):
+                file_mode = WorkspaceMode.COPY
+            bytes_copied += link_or_copy_file(os.path.join(root, file), os.path.join(dst_root, file), file_mode)
+    return bytes_copied
+
+
+def link_or_copy_file(src: str, dst: str, mode: WorkspaceMode = WorkspaceMode.COPY):
+    if os.path.lexists(dst):
+        os.remove(dst)
+    if mode == WorkspaceMode.HARDLINK and not is_materialized_file(src):
+        try:
+            make_read_only(src)
+            os.link(src, dst)
+            return 0
+        except OSError:
+            pass
+    elif mode == WorkspaceMode.REFLINK:
+        try:
+            reflink_file(src, dst)
+            return 0
+        except OSError:
+            if os.path.lexists(dst):
+                os.remove(dst)
+    shutil.copy2(src, dst)
+    return os.path.getsize(dst)
+
+
+def reflink_file(src: str, dst: str):
+    with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+        fcntl.ioctl(dst_file.fileno(), WorkspaceConfig.FICLONE_IOCTL, src_file.fileno())
+    shutil.copystat(src, dst)
+
+
+def make_read_only(file_path: str):
+    file_mode = os.stat(file_path).st_mode
+    os.chmod(file_path, file_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
+
+
+def is_materialized_file(file_path: str):
+    return os.path.splitext(file_path)[1] in WorkspaceConfig.MATERIALIZED_FILES_EXTENSIONS
+
+
+def is_linked_file(src_root: str, file_path: str, linked_files_patterns: list = None):
+    if linked_files_patterns is None:
+        linked_files_patterns = WorkspaceConfig.DEFAULT_LINKED_FILES_PATTERNS
+    rel_path = os.path.relpath(file_path, src_root)
+    return any(fnmatch(rel_path, pattern) or fnmatch(os.path.basename(rel_path), pattern)
+               for pattern in linked_files_patterns)